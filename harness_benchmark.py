@@ -0,0 +1,527 @@
+#!/usr/bin/python
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+# Benchmarks of the interoperability_report itself.
+#
+# They measure the costs the harness adds to every Test Case, without running
+# any DDS product, so the optimizations of interoperability_report.py can be
+# compared against real numbers:
+#   * fixed: fixed cost of a Test Case. Creation of the shared state of the
+#     entities, Manager startup (reference), process fork and join, spawn and
+#     teardown (stop_process()) of a child, time spent in the startup sleeps
+#     defined by the Test Suite and the read back of the temporary files.
+#   * parse: cost per sample of the subscriber_steps() of every checking
+#     function. The output is replayed (rtps_recording.ReplayChild) from
+#     recordings (--replay) or from synthetic output generated from the
+#     parameters of the first Test Case that uses the checking function.
+#   * junit: cost of writing and parsing the JUnit report versus the number
+#     of Test Suites (runs) it contains.
+#
+# Every benchmark is repeated and the median is reported. The results are
+# printed as a table and can be saved to a JSON file (--output) that is used
+# as the baseline (--baseline) of a later execution.
+
+import argparse
+import contextlib
+import importlib
+import inspect
+import io
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import shutil
+import statistics
+import tempfile
+import time
+
+if __name__ == "__main__" and platform.system() == "Darwin":
+    multiprocessing.set_start_method('fork')
+
+import junitparser
+import pexpect
+
+from interoperability_report import stop_process, publisher_steps, \
+    subscriber_steps, get_check_function
+from rtps_recording import OutputRecorder, EntityRecording, ReplayChild, \
+    load_recording, RECORDING_EXTENSION
+from rtps_test_utilities import shape_main_options, option_value, \
+    OUTPUT_FORMAT_OPTION, RECORD_OUTPUT_FORMAT
+from rtps_validators import SAMPLE_PATTERN, parse_sample
+
+RESULTS_FORMAT_VERSION = 1
+BENCHMARKS = ('fixed', 'parse', 'junit')
+
+# Time between the lines of the synthetic output (ns).
+SYNTHETIC_LINE_PERIOD = 10_000_000
+
+def measure(function, repeat):
+    """
+    Runs 'function' 'repeat' times. It returns the list of elapsed times
+    (s), or the values returned by 'function' if they are not None (so it
+    can time only a part of its work).
+    """
+    values = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = function()
+        elapsed = time.perf_counter() - start
+        values.append(elapsed if value is None else value)
+    return values
+
+def result(values, unit, scale=1, **info):
+    """ Entry of the results: median, min and max of 'values' * 'scale'. """
+    return dict(info,
+            value=statistics.median(values) * scale,
+            min=min(values) * scale,
+            max=max(values) * scale,
+            n=len(values),
+            unit=unit)
+
+def is_publisher(parameters):
+    return '-P ' in parameters or parameters.endswith('-P')
+
+def suite_dicts(suite):
+    """ Returns the Test Suite dictionaries (name -> dict) of 'suite'. """
+    return {name: value for name, value in inspect.getmembers(
+                importlib.import_module(suite))
+            if type(value) is dict and name != '__builtins__'}
+
+def _noop():
+    pass
+
+def fixed_benchmarks(suite, repeat):
+    """ Fixed cost of a Test Case with one Publisher and one Subscriber. """
+    results = {}
+
+    def shared_state():
+        start = time.perf_counter()
+        multiprocessing.Array('i', [-1] * 2, lock=False)
+        [multiprocessing.Event(), multiprocessing.Event()]
+        queues = [multiprocessing.Queue(), multiprocessing.Queue()]
+        elapsed = time.perf_counter() - start
+        for element in queues:
+            element.close()
+        return elapsed
+    results['fixed.shared_state'] = result(
+            measure(shared_state, repeat), 'ms', 1e3)
+
+    def manager_startup():
+        with multiprocessing.Manager() as manager:
+            manager.list()
+    results['fixed.manager_startup'] = result(
+            measure(manager_startup, repeat), 'ms', 1e3)
+
+    def process_fork():
+        process = multiprocessing.Process(target=_noop)
+        process.start()
+        process.join()
+    results['fixed.process_fork_join'] = result(
+            measure(process_fork, repeat), 'ms', 1e3)
+
+    # 'cat' finishes with SIGINT, as the shape_main applications do, so the
+    # teardown measures the polling of stop_process()
+    executable = shutil.which('cat')
+    if executable is not None:
+        children = []
+        def spawn():
+            start = time.perf_counter()
+            child = pexpect.spawnu(executable)
+            child.isalive()
+            elapsed = time.perf_counter() - start
+            children.append(child)
+            return elapsed
+        def teardown():
+            stop_process(children.pop())
+        results['fixed.spawn'] = result(measure(spawn, repeat), 'ms', 1e3)
+        results['fixed.teardown'] = result(measure(teardown, repeat),
+                'ms', 1e3)
+
+    delays = []
+    for t_suite_dict in suite_dicts(suite).values():
+        for test_case_parameters in t_suite_dict.values():
+            startup_delay = test_case_parameters.get('startup_delay', 1)
+            if not isinstance(startup_delay, list):
+                startup_delay = \
+                    [startup_delay] * len(test_case_parameters['apps'])
+            delays.append(sum(startup_delay))
+    if delays:
+        results['fixed.startup_sleep'] = result(delays, 's',
+                test_cases=len(delays), total_s=sum(delays))
+
+    lines = synthetic_lines(['-P -t Square -z 0 -w'], 0, 500)
+    def readback():
+        with tempfile.TemporaryFile(mode='w+t') as file:
+            recorder = OutputRecorder(file)
+            for line in lines:
+                recorder.write(line)
+            recorder.flush()
+            start = time.perf_counter()
+            EntityRecording.from_file(file)
+            return time.perf_counter() - start
+    results['fixed.recording_readback'] = result(
+            measure(readback, repeat), 'ms', 1e3, lines=len(lines))
+    return results
+
+def synthetic_lines(apps, index, samples):
+    """
+    Synthetic output of the application apps[index]: the creation and
+    matching lines and 'samples' samples of the Publishers of 'apps'. Every
+    Publisher writes its color (-c, BLUE by default) and its size (-z, 20 by
+    default) or, if the size is 0, a sequence number. The Subscriber
+    receives the samples of all the Publishers in turn. The samples are
+    printed as records if apps[index] has '--output-format jsonl'.
+    """
+    options = shape_main_options(apps[index])
+    topic = option_value(options, '-t', 'Square')
+    records = option_value(options, OUTPUT_FORMAT_OPTION) \
+            == RECORD_OUTPUT_FORMAT
+    if '-P' in options:
+        writers = [options]
+        lines = ['Create topic: ' + topic,
+                f'Create writer for topic: {topic} color: '
+                    + option_value(options, '-c', 'BLUE'),
+                'on_publication_matched()']
+    else:
+        writers = [shape_main_options(element) for element in apps
+                if is_publisher(element)]
+        lines = ['Create topic: ' + topic,
+                'Create reader for topic: ' + topic,
+                'on_subscription_matched()']
+    for i in range(samples):
+        writer = writers[i % len(writers)]
+        size = int(option_value(writer, '-z', 20)) \
+                or i // len(writers) + 1
+        if records:
+            lines.append(json.dumps({'event': 'sample',
+                    'ns': i * SYNTHETIC_LINE_PERIOD, 'seq': i + 1,
+                    'topic': topic,
+                    'instance': option_value(writer, '-c', 'BLUE'),
+                    'x': (i * 7) % 240, 'y': (i * 13) % 270, 'size': size},
+                separators=(',', ':')))
+            continue
+        line = (f'{topic:<10s} {option_value(writer, "-c", "BLUE"):<10s} '
+                f'{(i * 7) % 240:03d} {(i * 13) % 270:03d} [{size}]')
+        if int(option_value(writer, '--additional-payload-size', 0)) > 0:
+            line += ' {255}'
+        lines.append(line)
+    return [line + '\r\n' for line in lines]
+
+def synthetic_recording(apps, index, samples):
+    recording = EntityRecording()
+    for i, line in enumerate(synthetic_lines(apps, index, samples)):
+        recording.lines.append(line)
+        recording.stamps.append(i * SYNTHETIC_LINE_PERIOD)
+    recording.marks['spawn'] = 0
+    recording.marks['stop'] = len(recording.lines) * SYNTHETIC_LINE_PERIOD
+    return recording
+
+def synthetic_cases(suite, samples, output_format='text'):
+    """
+    Yields (check_function, apps, recordings) with synthetic output for the
+    first Test Case of 'suite' that uses every checking function. With the
+    'output_format' jsonl, the applications of the checking functions with
+    the attribute record_output print records.
+    """
+    seen = set()
+    for t_suite_dict in suite_dicts(suite).values():
+        for test_case_name, test_case_parameters in t_suite_dict.items():
+            check_function = get_check_function(test_case_name,
+                    test_case_parameters)
+            if check_function.__name__ in seen:
+                continue
+            seen.add(check_function.__name__)
+            apps = test_case_parameters['apps']
+            if output_format == RECORD_OUTPUT_FORMAT \
+                    and getattr(check_function, 'record_output', False):
+                apps = [f'{element} {OUTPUT_FORMAT_OPTION} '
+                        f'{RECORD_OUTPUT_FORMAT}' for element in apps]
+            yield check_function, apps, [
+                    synthetic_recording(apps, i, samples)
+                    for i in range(len(apps))]
+
+def recorded_cases(filenames):
+    """
+    Yields (check_function, apps, recordings) of the recording files (or
+    directories containing recording files) passed.
+    """
+    recording_files = []
+    for element in filenames:
+        if os.path.isdir(element):
+            recording_files += sorted(
+                    os.path.join(element, name) for name in os.listdir(element)
+                    if name.endswith(RECORDING_EXTENSION))
+        else:
+            recording_files.append(element)
+    for filename in recording_files:
+        header, recordings = load_recording(filename)
+        t_suite_dict = getattr(importlib.import_module(header['suite']),
+                header['suite_dict'], None)
+        if type(t_suite_dict) is not dict \
+                or header['test_case'] not in t_suite_dict:
+            print(f'Recording {filename} skipped: Test Case '
+                    f'<{header["test_case"]}> not found.')
+            continue
+        yield get_check_function(header['test_case'],
+                t_suite_dict[header['test_case']]), header['apps'], recordings
+
+def replay_subscribers(check_function, apps, recordings, timeout):
+    """
+    Replays the Publishers and then times the subscriber_steps() of every
+    Subscriber. Returns (elapsed seconds, samples read by the Subscribers).
+    """
+    samples_sent = []
+    last_sample_saved = []
+    for i, parameters in enumerate(apps):
+        if is_publisher(parameters):
+            samples_sent.append(queue.Queue())
+            last_sample_saved.append(queue.Queue())
+            publisher_steps(ReplayChild(recordings[i], timeout), parameters,
+                    len(samples_sent), samples_sent[-1],
+                    last_sample_saved[-1], False, timeout)
+
+    elapsed = 0
+    samples = 0
+    for i, parameters in enumerate(apps):
+        if is_publisher(parameters):
+            continue
+        child = ReplayChild(recordings[i], timeout)
+        start = time.perf_counter()
+        subscriber_steps(child, i, samples_sent, last_sample_saved, False,
+                timeout, check_function, apps=apps)
+        elapsed += time.perf_counter() - start
+        samples += sum(1 for stamp, line in recordings[i].complete_lines()
+                if stamp <= child.now and parse_sample(line) is not None)
+    return elapsed, samples
+
+def parse_benchmarks(suite, replay, samples, repeat, output_format='text',
+        timeout=15):
+    """ Cost per sample (us) of the checking functions. """
+    results = {}
+    if replay is not None:
+        cases = list(recorded_cases(replay))
+    else:
+        cases = list(synthetic_cases(suite, samples, output_format))
+
+    by_function = {}
+    for check_function, apps, recordings in cases:
+        by_function.setdefault(check_function.__name__, []).append(
+                (check_function, apps, recordings))
+
+    for name, function_cases in sorted(by_function.items()):
+        def run():
+            elapsed = 0
+            read = 0
+            # the checking functions print their results
+            with contextlib.redirect_stdout(io.StringIO()):
+                for check_function, apps, recordings in function_cases:
+                    case_elapsed, case_read = replay_subscribers(
+                            check_function, apps, recordings, timeout)
+                    elapsed += case_elapsed
+                    read += case_read
+            return (elapsed / read) if read else elapsed
+        # the samples read are the same in every repetition
+        with contextlib.redirect_stdout(io.StringIO()):
+            read = sum(replay_subscribers(*case, timeout)[1]
+                    for case in function_cases)
+        results[f'parse.{name}'] = result(measure(run, repeat),
+                'us/sample' if read else 'us', 1e6,
+                test_cases=len(function_cases), samples=read)
+
+    lines = synthetic_lines(['-P -t Square -z 0'], 0, samples)
+    def sample_pattern():
+        start = time.perf_counter()
+        for line in lines:
+            SAMPLE_PATTERN.search(line)
+        return (time.perf_counter() - start) / len(lines)
+    results['parse.sample_pattern'] = result(
+            measure(sample_pattern, repeat), 'us/line', 1e6,
+            samples=len(lines))
+    return results
+
+def junit_report(suites, test_cases):
+    """
+    JUnit report with 'suites' Test Suites of 'test_cases' Test Cases, as
+    interoperability_report generates it. One of every ten Test Cases
+    fails with a message like the ones of run_test().
+    """
+    message = '<table> <tr> <th/> <th> Expected Code </th> ' \
+            '<th> Code Produced </th> </tr></table>' \
+            + '<strong> Information Subscriber_1 </strong><br> ' \
+            + 'Square     BLUE       050 050 [20]<br>' * 40
+    xml = junitparser.JUnitXml()
+    for i in range(suites):
+        suite = junitparser.TestSuite(f'product_{i}---product_{i}')
+        for j in range(test_cases):
+            case = junitparser.TestCase(f'rtps_test_suite_1_Test_{j}')
+            case.time = 1.5
+            if j % 10 == 9:
+                case.result = [junitparser.Failure(message)]
+            suite.add_testcase(case)
+        suite.time = 1.5 * test_cases
+        xml.add_testsuite(suite)
+    return xml
+
+def junit_benchmarks(suite, suite_counts, repeat):
+    """ Write and parse time (ms) of the JUnit report. """
+    results = {}
+    test_cases = sum(len(t_suite_dict)
+            for t_suite_dict in suite_dicts(suite).values())
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'report.xml')
+        for suites in suite_counts:
+            xml = junit_report(suites, test_cases)
+            results[f'junit.write.suites_{suites:04d}'] = result(
+                    measure(lambda: xml.write(filename), repeat), 'ms', 1e3,
+                    test_cases=suites * test_cases)
+            def parse():
+                for element in junitparser.JUnitXml.fromfile(filename):
+                    for case in element:
+                        case.result
+            results[f'junit.parse.suites_{suites:04d}'] = result(
+                    measure(parse, repeat), 'ms', 1e3,
+                    test_cases=suites * test_cases)
+    return results
+
+def compare(results, baseline, threshold):
+    """
+    Prints the results and their change with respect to the baseline.
+    Returns the names of the results 'threshold' percent slower than the
+    baseline.
+    """
+    slower = []
+    print(f'{"benchmark":<60s} {"value":>12s} {"unit":<10s} '
+            f'{"baseline":>12s} {"change":>8s}')
+    for name, entry in sorted(results.items()):
+        line = f'{name:<60s} {entry["value"]:>12.3f} {entry["unit"]:<10s}'
+        reference = baseline.get(name)
+        if reference is not None and reference['unit'] == entry['unit']:
+            line += f' {reference["value"]:>12.3f}'
+            if reference['value'] > 0:
+                change = (entry['value'] / reference['value'] - 1) * 100
+                line += f' {change:>+7.1f}%'
+                if change > threshold:
+                    line += ' SLOWER'
+                    slower.append(name)
+                elif change < -threshold:
+                    line += ' FASTER'
+        print(line)
+    return slower
+
+class Arguments:
+    def parser():
+        parser = argparse.ArgumentParser(
+            description='Benchmarks of the costs the interoperability_report '
+                'adds to every Test Case: fixed cost of a Test Case, cost per '
+                'sample of the checking functions and cost of the JUnit '
+                'report. No shape_main application is run.',
+            add_help=True)
+        parser.add_argument('-b', '--benchmark',
+            nargs='+',
+            default=list(BENCHMARKS),
+            choices=BENCHMARKS,
+            help='Benchmarks to run. Default: all.')
+        parser.add_argument('-s', '--suite',
+            default='test_suite',
+            type=str,
+            metavar='test_suite_dictionary_file',
+            help='Test Suite whose Test Cases define the startup sleeps, the '
+                'checking functions and the number of Test Cases of the JUnit '
+                'report. Default: test_suite.')
+        parser.add_argument('--replay',
+            nargs='+',
+            default=None,
+            metavar='recording',
+            help='Recording files (or directories containing recording files, '
+                'see the --record option of interoperability_report) used to '
+                'benchmark the checking functions instead of synthetic '
+                'output.')
+        parser.add_argument('--samples',
+            default=500,
+            type=int,
+            help='Number of samples of the synthetic output of every '
+                'application. Default: 500.')
+        parser.add_argument('--output-format',
+            default='text',
+            choices=['text', RECORD_OUTPUT_FORMAT],
+            help='Output format of the synthetic output of the checking '
+                'functions with the attribute record_output (see the '
+                '--output-format option of interoperability_report). '
+                'Default: text.')
+        parser.add_argument('--suite-counts',
+            nargs='+',
+            default=[1, 10, 100],
+            type=int,
+            help='Number of Test Suites of the JUnit reports. '
+                'Default: 1 10 100.')
+        parser.add_argument('-n', '--repeat',
+            default=5,
+            type=int,
+            help='Number of times every benchmark is repeated. Default: 5.')
+        parser.add_argument('-o', '--output',
+            default=None,
+            type=str,
+            metavar='results_file',
+            help='JSON file where the results are saved.')
+        parser.add_argument('--baseline',
+            default=None,
+            type=str,
+            metavar='results_file',
+            help='JSON file with the results of a previous execution '
+                '(--output) to compare with.')
+        parser.add_argument('--threshold',
+            default=10.0,
+            type=float,
+            metavar='percent',
+            help='Change (percentage) with respect to the baseline from which '
+                'a result is flagged as SLOWER or FASTER. Default: 10.')
+        return parser
+
+def main():
+    parser = Arguments.parser()
+    args = parser.parse_args()
+    if args.repeat < 1 or args.samples < 1:
+        parser.error('--repeat and --samples must be greater than 0')
+
+    results = {}
+    if 'fixed' in args.benchmark:
+        results.update(fixed_benchmarks(args.suite, args.repeat))
+    if 'parse' in args.benchmark:
+        results.update(parse_benchmarks(args.suite, args.replay,
+                args.samples, args.repeat, args.output_format))
+    if 'junit' in args.benchmark:
+        results.update(junit_benchmarks(args.suite, args.suite_counts,
+                args.repeat))
+
+    baseline = {}
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+    slower = compare(results, baseline, args.threshold)
+    if slower:
+        print(f'{len(slower)} results slower than the baseline.')
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump({
+                    'format': RESULTS_FORMAT_VERSION,
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'cpus': os.cpu_count(),
+                    'suite': args.suite,
+                    'input': 'synthetic' if args.replay is None else 'replay',
+                    'output_format': args.output_format,
+                    'results': results},
+                file, indent=1, sort_keys=True)
+            file.write('\n')
+
+if __name__ == '__main__':
+    main()
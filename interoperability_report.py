@@ -20,11 +20,25 @@ import tempfile
 from os.path import exists
 import inspect
 import platform
+import os
+import queue
+import json
 
 if __name__ == "__main__" and platform.system() == "Darwin":
     multiprocessing.set_start_method('fork')
 
-from rtps_test_utilities import ReturnCode, log_message, basic_check, remove_ansi_colors
+from rtps_test_utilities import ReturnCode, log_message, basic_check, remove_ansi_colors, \
+    parse_record, SAMPLE_START_PATTERN, OUTPUT_FORMAT_OPTION, RECORD_OUTPUT_FORMAT, \
+    shape_main_options
+from rtps_recording import OutputRecorder, EntityRecording, ReplayChild, \
+    save_recording, load_recording, RECORDING_EXTENSION
+from rtps_accounting import PublishedSamples, account_samples, \
+    losses_are_failures
+from rtps_latency import latency_records, save_latency_records, \
+    TIMESTAMPS_OPTION, READ_PERIOD_OPTION, LATENCY_READ_PERIOD_MS
+from rtps_resources import ResourceSampler
+from rtps_soak import SoakCheck, soak_metrics, duration
+from rtps_workers import WorkerPool, application_help
 
 # This parameter is used to save the samples the Publisher sends.
 # MAX_SAMPLES_SAVED is the maximum number of samples saved.
@@ -65,76 +79,38 @@ def stop_process(child_process, timeout=30, poll_interval=0.2):
 
     return return_value
 
-def run_subscriber_shape_main(
-        name_executable: str,
-        parameters: str,
-        produced_code: "list[int]",
-        produced_code_index: int,
+def subscriber_steps(
+        child_sub: pexpect.spawnbase.SpawnBase,
         subscriber_index: int,
         samples_sent: "list[multiprocessing.Queue]",
         last_sample_saved: "list[multiprocessing.Queue]",
         verbosity: bool,
         timeout: int,
-        file: tempfile.TemporaryFile,
-        subscriber_finished: multiprocessing.Event,
-        publishers_finished: "list[multiprocessing.Event]",
-        check_function: "function"):
-
-    """ This function runs the subscriber shape_main application with
-        the specified parameters. Then it saves the
-        return code in the variable produced_code.
-
-        name_executable <<in>>: name of the shape_main application to run
-                as a Subscriber.
-        parameters <<in>>: shape_main application parameter list.
-        produced_code <<out>>: this variable will be overwritten with
-                the obtained ReturnCode.
-        produced_code_index <<in>>: index of the produced_code list
-                where the ReturnCode is saved.
-        subscriber_index <<in>>: index of the subscriber. For the first
-                subscriber it is 1, for the second 2, etc.
-        samples_sent <<in>>: list of multiprocessing Queues with the samples
-                the Publishers send. Element 1 of the list is for
-                Publisher 1, etc.
-        last_sample_saved <<in>>: list of multiprocessing Queues with the last
-                sample saved on samples_sent for each Publisher. Element 1 of
-                the list is for Publisher 1, etc.
+        check_function: "function",
+        recorder: OutputRecorder = None,
+        apps: "list[str]" = None):
+
+    """ This function processes the output of a subscriber shape_main
+        application (a running application or a recording) and returns
+        the ReturnCode obtained.
+
+        child_sub <<in>>: pexpect child of the Subscriber.
+        subscriber_index <<in>>: index of the subscriber.
+        samples_sent <<in>>: list of Queues with the samples the Publishers
+                send (see run_subscriber_shape_main).
+        last_sample_saved <<in>>: list of Queues with the last sample saved
+                on samples_sent for each Publisher.
         verbosity <<in>>: print debug information.
         timeout <<in>>: time pexpect waits until it matches a pattern.
-        file <<inout>>: temporal file to save shape_main application output.
-        subscriber_finished <<inout>>: object event from multiprocessing
-                that is set when the subscriber is finished.
-        publishers_finished <<inout>>: list of events from multiprocessing
-                that are set when the publishers are finished.
-                Element 1 of the list is for Publisher 1, etc.
         check_function <<in>>: function to check how the samples are received
-                by the Subscriber. By default it does not check anything.
-
-        The function runs the shape_main application as a Subscriber
-        with the parameters defined.
-        The Subscriber shape_main application follows the next steps:
-            * The topic is created.
-            * The Data Reader is created.
-            * The Data Reader matches with a Data Writer.
-            * The Data Reader detects the Data Writer as alive.
-            * The Data Reader receives data.
-
-        If the shape_main application passes one step, it prints a specific
-        string pattern. This function matches that pattern and and waits
-        for the next input string from the shape_main application. If the
-        shape_main application stops at some step, it prints an error message.
-        When this function matches an error string (or doesn't match
-        an expected pattern in the specified timeout),
-        the corresponding ReturnCode is saved in
-        produced_code[produced_code_index] and the process finishes.
+                by the Subscriber.
+        recorder <<inout>>: OutputRecorder of the Subscriber output, if any.
+                The checking function execution is marked on it.
+        apps <<in>>: list of shape_main application parameters of the Test
+                Case. It is passed to the checking functions that have an
+                'apps' parameter.
     """
 
-    # Step 1: run the executable
-    log_message(f'Running shape_main application Subscriber {subscriber_index}',
-            verbosity)
-    child_sub = pexpect.spawnu(f'{name_executable} {parameters}')
-    child_sub.logfile = file
-
     # Step 2: Check if the topic is created
     log_message(f'Subscriber {subscriber_index}: Waiting for topic creation',
             verbosity)
@@ -149,9 +125,9 @@ def run_subscriber_shape_main(
     )
 
     if index == 2 or index == 3:
-        produced_code[produced_code_index] = ReturnCode.TOPIC_NOT_CREATED
+        produced_code = ReturnCode.TOPIC_NOT_CREATED
     elif index == 1:
-        produced_code[produced_code_index] = ReturnCode.SUB_UNSUPPORTED_FEATURE
+        produced_code = ReturnCode.SUB_UNSUPPORTED_FEATURE
     elif index == 0:
         # Step 3: Check if the reader is created
         log_message(f'Subscriber {subscriber_index}: Waiting for DataReader '
@@ -169,17 +145,17 @@ def run_subscriber_shape_main(
         )
 
         if index == 3 or index == 4:
-            produced_code[produced_code_index] = ReturnCode.READER_NOT_CREATED
+            produced_code = ReturnCode.READER_NOT_CREATED
         elif index == 1:
-            produced_code[produced_code_index] = ReturnCode.FILTER_NOT_CREATED
+            produced_code = ReturnCode.FILTER_NOT_CREATED
         elif index == 2:
-            produced_code[produced_code_index] = ReturnCode.SUB_UNSUPPORTED_FEATURE
+            produced_code = ReturnCode.SUB_UNSUPPORTED_FEATURE
         elif index == 0:
             # Step 4: Read data or incompatible qos or deadline missed
             log_message(f'Subscriber {subscriber_index}: Waiting for data', verbosity)
             index = child_sub.expect(
                 [
-                    r'\[[0-9]+\]', # index = 0
+                    SAMPLE_START_PATTERN, # index = 0
                     'on_requested_incompatible_qos()', # index = 1
                     'on_requested_deadline_missed()', # index = 2
                     re.compile('not supported', re.IGNORECASE), # index = 3
@@ -191,13 +167,13 @@ def run_subscriber_shape_main(
             )
 
             if index == 1:
-                produced_code[produced_code_index] = ReturnCode.INCOMPATIBLE_QOS
+                produced_code = ReturnCode.INCOMPATIBLE_QOS
             elif index == 2:
-                produced_code[produced_code_index] = ReturnCode.DEADLINE_MISSED
+                produced_code = ReturnCode.DEADLINE_MISSED
             elif index == 4 or index == 5:
-                produced_code[produced_code_index] = ReturnCode.DATA_NOT_RECEIVED
+                produced_code = ReturnCode.DATA_NOT_RECEIVED
             elif index == 3:
-                produced_code[produced_code_index] = ReturnCode.SUB_UNSUPPORTED_FEATURE
+                produced_code = ReturnCode.SUB_UNSUPPORTED_FEATURE
             elif index == 0:
                 # Step 5: Receiving samples
                 log_message(f'Subscriber {subscriber_index}: Receiving samples',
@@ -206,70 +182,89 @@ def run_subscriber_shape_main(
                 # this is used to check how the samples are arriving
                 # to the Subscriber. By default it does not check
                 # anything and returns ReturnCode.OK.
-                produced_code[produced_code_index] = check_function(
-                    child_sub, samples_sent, last_sample_saved, timeout)
-
-    subscriber_finished.set()   # set subscriber as finished
-    log_message(f'Subscriber {subscriber_index}: Waiting for Publishers to '
-            'finish', verbosity)
-    for element in publishers_finished:
-        element.wait() # wait for all publishers to finish
-    # Stop process
-    if not stop_process(child_sub):
-        log_message(f'Subscriber {subscriber_index} process did not exit '
-                    'gracefully; it was forcefully terminated.',
-                    verbosity)
+                if recorder is not None:
+                    recorder.mark('check_start')
+                if 'apps' in inspect.signature(check_function).parameters:
+                    produced_code = check_function(child_sub, samples_sent,
+                        last_sample_saved, timeout, apps=apps)
+                else:
+                    produced_code = check_function(
+                        child_sub, samples_sent, last_sample_saved, timeout)
+                if recorder is not None:
+                    recorder.mark('check_end')
 
-    return
+    return produced_code
 
 
-def run_publisher_shape_main(
+def run_subscriber_shape_main(
         name_executable: str,
         parameters: str,
-        produced_code: "list[int]",
+        produced_code: "multiprocessing.Array",
         produced_code_index: int,
-        publisher_index: int,
-        samples_sent: multiprocessing.Queue,
-        last_sample_saved: multiprocessing.Queue,
+        subscriber_index: int,
+        samples_sent: "list[multiprocessing.Queue]",
+        last_sample_saved: "list[multiprocessing.Queue]",
         verbosity: bool,
         timeout: int,
         file: tempfile.TemporaryFile,
-        subscribers_finished: "list[multiprocessing.Event]",
-        publisher_finished: multiprocessing.Event):
+        subscriber_finished: multiprocessing.Event,
+        publishers_finished: "list[multiprocessing.Event]",
+        check_function: "function",
+        apps: "list[str]" = None,
+        resource_period: float = None,
+        stop_after: float = None,
+        worker: "rtps_workers.Worker" = None):
 
-    """ This function runs the publisher shape_main application with
+    """ This function runs the subscriber shape_main application with
         the specified parameters. Then it saves the
         return code in the variable produced_code.
 
-        name_executable: <<in>> name of the shape_main application to run
-                as a Publisher.
+        name_executable <<in>>: name of the shape_main application to run
+                as a Subscriber.
         parameters <<in>>: shape_main application parameter list.
-        produced_code <<out>>: this variable will be overwritten with
-                the obtained ReturnCode.
+        produced_code <<out>>: this shared array will be overwritten with
+                the value of the obtained ReturnCode.
         produced_code_index <<in>>: index of the produced_code list
                 where the ReturnCode is saved.
-        publisher_index <<in>>: index of the publisher. For the first
-                publisher it is 1, for the second 2, etc.
-        samples_sent <<out>>: this variable contains the samples
-                the Publisher sends.
-        last_sample_saved <<out>>: this variable contains the last sample
-                saved on samples_sent.
+        subscriber_index <<in>>: index of the subscriber. For the first
+                subscriber it is 1, for the second 2, etc.
+        samples_sent <<in>>: list of multiprocessing Queues with the samples
+                the Publishers send. Element 1 of the list is for
+                Publisher 1, etc.
+        last_sample_saved <<in>>: list of multiprocessing Queues with the last
+                sample saved on samples_sent for each Publisher. Element 1 of
+                the list is for Publisher 1, etc.
         verbosity <<in>>: print debug information.
         timeout <<in>>: time pexpect waits until it matches a pattern.
         file <<inout>>: temporal file to save shape_main application output.
-        subscribers_finished <<inout>>: list of events from multiprocessing
-                that are set when the subscribers are finished.
-                Element 1 of the list is for Subscriber 1, etc.
-        publisher_finished <<inout>>: object event from multiprocessing
-                that is set when the publisher is finished.
+        subscriber_finished <<inout>>: object event from multiprocessing
+                that is set when the subscriber is finished.
+        publishers_finished <<inout>>: list of events from multiprocessing
+                that are set when the publishers are finished.
+                Element 1 of the list is for Publisher 1, etc.
+        check_function <<in>>: function to check how the samples are received
+                by the Subscriber. By default it does not check anything.
+        apps <<in>>: list of shape_main application parameters of the Test
+                Case, passed to the checking function if it accepts them.
+        resource_period <<in>>: if set, the resources the shape_main
+                application uses are recorded every resource_period seconds
+                (see rtps_resources.py).
+        stop_after <<in>>: if set, the shape_main application is stopped
+                (SIGINT) this number of seconds after it was run, without
+                waiting for the Publishers to finish. It is only stopped
+                once the checking function is finished.
+        worker <<in>>: if set, the shape_main application is not run, this
+                persistent application runs the parameters instead (see
+                rtps_workers.py).
 
-        The function runs the shape_main application as a Publisher
+        The function runs the shape_main application as a Subscriber
         with the parameters defined.
-        The Publisher shape_main application follows the next steps:
+        The Subscriber shape_main application follows the next steps:
             * The topic is created.
-            * The Data Writer is created.
-            * The Data Writer matches with a Data Reader.
-            * The Data Writer sends data.
+            * The Data Reader is created.
+            * The Data Reader matches with a Data Writer.
+            * The Data Reader detects the Data Writer as alive.
+            * The Data Reader receives data.
 
         If the shape_main application passes one step, it prints a specific
         string pattern. This function matches that pattern and and waits
@@ -282,10 +277,89 @@ def run_publisher_shape_main(
     """
 
     # Step 1: run the executable
-    log_message(f'Running shape_main application Publisher {publisher_index}',
+    log_message(f'Running shape_main application Subscriber {subscriber_index}',
             verbosity)
-    child_pub = pexpect.spawnu(f'{name_executable} {parameters}')
-    child_pub.logfile = file
+    recorder = OutputRecorder(file)
+    recorder.mark('spawn')
+    if worker is not None:
+        child_sub = worker.run(parameters)
+    else:
+        child_sub = pexpect.spawnu(f'{name_executable} {parameters}')
+    child_sub.logfile = recorder
+    spawn_time = time.monotonic()
+    sampler = None
+    if resource_period is not None:
+        sampler = ResourceSampler(child_sub.pid, recorder, resource_period)
+        sampler.start()
+
+    produced_code[produced_code_index] = subscriber_steps(
+            child_sub=child_sub,
+            subscriber_index=subscriber_index,
+            samples_sent=samples_sent,
+            last_sample_saved=last_sample_saved,
+            verbosity=verbosity,
+            timeout=timeout,
+            check_function=check_function,
+            recorder=recorder,
+            apps=apps).value
+
+    if stop_after is not None:
+        log_message(f'Subscriber {subscriber_index}: Stopping after '
+                f'{stop_after} seconds', verbosity)
+        # Drain subscriber output until it is stopped
+        while time.monotonic() - spawn_time < stop_after:
+            try:
+                child_sub.read_nonblocking(1024, timeout=0.1)
+            except pexpect.TIMEOUT:
+                pass
+            except pexpect.EOF:
+                break
+        recorder.mark('stop_after')
+
+    subscriber_finished.set()   # set subscriber as finished
+    if stop_after is None:
+        log_message(f'Subscriber {subscriber_index}: Waiting for Publishers '
+                'to finish', verbosity)
+        for element in publishers_finished:
+            element.wait() # wait for all publishers to finish
+    # Stop process
+    if sampler is not None:
+        sampler.stop()
+    recorder.mark('eof' if child_sub.flag_eof else 'stop')
+    if not stop_process(child_sub):
+        log_message(f'Subscriber {subscriber_index} process did not exit '
+                    'gracefully; it was forcefully terminated.',
+                    verbosity)
+
+    return
+
+
+def publisher_steps(
+        child_pub: pexpect.spawnbase.SpawnBase,
+        parameters: str,
+        publisher_index: int,
+        samples_sent: multiprocessing.Queue,
+        last_sample_saved: multiprocessing.Queue,
+        verbosity: bool,
+        timeout: int,
+        match_timeout: int = None):
+
+    """ This function processes the output of a publisher shape_main
+        application (a running application or a recording) and returns
+        the ReturnCode obtained.
+
+        child_pub <<in>>: pexpect child of the Publisher.
+        parameters <<in>>: shape_main application parameter list.
+        publisher_index <<in>>: index of the publisher.
+        samples_sent <<out>>: this variable contains the samples
+                the Publisher sends.
+        last_sample_saved <<out>>: this variable contains the last sample
+                saved on samples_sent.
+        verbosity <<in>>: print debug information.
+        timeout <<in>>: time pexpect waits until it matches a pattern.
+        match_timeout <<in>>: if set, time pexpect waits until the Data
+                Writer matches a Data Reader, instead of timeout.
+    """
 
     # Step 2: Check if the topic is created
     log_message(f'Publisher {publisher_index}: Waiting for topic creation',
@@ -301,9 +375,9 @@ def run_publisher_shape_main(
     )
 
     if index == 2 or index == 3:
-        produced_code[produced_code_index] = ReturnCode.TOPIC_NOT_CREATED
+        produced_code = ReturnCode.TOPIC_NOT_CREATED
     elif index == 1:
-        produced_code[produced_code_index] = ReturnCode.PUB_UNSUPPORTED_FEATURE
+        produced_code = ReturnCode.PUB_UNSUPPORTED_FEATURE
     elif index == 0:
         # Step 3: Check if the writer is created
         log_message(f'Publisher {publisher_index}: Waiting for DataWriter '
@@ -318,9 +392,9 @@ def run_publisher_shape_main(
             timeout
         )
         if index == 2 or index == 3:
-            produced_code[produced_code_index] = ReturnCode.WRITER_NOT_CREATED
+            produced_code = ReturnCode.WRITER_NOT_CREATED
         elif index == 1:
-            produced_code[produced_code_index] = ReturnCode.PUB_UNSUPPORTED_FEATURE
+            produced_code = ReturnCode.PUB_UNSUPPORTED_FEATURE
         elif index == 0:
             # Step 4: Check if the writer matches the reader
             log_message(f'Publisher {publisher_index}: Waiting for matching '
@@ -333,14 +407,14 @@ def run_publisher_shape_main(
                     pexpect.TIMEOUT, # index = 3
                     pexpect.EOF # index == 4
                 ],
-                timeout
+                timeout if match_timeout is None else match_timeout
             )
             if index == 3 or index == 4:
-                produced_code[produced_code_index] = ReturnCode.READER_NOT_MATCHED
+                produced_code = ReturnCode.READER_NOT_MATCHED
             elif index == 1:
-                produced_code[produced_code_index] = ReturnCode.INCOMPATIBLE_QOS
+                produced_code = ReturnCode.INCOMPATIBLE_QOS
             elif index == 2:
-                produced_code[produced_code_index] = ReturnCode.PUB_UNSUPPORTED_FEATURE
+                produced_code = ReturnCode.PUB_UNSUPPORTED_FEATURE
             elif index == 0:
                 # In the case that the option -w is selected, the Publisher
                 # saves the samples sent in order, so the Subscriber can check
@@ -351,7 +425,7 @@ def run_publisher_shape_main(
                 if '-w ' in parameters or parameters.endswith('-w'):
                     # Step 5: Check whether the writer sends the samples
                     index = child_pub.expect([
-                            r'\[[0-9]+\]', # index = 0
+                            SAMPLE_START_PATTERN, # index = 0
                             'on_offered_deadline_missed()', # index = 1
                             re.compile('not supported', re.IGNORECASE), # index = 2
                             pexpect.TIMEOUT, # index = 3
@@ -359,28 +433,33 @@ def run_publisher_shape_main(
                         ],
                         timeout)
                     if index == 1:
-                        produced_code[produced_code_index] = ReturnCode.DEADLINE_MISSED
+                        produced_code = ReturnCode.DEADLINE_MISSED
                     elif index == 3 or index == 4:
-                        produced_code[produced_code_index] = ReturnCode.DATA_NOT_SENT
+                        produced_code = ReturnCode.DATA_NOT_SENT
                     elif index == 2:
-                        produced_code[produced_code_index] = ReturnCode.PUB_UNSUPPORTED_FEATURE
+                        produced_code = ReturnCode.PUB_UNSUPPORTED_FEATURE
                     elif index == 0:
-                        produced_code[produced_code_index] = ReturnCode.OK
+                        produced_code = ReturnCode.OK
                         log_message(f'Publisher {publisher_index}: Sending '
                                 'samples', verbosity)
                         last_sample = ''
                         for x in range(0, MAX_SAMPLES_SAVED, 1):
                             # At this point, at least one sample has been printed
                             # Therefore, that sample is added to samples_sent.
-                            pub_string = re.search(r'[0-9]+ [0-9]+ \[[0-9]+\]',
-                                    child_pub.before + child_pub.after)
-                            if not pub_string:
-                                produced_code[produced_code_index] = ReturnCode.DATA_NOT_CORRECT
-                                break
-                            last_sample = pub_string.group(0)
+                            record = parse_record(child_pub.after)
+                            if record is not None:
+                                last_sample = (f'{record["x"]:03d} '
+                                        f'{record["y"]:03d} [{record["size"]}]')
+                            else:
+                                pub_string = re.search(r'[0-9]+ [0-9]+ \[[0-9]+\]',
+                                        child_pub.before + child_pub.after)
+                                if not pub_string:
+                                    produced_code = ReturnCode.DATA_NOT_CORRECT
+                                    break
+                                last_sample = pub_string.group(0)
                             samples_sent.put(last_sample)
                             index = child_pub.expect([
-                                    r'\[[0-9]+\]', # index = 0
+                                    SAMPLE_START_PATTERN, # index = 0
                                     'on_offered_deadline_missed()', # index = 1
                                     re.compile('not supported', re.IGNORECASE), # index = 2
                                     pexpect.TIMEOUT, # index = 3
@@ -388,17 +467,120 @@ def run_publisher_shape_main(
                                 ],
                                 timeout)
                             if index == 1:
-                                produced_code[produced_code_index] = ReturnCode.DEADLINE_MISSED
+                                produced_code = ReturnCode.DEADLINE_MISSED
                                 break
                             elif index == 2:
-                                produced_code[produced_code_index] = ReturnCode.PUB_UNSUPPORTED_FEATURE
+                                produced_code = ReturnCode.PUB_UNSUPPORTED_FEATURE
                                 break
                             elif index == 3 or index == 4:
-                                produced_code[produced_code_index] = ReturnCode.DATA_NOT_SENT
+                                produced_code = ReturnCode.DATA_NOT_SENT
                                 break
                         last_sample_saved.put(last_sample)
                 else:
-                    produced_code[produced_code_index] = ReturnCode.OK
+                    produced_code = ReturnCode.OK
+
+    return produced_code
+
+
+def run_publisher_shape_main(
+        name_executable: str,
+        parameters: str,
+        produced_code: "multiprocessing.Array",
+        produced_code_index: int,
+        publisher_index: int,
+        samples_sent: multiprocessing.Queue,
+        last_sample_saved: multiprocessing.Queue,
+        verbosity: bool,
+        timeout: int,
+        file: tempfile.TemporaryFile,
+        subscribers_finished: "list[multiprocessing.Event]",
+        publisher_finished: multiprocessing.Event,
+        stop_after: float = None,
+        resource_period: float = None,
+        worker: "rtps_workers.Worker" = None,
+        match_timeout: int = None):
+
+    """ This function runs the publisher shape_main application with
+        the specified parameters. Then it saves the
+        return code in the variable produced_code.
+
+        name_executable: <<in>> name of the shape_main application to run
+                as a Publisher.
+        parameters <<in>>: shape_main application parameter list.
+        produced_code <<out>>: this shared array will be overwritten with
+                the value of the obtained ReturnCode.
+        produced_code_index <<in>>: index of the produced_code list
+                where the ReturnCode is saved.
+        publisher_index <<in>>: index of the publisher. For the first
+                publisher it is 1, for the second 2, etc.
+        samples_sent <<out>>: this variable contains the samples
+                the Publisher sends.
+        last_sample_saved <<out>>: this variable contains the last sample
+                saved on samples_sent.
+        verbosity <<in>>: print debug information.
+        timeout <<in>>: time pexpect waits until it matches a pattern.
+        file <<inout>>: temporal file to save shape_main application output.
+        subscribers_finished <<inout>>: list of events from multiprocessing
+                that are set when the subscribers are finished.
+                Element 1 of the list is for Subscriber 1, etc.
+        publisher_finished <<inout>>: object event from multiprocessing
+                that is set when the publisher is finished.
+        stop_after <<in>>: if set, the shape_main application is stopped
+                (SIGINT) this number of seconds after it was run, while the
+                Subscribers are still running. It is only stopped once the
+                Publisher steps are finished.
+        resource_period <<in>>: if set, the resources the shape_main
+                application uses are recorded every resource_period seconds
+                (see rtps_resources.py).
+        worker <<in>>: if set, the shape_main application is not run, this
+                persistent application runs the parameters instead (see
+                rtps_workers.py).
+        match_timeout <<in>>: if set, time the Publisher waits until it
+                matches a Subscriber, instead of timeout.
+
+        The function runs the shape_main application as a Publisher
+        with the parameters defined.
+        The Publisher shape_main application follows the next steps:
+            * The topic is created.
+            * The Data Writer is created.
+            * The Data Writer matches with a Data Reader.
+            * The Data Writer sends data.
+
+        If the shape_main application passes one step, it prints a specific
+        string pattern. This function matches that pattern and and waits
+        for the next input string from the shape_main application. If the
+        shape_main application stops at some step, it prints an error message.
+        When this function matches an error string (or doesn't match
+        an expected pattern in the specified timeout),
+        the corresponding ReturnCode is saved in
+        produced_code[produced_code_index] and the process finishes.
+    """
+
+    # Step 1: run the executable
+    log_message(f'Running shape_main application Publisher {publisher_index}',
+            verbosity)
+    recorder = OutputRecorder(file)
+    recorder.mark('spawn')
+    if worker is not None:
+        child_pub = worker.run(parameters)
+    else:
+        child_pub = pexpect.spawnu(f'{name_executable} {parameters}')
+    child_pub.logfile = recorder
+    spawn_time = time.monotonic()
+    sampler = None
+    if resource_period is not None:
+        sampler = ResourceSampler(child_pub.pid, recorder, resource_period)
+        sampler.start()
+
+    produced_code[produced_code_index] = publisher_steps(
+            child_pub=child_pub,
+            parameters=parameters,
+            publisher_index=publisher_index,
+            samples_sent=samples_sent,
+            last_sample_saved=last_sample_saved,
+            verbosity=verbosity,
+            timeout=timeout,
+            match_timeout=match_timeout).value
 
     log_message(f'Publisher {publisher_index}: Waiting for Subscribers to finish',
             verbosity)
@@ -407,6 +589,14 @@ def run_publisher_shape_main(
         if all(e.is_set() for e in subscribers_finished):
             break
 
+        if (stop_after is not None
+                and time.monotonic() - spawn_time >= stop_after):
+            log_message(f'Publisher {publisher_index}: Stopping after '
+                    f'{stop_after} seconds', verbosity)
+            stop_after = None
+            recorder.mark('stop_after')
+            child_pub.sendintr()
+
         # Drain publisher output
         try:
             child_pub.read_nonblocking(1024, timeout=0.1)
@@ -416,6 +606,9 @@ def run_publisher_shape_main(
             break
     publisher_finished.set()   # set publisher as finished
     # Stop process
+    if sampler is not None:
+        sampler.stop()
+    recorder.mark('eof' if child_pub.flag_eof else 'stop')
     if not stop_process(child_pub):
         log_message(f'Publisher {publisher_index} process did not exit '
                     'gracefully; it was forcefully terminated.',
@@ -424,6 +617,91 @@ def run_publisher_shape_main(
     return
 
 
+def check_sample_accounting(
+    parameters: "list[str]",
+    recordings: "list[EntityRecording]",
+    entity_type: "list[str]",
+    return_codes: "list[ReturnCode]",
+    verbosity: bool):
+
+    """ Join the samples printed by the Publishers (option -w) with the
+        samples received by every Subscriber and log the accounting of every
+        instance: delivered, lost, duplicated and reordered samples.
+
+        parameters <<in>>: list of shape_main application parameters.
+        recordings <<in>>: list of EntityRecording, one for each entity.
+        entity_type <<in>>: list of entity names (Publisher_1, etc).
+        return_codes <<inout>>: list of ReturnCodes, one for each entity.
+                If a Subscriber must receive all the samples of an instance
+                sent by one Publisher (see losses_are_failures()) and some
+                of them were lost, its ReturnCode is changed from OK to
+                DATA_NOT_CORRECT.
+    """
+    published = PublishedSamples()
+    for i in range(0, len(parameters)):
+        if ('-P ' in parameters[i] or parameters[i].endswith('-P')):
+            published.add_output(i, recordings[i].text)
+    if not published.samples:
+        return  # the Publishers do not print the samples sent
+
+    for i in range(0, len(parameters)):
+        if not ('-S ' in parameters[i] or parameters[i].endswith('-S')):
+            continue
+        accounts = account_samples(published, recordings[i].text)
+        for (topic, instance), account in accounts.items():
+            log_message(f'{entity_type[i]} {topic} {instance}: {account}',
+                    verbosity)
+            if account.lost == 0 or return_codes[i] != ReturnCode.OK:
+                continue
+            publishers = published.publishers[(topic, instance)]
+            if len(publishers) == 1 and losses_are_failures(
+                    parameters[next(iter(publishers))], parameters[i]):
+                print(f'{entity_type[i]}: {account.lost} samples of '
+                        f'{topic} {instance} lost')
+                return_codes[i] = ReturnCode.DATA_NOT_CORRECT
+
+def report_latency(
+    latency_report: str,
+    test_info: dict,
+    parameters: "list[str]",
+    recordings: "list[EntityRecording]",
+    entity_type: "list[str]",
+    verbosity: bool):
+
+    """ Append the latency of the samples received by every Subscriber
+        (see rtps_latency.py) to the latency report file.
+    """
+    records = latency_records(test_info, parameters, recordings, entity_type)
+    for record in records:
+        log_message(f'{record["entity"]} latency (us): '
+                f'min {record["min_us"]}, p50 {record["p50_us"]}, '
+                f'p99 {record["p99_us"]}, max {record["max_us"]} '
+                f'({record["count"]} samples)', verbosity)
+    save_latency_records(latency_report, records)
+
+def report_metrics(
+    metrics_function: "function",
+    benchmark_report: str,
+    test_info: dict,
+    parameters: "list[str]",
+    recordings: "list[EntityRecording]",
+    entity_type: "list[str]"):
+
+    """ Compute the metrics of a Test Case with its metrics_function, print
+        them and append them to the benchmark report file (JSON lines),
+        if any.
+
+        The metrics_function receives the list of shape_main application
+        parameters, the list of EntityRecording and the list of entity names,
+        and returns a dictionary that can be serialized to JSON.
+    """
+    metrics = metrics_function(parameters, recordings, entity_type)
+    print(f'{test_info["test_case_name"]} metrics: {json.dumps(metrics)}')
+    if benchmark_report is not None:
+        with open(benchmark_report, 'a') as file:
+            file.write(json.dumps(dict(test_info, apps=parameters,
+                    metrics=metrics)) + '\n')
+
 def run_test(
     name_executable_pub:str,
     name_executable_sub:str,
@@ -432,7 +710,18 @@ def run_test(
     expected_codes: "list[str]",
     verbosity: bool,
     timeout: int,
-    check_function: "function"):
+    check_function: "function",
+    record_filename: str = None,
+    test_info: dict = None,
+    latency_report: str = None,
+    startup_delay: "float | list[float]" = 1,
+    metrics_function: "function" = None,
+    benchmark_report: str = None,
+    stop_after: "dict[int, float]" = None,
+    resource_period: float = None,
+    worker_pool: WorkerPool = None,
+    match_timeout: int = None,
+    sample_accounting: bool = False):
 
     """ Run the Publisher and the Subscriber applications and check
         the actual and the expected ReturnCode.
@@ -449,6 +738,36 @@ def run_test(
         timeout <<in>>: time pexpect waits until it matches a pattern.
         check_function <<in>>: function to check how the samples are received
                 by the Subscriber. By default it does not check anything.
+        record_filename <<in>>: if set, the output of the shape_main
+                applications is saved in this recording file.
+        test_info <<in>>: information about the Test Case (test suite, test
+                case and product names) added to the header of the recording
+                file and to the latency report.
+        latency_report <<in>>: if set, the latency of the samples received
+                by every Subscriber is appended to this file.
+        startup_delay <<in>>: time (seconds) waited before running each
+                shape_main application, or list with the time for each
+                element of 'parameters'.
+        metrics_function <<in>>: function that computes the metrics of the
+                Test Case from the shape_main applications output, if any.
+        benchmark_report <<in>>: if set, the metrics are appended to this
+                file.
+        stop_after <<in>>: dictionary index of a Publisher or a Subscriber
+                in 'parameters' -> seconds after which its shape_main
+                application is stopped while the rest of the applications are
+                running (see run_publisher_shape_main and
+                run_subscriber_shape_main).
+        resource_period <<in>>: if set, the resources every shape_main
+                application uses are recorded every resource_period seconds.
+        worker_pool <<inout>>: if set, the shape_main applications that
+                support it are taken from this pool of persistent
+                applications instead of being run (see rtps_workers.py).
+        match_timeout <<in>>: if set, time the Publishers wait until they
+                match a Subscriber, instead of timeout (for Subscribers run
+                with a startup_delay longer than timeout).
+        sample_accounting <<in>>: if set, the samples printed by the
+                Publishers are joined with the samples received by every
+                Subscriber (see check_sample_accounting).
 
         The function runs several different processes: one for each Publisher
         and one for each Subscriber shape_main application.
@@ -472,12 +791,14 @@ def run_test(
     # many strings of parameters we have.
     num_entities = len(parameters)
 
-    # Manager is a shared memory section where all processes can access.
-    # 'return_codes' is a list of elements where the different processes
-    # (publishers and subscribers shape_main applications) copy their ReturnCode.
-    # These ReturnCodes are identified by the index within the list,
+    # 'shared_codes' is an array in shared memory where the different processes
+    # (publishers and subscribers shape_main applications) copy the value of
+    # their ReturnCode. Writing an element is a store in shared memory, there
+    # is no server process involved, so it scales with the number of entities.
+    # These ReturnCodes are identified by the index within the array,
     # every index identifies one shape_main application. Therefore, only one
-    # shape_main application must modify one element of the list.
+    # shape_main application must modify one element of the array (and no
+    # lock is needed).
     # Once all processes are finished, the list 'return_codes' contains
     # the ReturnCode in the corresponding index. This index is set manually
     # and we need it in order to use it later.
@@ -488,8 +809,8 @@ def run_test(
     #   Code contains:
     #     - return_codes[0] contains Publisher shape_main application ReturnCode
     #     - return_codes[1] contains Subscriber shape_main application ReturnCode
-    manager = multiprocessing.Manager()
-    return_codes = manager.list(range(num_entities))
+    shared_codes = multiprocessing.Array('i',
+            [ReturnCode.NO_RESULT.value] * num_entities, lock=False)
     samples_sent = [] # used for storing the samples the Publishers send.
                       # It is a list with one Queue for each Publisher.
     last_sample_saved = [] # used for storing the last value sent by each Publisher.
@@ -508,6 +829,8 @@ def run_test(
     shape_main_application_output = []
     # list of processes, one for each entity
     entity_process = []
+    # list of persistent applications (or None), one for each entity
+    workers = []
     # list of shape_main application outputs, edited to use in the html code.
     shape_main_application_output_edited = []
     # Create these elements earlier because they are needed
@@ -525,15 +848,25 @@ def run_test(
                 'application parameters. Neither Publisher or Subscriber '
                 'defined.')
 
+    if not isinstance(startup_delay, list):
+        startup_delay = [startup_delay] * num_entities
+
     # Create and run the processes for the different shape_main applications
     for i in range(0, num_entities):
+        if worker_pool is not None:
+            workers.append(worker_pool.acquire(
+                    name_executable_pub if ('-P ' in parameters[i]
+                        or parameters[i].endswith('-P'))
+                    else name_executable_sub))
+        else:
+            workers.append(None)
         if ('-P ' in parameters[i] or parameters[i].endswith('-P')):
             entity_process.append(multiprocessing.Process(
                     target=run_publisher_shape_main,
                     kwargs={
                         'name_executable':name_executable_pub,
                         'parameters':parameters[i],
-                        'produced_code':return_codes,
+                        'produced_code':shared_codes,
                         'produced_code_index':i,
                         'publisher_index':publisher_number+1,
                         'samples_sent':samples_sent[publisher_number],
@@ -542,22 +875,26 @@ def run_test(
                         'timeout':timeout,
                         'file':temporary_file[i],
                         'subscribers_finished':subscribers_finished,
-                        'publisher_finished':publishers_finished[publisher_number]}))
+                        'publisher_finished':publishers_finished[publisher_number],
+                        'stop_after':(stop_after or {}).get(i),
+                        'resource_period':resource_period,
+                        'worker':workers[i],
+                        'match_timeout':match_timeout}))
             publisher_number += 1
             entity_type.append(f'Publisher_{publisher_number}')
-            time.sleep(1)
+            time.sleep(startup_delay[i])
 
         elif('-S ' in parameters[i] or parameters[i].endswith('-S')):
-            # Wait 1 second before running the subscriber to avoid conflicts between
-            # the programs on startup
-            time.sleep(1)
+            # Wait startup_delay seconds (1 by default) before running the
+            # subscriber to avoid conflicts between the programs on startup
+            time.sleep(startup_delay[i])
 
             entity_process.append(multiprocessing.Process(
                     target=run_subscriber_shape_main,
                     kwargs={
                         'name_executable':name_executable_sub,
                         'parameters':parameters[i],
-                        'produced_code':return_codes,
+                        'produced_code':shared_codes,
                         'produced_code_index':i,
                         'subscriber_index':subscriber_number+1,
                         'samples_sent':samples_sent,
@@ -567,7 +904,11 @@ def run_test(
                         'file':temporary_file[i],
                         'subscriber_finished':subscribers_finished[subscriber_number],
                         'publishers_finished':publishers_finished,
-                        'check_function':check_function}))
+                        'check_function':check_function,
+                        'apps':parameters,
+                        'resource_period':resource_period,
+                        'stop_after':(stop_after or {}).get(i),
+                        'worker':workers[i]}))
             subscriber_number += 1
             entity_type.append(f'Subscriber_{subscriber_number}')
         else:
@@ -579,13 +920,44 @@ def run_test(
 
     for element in entity_process:
         element.join()     # Wait until the processes finish
+    for worker in workers:
+        if worker is not None:
+            worker_pool.release(worker)
+    # NO_RESULT if the process did not save any ReturnCode
+    return_codes = [ReturnCode(code) for code in shared_codes]
 
     log_message('Reading shape_main application console output from '
                 'temporary files',
                 verbosity)
-    for element in temporary_file:
-        element.seek(0)
-        shape_main_application_output.append(element.read())
+    recordings = [EntityRecording.from_file(element)
+            for element in temporary_file]
+    for element in recordings:
+        shape_main_application_output.append(element.text)
+
+    if sample_accounting:
+        check_sample_accounting(parameters, recordings, entity_type,
+                return_codes, verbosity)
+
+    if record_filename is not None:
+        header = dict(test_info or {},
+                test_case_name=test_case.name,
+                apps=parameters,
+                entities=entity_type,
+                expected_codes=[code.name for code in expected_codes],
+                produced_codes=[code.name for code in return_codes],
+                timeout=timeout,
+                match_timeout=match_timeout)
+        save_recording(record_filename, header, recordings)
+        log_message(f'Recording saved in {record_filename}', verbosity)
+
+    if latency_report is not None:
+        report_latency(latency_report, dict(test_info or {},
+                test_case_name=test_case.name), parameters, recordings,
+                entity_type, verbosity)
+    if metrics_function is not None:
+        report_metrics(metrics_function, benchmark_report,
+                dict(test_info or {}, test_case_name=test_case.name),
+                parameters, recordings, entity_type)
 
     # create an attribute for each entity that will contain their parameters
     for i in range(0, num_entities):
@@ -647,6 +1019,164 @@ def run_test(
     for element in temporary_file:
         element.close()
 
+def replay_test(
+    header: dict,
+    recordings: "list[EntityRecording]",
+    expected_codes: "list[ReturnCode]",
+    verbosity: bool,
+    check_function: "function",
+    latency_report: str = None,
+    metrics_function: "function" = None,
+    benchmark_report: str = None,
+    sample_accounting: bool = False):
+
+    """ Replay a recording of a Test Case and check the actual and the
+        expected ReturnCode. No shape_main application is run.
+
+        header <<in>>: header of the recording file.
+        recordings <<in>>: list of EntityRecording, one for each entity.
+        expected_codes <<in>>: list of ReturnCodes the Publishers and
+                the Subscribers would obtain in a non error situation.
+        verbosity <<in>>: print debug information.
+        check_function <<in>>: function to check how the samples are received
+                by the Subscriber.
+        latency_report <<in>>: if set, the latency of the samples received
+                by every Subscriber is appended to this file.
+        metrics_function <<in>>: function that computes the metrics of the
+                Test Case from the recordings, if any.
+        benchmark_report <<in>>: if set, the metrics are appended to this
+                file.
+        sample_accounting <<in>>: if set, the samples printed by the
+                Publishers are joined with the samples received by every
+                Subscriber (see check_sample_accounting).
+
+        The Publishers are replayed first, so the samples they sent are
+        available for the checking functions of the Subscribers.
+        Returns True if the codes obtained are the expected ones.
+    """
+    parameters = header['apps']
+    timeout = header['timeout']
+    num_entities = len(parameters)
+    return_codes = [None] * num_entities
+    samples_sent = []
+    last_sample_saved = []
+
+    for i in range(0, num_entities):
+        if ('-P ' in parameters[i] or parameters[i].endswith('-P')):
+            samples_sent.append(queue.Queue())
+            last_sample_saved.append(queue.Queue())
+            return_codes[i] = publisher_steps(
+                    child_pub=ReplayChild(recordings[i], timeout),
+                    parameters=parameters[i],
+                    publisher_index=len(samples_sent),
+                    samples_sent=samples_sent[-1],
+                    last_sample_saved=last_sample_saved[-1],
+                    verbosity=verbosity,
+                    timeout=timeout,
+                    match_timeout=header.get('match_timeout'))
+
+    subscriber_number = 0
+    for i in range(0, num_entities):
+        if ('-S ' in parameters[i] or parameters[i].endswith('-S')):
+            subscriber_number += 1
+            return_codes[i] = subscriber_steps(
+                    child_sub=ReplayChild(recordings[i], timeout),
+                    subscriber_index=subscriber_number,
+                    samples_sent=samples_sent,
+                    last_sample_saved=last_sample_saved,
+                    verbosity=verbosity,
+                    timeout=timeout,
+                    check_function=check_function,
+                    apps=parameters)
+
+    if sample_accounting:
+        check_sample_accounting(parameters, recordings, header['entities'],
+                return_codes, verbosity)
+    test_info = {key: header[key] for key in ('suite', 'suite_dict',
+            'test_case', 'test_case_name', 'publisher', 'subscriber')
+            if key in header}
+    if latency_report is not None:
+        report_latency(latency_report, test_info, parameters, recordings,
+                header['entities'], verbosity)
+    if metrics_function is not None:
+        report_metrics(metrics_function, benchmark_report, test_info,
+                parameters, recordings, header['entities'])
+
+    test_result_correct = True
+    for i in range(0, num_entities):
+        if expected_codes[i] != return_codes[i]:
+            test_result_correct = False
+
+    if test_result_correct:
+        print(f'{header["test_case_name"]} : OK')
+    else:
+        print(f'{header["test_case_name"]} : ERROR')
+        for i in range(0, num_entities):
+            print(f'{header["entities"][i]} expected code: '
+                f'{expected_codes[i].name}; '
+                f'Code found: {return_codes[i].name}; '
+                f'Code recorded: {header["produced_codes"][i]}')
+            log_message(f'\nInformation about {header["entities"][i]}:\n '
+                      f'{recordings[i].text} ', verbosity)
+
+    return test_result_correct
+
+def replay_recordings(
+    filenames: "list[str]",
+    test_cases: "list[str]",
+    test_cases_disabled: "list[str]",
+    verbosity: bool,
+    latency_report: str = None,
+    benchmark_report: str = None,
+    sample_accounting: bool = False):
+
+    """ Replay the recording files (or directories containing recording
+        files) passed. The checking functions and the expected codes are
+        taken from the current definition of the Test Suites.
+    """
+    recording_files = []
+    for element in filenames:
+        if os.path.isdir(element):
+            recording_files += sorted(
+                    os.path.join(element, name) for name in os.listdir(element)
+                    if name.endswith(RECORDING_EXTENSION))
+        else:
+            recording_files.append(element)
+
+    for filename in recording_files:
+        header, recordings = load_recording(filename)
+        test_case_name = header['test_case']
+        if test_cases_disabled is not None \
+                and test_case_name in test_cases_disabled:
+            continue
+        if test_cases is not None and test_case_name not in test_cases:
+            continue
+
+        t_suite_dict = getattr(importlib.import_module(header['suite']),
+                header['suite_dict'], None)
+        if type(t_suite_dict) is not dict or test_case_name not in t_suite_dict:
+            print(f'Test Case <{test_case_name}> not contained in Test Suite '
+                    f'<{header["suite_dict"]}>. Recording {filename} skipped.')
+            continue
+        test_case_parameters = t_suite_dict[test_case_name]
+        check_function = get_check_function(test_case_name,
+                test_case_parameters)
+        metrics_function = test_case_parameters.get('metrics_function')
+        if header.get('soak') is not None:
+            check_function = SoakCheck(header['soak'])
+            metrics_function = soak_metrics
+        log_message(f'Replaying test: {test_case_name} from {filename}',
+                verbosity)
+        replay_test(header=header,
+                recordings=recordings,
+                expected_codes=test_case_parameters['expected_codes'],
+                verbosity=verbosity,
+                check_function=check_function,
+                latency_report=latency_report,
+                metrics_function=metrics_function,
+                benchmark_report=benchmark_report,
+                sample_accounting=sample_accounting)
+
 class Arguments:
     def parser():
         parser = argparse.ArgumentParser(
@@ -659,22 +1189,24 @@ class Arguments:
         gen_opts = parser.add_argument_group(title='general options')
         gen_opts.add_argument('-P', '--publisher',
             default=None,
-            required=True,
+            required=False,
             type=str,
             metavar='publisher_executable_name',
             help='Path to the Publisher shape_main application. '
                 'It may be absolute or relative path. Example: if the executable '
                 'is in the same folder as the script: '
-                '"-P ./rti_connext_dds-6.1.1_shape_main_linux".')
+                '"-P ./rti_connext_dds-6.1.1_shape_main_linux". '
+                'Required unless --replay is used.')
         gen_opts.add_argument('-S', '--subscriber',
             default=None,
-            required=True,
+            required=False,
             type=str,
             metavar='subscriber_executable_name',
             help='Path to the Subscriber shape_main application. '
                 'It may be absolute or relative path. Example: if the executable '
                 'is in the same folder as the script: '
-                '"-S ./rti_connext_dds-6.1.1_shape_main_linux".')
+                '"-S ./rti_connext_dds-6.1.1_shape_main_linux". '
+                'Required unless --replay is used.')
 
         optional = parser.add_argument_group(title='optional parameters')
         optional.add_argument('-v','--verbose',
@@ -752,6 +1284,120 @@ class Arguments:
                 'a new file. '
                 'Default: <publisher_name>-<subscriber_name>-date.xml')
 
+        out_opts.add_argument('--latency-report',
+            default=None,
+            required=False,
+            metavar='filename',
+            type=str,
+            help='Append the publisher to subscriber latency of the samples '
+                'of every Test Case to this file (JSON lines). The '
+                'Publishers are run with -w (print the samples sent) and '
+                'only the samples with a size that identifies them (-z 0) '
+                'are measured. The Subscribers that '
+                f'do not set {READ_PERIOD_OPTION} read every '
+                f'{LATENCY_READ_PERIOD_MS} ms. The file may be shown as a '
+                'matrix of product pairs and QoS with rtps_latency.py. '
+                'Default: None')
+
+        out_opts.add_argument('--sample-accounting',
+            default=False,
+            required=False,
+            action='store_true',
+            help='Join the samples the Publishers send with the samples '
+                'every Subscriber receives and log the delivered, lost, '
+                'duplicated and reordered samples of every instance. The '
+                'Publishers are run with -w (print the samples sent). A '
+                'Subscriber that must receive all the samples (RELIABLE, '
+                'KEEP_ALL, -z 0) and lost some fails with DATA_NOT_CORRECT. '
+                'Default: False')
+
+        out_opts.add_argument('--benchmark-report',
+            default=None,
+            required=False,
+            metavar='filename',
+            type=str,
+            help='Append the metrics of the Test Cases that define a '
+                'metrics_function (for example the benchmark Test Suite, '
+                '-s test_suite_benchmark) to this file (JSON lines). '
+                'Default: None')
+
+        record_opts = parser.add_argument_group(title='record and replay')
+        record_opts.add_argument('--record',
+            default=None,
+            required=False,
+            metavar='directory',
+            type=str,
+            help='Save the output of the shape_main applications of every '
+                'Test Case, with the time each line is read, in a recording '
+                f'file (<publisher_name>-<subscriber_name>-<test_case>'
+                f'{RECORDING_EXTENSION}) in this directory. '
+                'Default: None')
+        record_opts.add_argument('--replay',
+            nargs='+',
+            default=None,
+            required=False,
+            metavar='recording',
+            type=str,
+            help='Run the checking functions of the Test Cases against '
+                'recording files (or directories containing them) instead of '
+                'running the shape_main applications. The checking functions '
+                'and expected codes are taken from the Test Suite the '
+                'recording was made with. --test and --disable-test filter '
+                'the Test Cases replayed. No report is generated. '
+                'Default: None')
+
+        soak_opts = parser.add_argument_group(title='soak mode')
+        soak_opts.add_argument('--soak',
+            default=None,
+            required=False,
+            metavar='duration',
+            type=duration,
+            help='Run the Test Cases selected with --test for this duration '
+                '(seconds, or a number followed by s, m or h; for example '
+                '8h): the Subscribers read samples until it elapses instead '
+                'of running the checking functions. The resident set size, '
+                'open file descriptors and CPU time of every shape_main '
+                'application and the samples per second received are taken '
+                'every --soak-interval. The trends and the flags '
+                'memory_growth, fd_growth and throughput_decay are printed '
+                'and saved with --benchmark-report (see rtps_soak.py). '
+                'Default: None')
+        soak_opts.add_argument('--soak-interval',
+            default=60,
+            required=False,
+            metavar='duration',
+            type=duration,
+            help='Time between the snapshots of the soak mode. '
+                'Default: 60 seconds.')
+
+        worker_opts = parser.add_argument_group(title='persistent workers')
+        worker_opts.add_argument('--persistent-workers',
+            default=False,
+            required=False,
+            action='store_true',
+            help='Run the shape_main applications that support '
+                '\'--control stdin\' once and reuse them across the Test '
+                'Cases instead of running them for every Test Case, so the '
+                'startup of the applications (library loading and '
+                'initialization, participant creation) is paid once. The '
+                'Test Cases that record the resources of the applications '
+                '(soak mode and benchmark Test Suite) run them as usual. '
+                'Requires the multiprocessing start method fork (see '
+                'rtps_workers.py). Default: False.')
+
+        format_opts = parser.add_argument_group(title='output format')
+        format_opts.add_argument('--output-format',
+            default='text',
+            required=False,
+            choices=['auto', 'text', RECORD_OUTPUT_FORMAT],
+            help='Output format of the shape_main applications. With '
+                f'{RECORD_OUTPUT_FORMAT} the samples are printed as JSON '
+                'records that the checking functions read without regular '
+                'expressions; only the Test Cases whose checking function '
+                'has the attribute record_output use it. auto selects '
+                f'{RECORD_OUTPUT_FORMAT} if the application lists '
+                f'{OUTPUT_FORMAT_OPTION} in its help. Default: text.')
+
         return parser
 
 # this function checks if the test case exist in the test suite
@@ -765,10 +1411,48 @@ def are_tests_in_test_suite(test_suite, suite_name, test_cases):
                 all_test_cases_exist = False
     return all_test_cases_exist
 
+# this function returns the checking function of a test case
+def get_check_function(test_case_name, test_case_parameters):
+    if ('check_function' in test_case_parameters):
+        if callable(test_case_parameters['check_function']):
+            return test_case_parameters['check_function']
+        raise RuntimeError('Cannot process function of '
+            f'test case: {test_case_name}')
+    return basic_check
+
+# this function returns whether the shape_main application supports the
+# option --output-format (it is listed in its help)
+def record_output_supported(executable):
+    return OUTPUT_FORMAT_OPTION in application_help(executable)
+
+# this function returns whether the shape_main application 'executable'
+# runs with '--output-format jsonl' in a Test Case checked by 'check_function'
+def use_record_output(output_format, executable, check_function):
+    if output_format == 'text' \
+            or not getattr(check_function, 'record_output', False):
+        return False
+    return output_format == RECORD_OUTPUT_FORMAT \
+            or record_output_supported(executable)
+
 def main():
     parser = Arguments.parser()
     args = parser.parse_args()
 
+    if args.replay is not None:
+        replay_recordings(filenames=args.replay,
+                test_cases=args.test,
+                test_cases_disabled=args.disable_test,
+                verbosity=args.verbose,
+                latency_report=args.latency_report,
+                benchmark_report=args.benchmark_report,
+                sample_accounting=args.sample_accounting)
+        return
+    if args.publisher is None or args.subscriber is None:
+        parser.error('the following arguments are required: '
+                '-P/--publisher, -S/--subscriber')
+    if args.soak is not None and args.test is None:
+        parser.error('--soak requires the Test Cases to run (-t/--test)')
+
     options = {
         'publisher': args.publisher,
         'subscriber': args.subscriber,
@@ -778,6 +1462,14 @@ def main():
         'test_cases_disabled': args.disable_test,
         'data_representation': args.data_representation,
         'periodic_announcement_ms': args.periodic_announcement,
+        'record_directory': args.record,
+        'latency_report': args.latency_report,
+        'benchmark_report': args.benchmark_report,
+        'sample_accounting': args.sample_accounting,
+        'soak': args.soak,
+        'soak_interval': args.soak_interval,
+        'output_format': args.output_format,
+        'persistent_workers': args.persistent_workers,
     }
 
     # The executables's names are supposed to follow the pattern: name_shape_main
@@ -810,9 +1502,20 @@ def main():
     # applications. A TestSuite contains a collection of TestCases.
     suite = junitparser.TestSuite(f"{name_publisher}---{name_subscriber}")
 
+    if options['record_directory'] is not None:
+        os.makedirs(options['record_directory'], exist_ok=True)
+
     timeout = 15
     now = datetime.now()
 
+    worker_pool = None
+    if options['persistent_workers']:
+        if multiprocessing.get_start_method() == 'fork':
+            worker_pool = WorkerPool(timeout)
+        else:
+            print('--persistent-workers ignored: it requires the '
+                    'multiprocessing start method fork.')
+
     t_suite_module = importlib.import_module(options['test_suite'])
     for test_suite_name, t_suite_dict in inspect.getmembers(t_suite_module):
         # getmembers returns all the members in the t_suite_module.
@@ -853,14 +1556,16 @@ def main():
                     # if the test case is processed
                     parameters = test_case_parameters['apps']
                     expected_codes = test_case_parameters['expected_codes']
-                    if ('check_function' in test_case_parameters):
-                        if callable(test_case_parameters['check_function']):
-                            check_function = test_case_parameters['check_function']
-                        else:
-                            raise RuntimeError('Cannot process function of '
-                                f'test case: {test_case_name}')
-                    else:
-                        check_function = basic_check
+                    check_function = get_check_function(test_case_name,
+                            test_case_parameters)
+                    metrics_function = test_case_parameters.get(
+                            'metrics_function')
+                    resource_period = test_case_parameters.get(
+                            'resource_period')
+                    if options['soak'] is not None:
+                        check_function = SoakCheck(options['soak'])
+                        metrics_function = soak_metrics
+                        resource_period = options['soak_interval']
 
                     assert(len(parameters) == len(expected_codes))
 
@@ -873,11 +1578,44 @@ def main():
                                 and 'connext' in options['publisher'].lower() \
                                 and '-P' in element:
                             element += f' --periodic-announcement {options["periodic_announcement_ms"]}'
+                        # Print the samples sent to account for them or to
+                        # measure their latency
+                        if (options['sample_accounting']
+                                    or options['latency_report'] is not None) \
+                                and '-P' in element \
+                                and not '-w' in shape_main_options(element):
+                            element += ' -w'
+                        # Print the samples as records if the application
+                        # and the checking function support it
+                        executable = options['publisher'] \
+                                if '-P' in element else options['subscriber']
+                        if not OUTPUT_FORMAT_OPTION in element \
+                                and use_record_output(options['output_format'],
+                                    executable, check_function):
+                            element += f' {OUTPUT_FORMAT_OPTION} {RECORD_OUTPUT_FORMAT}'
+                        # Measure the latency with the time the applications
+                        # write and read the samples if they support it
+                        if options['latency_report'] is not None \
+                                and not TIMESTAMPS_OPTION in element \
+                                and TIMESTAMPS_OPTION in application_help(
+                                    executable):
+                            element += f' {TIMESTAMPS_OPTION}'
+                        # and read them as soon as they are received
+                        if options['latency_report'] is not None \
+                                and '-S' in element \
+                                and not READ_PERIOD_OPTION in element:
+                            element += f' {READ_PERIOD_OPTION} {LATENCY_READ_PERIOD_MS}'
                         parameters[i] = element  # Update the list in place
 
                     case = junitparser.TestCase(f'{test_suite_name}_{test_case_name}')
                     now_test_case = datetime.now()
                     log_message(f'Running test: {test_case_name}', options['verbosity'])
+                    record_filename = None
+                    if options['record_directory'] is not None:
+                        record_filename = os.path.join(
+                            options['record_directory'],
+                            f'{name_publisher}-{name_subscriber}-'
+                            f'{case.name}{RECORDING_EXTENSION}')
                     run_test(name_executable_pub=options['publisher'],
                             name_executable_sub=options['subscriber'],
                             test_case=case,
@@ -885,7 +1623,27 @@ def main():
                             expected_codes=expected_codes,
                             verbosity=options['verbosity'],
                             timeout=timeout,
-                            check_function=check_function)
+                            check_function=check_function,
+                            record_filename=record_filename,
+                            latency_report=options['latency_report'],
+                            startup_delay=test_case_parameters.get(
+                                'startup_delay', 1),
+                            metrics_function=metrics_function,
+                            benchmark_report=options['benchmark_report'],
+                            stop_after=test_case_parameters.get('stop_after'),
+                            match_timeout=test_case_parameters.get(
+                                'match_timeout'),
+                            sample_accounting=options['sample_accounting'],
+                            resource_period=resource_period,
+                            worker_pool=(worker_pool
+                                if resource_period is None else None),
+                            test_info={
+                                'suite': options['test_suite'],
+                                'suite_dict': test_suite_name,
+                                'test_case': test_case_name,
+                                'publisher': name_publisher,
+                                'subscriber': name_subscriber,
+                                'soak': options['soak']})
                     case.time = (datetime.now() - now_test_case).total_seconds()
                     suite.add_testcase(case)
 
@@ -894,5 +1652,8 @@ def main():
 
     xml.write(options['filename_report'])
 
+    if worker_pool is not None:
+        worker_pool.close()
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,138 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+# End-to-end accounting of the samples of a Test Case.
+#
+# The samples the Publishers print (option -w) are indexed by
+# (topic, instance, size) and joined with the samples every Subscriber
+# receives. The "size" member is used as sequence number (publisher option
+# -z 0). Only the samples in the window the Subscriber was receiving (from
+# the first to the last sequence number it received of each instance) are
+# accounted, as the Publishers keep sending samples before the Subscriber
+# starts and after it stops reading.
+
+from rtps_test_utilities import shape_main_options, option_value
+from rtps_validators import iter_samples
+
+class InstanceAccount:
+    """
+    Accounting of the samples of one instance received by a Subscriber.
+
+    sent: samples sent by the Publishers within the window.
+    delivered: samples sent within the window that were received.
+    lost: samples sent within the window that were not received.
+    duplicated: samples received more than once.
+    reordered: samples received with a lower sequence number than the
+            previous one.
+    unknown: samples received that no Publisher printed.
+    """
+    __slots__ = ('sent', 'delivered', 'lost', 'duplicated', 'reordered',
+            'unknown')
+
+    def __init__(self):
+        self.sent = 0
+        self.delivered = 0
+        self.lost = 0
+        self.duplicated = 0
+        self.reordered = 0
+        self.unknown = 0
+
+    def __str__(self):
+        return (f'sent {self.sent}, delivered {self.delivered}, '
+                f'lost {self.lost}, duplicated {self.duplicated}, '
+                f'reordered {self.reordered}, unknown {self.unknown}')
+
+class PublishedSamples:
+    """
+    Hash index of the samples printed by the Publishers.
+
+    samples: dictionary (topic, instance) -> dictionary size -> number of
+            times it was sent.
+    publishers: dictionary (topic, instance) -> set of Publisher indices
+            that sent samples of that instance.
+    """
+    def __init__(self):
+        self.samples = {}
+        self.publishers = {}
+
+    def add_output(self, publisher_index, text):
+        for sample in iter_samples(text):
+            key = (sample.topic, sample.instance)
+            size = sample.size
+            sizes = self.samples.get(key)
+            if sizes is None:
+                sizes = self.samples[key] = {}
+                self.publishers[key] = set()
+            sizes[size] = sizes.get(size, 0) + 1
+            self.publishers[key].add(publisher_index)
+
+def account_samples(published, text):
+    """
+    Joins the samples received by a Subscriber (its output 'text') with the
+    PublishedSamples. Returns a dictionary (topic, instance) -> InstanceAccount
+    with the instances the Publishers sent.
+    """
+    received = {}
+    last_size = {}
+    accounts = {}
+    for sample in iter_samples(text):
+        key = (sample.topic, sample.instance)
+        sent = published.samples.get(key)
+        if sent is None:
+            continue
+        size = sample.size
+        instance_received = received.get(key)
+        if instance_received is None:
+            instance_received = received[key] = set()
+            account = accounts[key] = InstanceAccount()
+        else:
+            account = accounts[key]
+            if size in instance_received:
+                account.duplicated += 1
+            if size < last_size[key]:
+                account.reordered += 1
+        if size not in sent:
+            account.unknown += 1
+        instance_received.add(size)
+        last_size[key] = size
+
+    for key, account in accounts.items():
+        instance_received = received[key]
+        first = min(instance_received)
+        last = max(instance_received)
+        for size, count in published.samples[key].items():
+            if first <= size <= last:
+                account.sent += count
+                if size in instance_received:
+                    account.delivered += count
+                else:
+                    account.lost += count
+    return accounts
+
+def losses_are_failures(publisher_parameters, subscriber_parameters):
+    """
+    Returns True if a Subscriber must receive all the samples of the
+    Publisher (within the window accounted): both are RELIABLE and
+    KEEP_ALL, the Publisher prints its samples with increasing size and no
+    option drops or repeats samples on purpose.
+    """
+    pub = shape_main_options(publisher_parameters)
+    sub = shape_main_options(subscriber_parameters)
+    if '-w' not in pub or option_value(pub, '-z') != '0':
+        return False
+    for options in (pub, sub):
+        if '-b' in options or option_value(options, '-k') != '0':
+            return False
+    for option in ('--lifespan', '--size-modulo'):
+        if option in pub:
+            return False
+    for option in ('-R', '--time-filter', '--cft'):
+        if option in sub:
+            return False
+    return True
@@ -0,0 +1,283 @@
+#!/usr/bin/python
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+# Post-hoc analysis of the samples of a recording (see rtps_recording.py).
+#
+# The samples printed by a shape_main application are loaded into columnar
+# NumPy arrays (instance id, x, y, size and the time the line was read) and
+# the statistics of every instance are computed with vectorized operations,
+# so recordings with millions of samples can be analyzed in seconds.
+# The "size" member is used as sequence number, as the checking functions
+# of the Test Suite do.
+
+import argparse
+import gc
+import numpy as np
+
+from rtps_recording import load_recording
+from rtps_test_utilities import SAMPLE_RECORD_PREFIX
+from rtps_validators import SAMPLE_PATTERN, parse_sample
+
+class SampleArrays:
+    """
+    Samples printed by a shape_main application, stored in columns.
+
+    instances: array with the name ('<topic> <color>') of every instance,
+            in the order they are first received.
+    instance_id: index in 'instances' of the instance of every sample.
+    x, y, size: members of every sample.
+    stamp: monotonic time (ns) at which the line of every sample was read.
+    """
+    def __init__(self, instances, instance_id, x, y, size, stamp):
+        self.instances = instances
+        self.instance_id = instance_id
+        self.x = x
+        self.y = y
+        self.size = size
+        self.stamp = stamp
+
+    def __len__(self):
+        return len(self.size)
+
+    @classmethod
+    def from_recording(cls, recording):
+        """ Loads the samples of an EntityRecording. """
+        text = recording.text
+        if SAMPLE_RECORD_PREFIX in text:
+            return cls._from_records(recording)
+        starts = []
+        instance_id = []
+        x = []
+        y = []
+        size = []
+        instances = {}
+        # The parsing creates millions of small objects that the garbage
+        # collector would traverse again and again without freeing anything
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for match in SAMPLE_PATTERN.finditer(text):
+                starts.append(match.start())
+                topic, instance, sample_x, sample_y, sample_size = \
+                        match.groups()
+                instance_id.append(instances.setdefault(
+                        f'{topic} {instance}', len(instances)))
+                x.append(sample_x)
+                y.append(sample_y)
+                size.append(sample_size)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        # every sample gets the stamp of the piece of output where it starts
+        piece_ends = np.cumsum([len(line) for line in recording.lines])
+        stamps = np.asarray(recording.stamps, dtype=np.int64)
+        if len(stamps):
+            stamp = stamps[np.searchsorted(piece_ends, starts, side='right')]
+        else:
+            stamp = np.zeros(len(size), dtype=np.int64)
+
+        return cls(np.array(list(instances), dtype=str),
+                np.array(instance_id, dtype=np.int64),
+                np.array(x, dtype=np.int64),
+                np.array(y, dtype=np.int64),
+                np.array(size, dtype=np.int64),
+                stamp)
+
+    @classmethod
+    def _from_records(cls, recording):
+        """
+        Loads the samples of an EntityRecording of an application run with
+        '--output-format jsonl': one record per line, stamped with the time
+        at which the line was completed.
+        """
+        instance_id = []
+        x = []
+        y = []
+        size = []
+        stamp = []
+        instances = {}
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for line_stamp, line in recording.complete_lines():
+                sample = parse_sample(line)
+                if sample is None:
+                    continue
+                instance_id.append(instances.setdefault(
+                        f'{sample.topic} {sample.instance}', len(instances)))
+                x.append(sample.x)
+                y.append(sample.y)
+                size.append(sample.size)
+                stamp.append(line_stamp)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        return cls(np.array(list(instances), dtype=str),
+                np.array(instance_id, dtype=np.int64),
+                np.array(x, dtype=np.int64),
+                np.array(y, dtype=np.int64),
+                np.array(size, dtype=np.int64),
+                np.array(stamp, dtype=np.int64))
+
+def instance_statistics(samples):
+    """
+    Computes the statistics of every instance of a SampleArrays. Returns a
+    dictionary instance name -> dictionary with:
+        samples: number of samples received.
+        first, last: first and last sequence number received.
+        missing: sequence numbers between first and last never received.
+        gaps: number of times the sequence number increased more than one.
+        duplicates: samples whose sequence number was already received.
+        out_of_order: samples with a sequence number lower than the
+                previous one.
+        run_lengths: dictionary run length -> number of runs of
+                consecutive sequence numbers with that length.
+        interarrival_ms: mean, std, min, max, p50 and p99 of the time
+                between consecutive samples (jitter).
+    """
+    num_samples = len(samples)
+    num_instances = len(samples.instances)
+    if num_samples == 0:
+        return {}
+
+    # group the samples by instance, keeping the reception order
+    order = np.argsort(samples.instance_id, kind='stable')
+    instance_id = samples.instance_id[order]
+    seq = samples.size[order]
+    stamp = samples.stamp[order]
+
+    group_start = np.flatnonzero(
+            np.r_[True, instance_id[1:] != instance_id[:-1]])
+    count = np.bincount(instance_id, minlength=num_instances)
+    first = seq[group_start]
+    last = seq[np.r_[group_start[1:], num_samples] - 1]
+
+    same_instance = instance_id[1:] == instance_id[:-1]
+    next_instance_id = instance_id[1:]
+    diff = np.diff(seq)
+    gaps = np.bincount(next_instance_id[same_instance & (diff > 1)],
+            minlength=num_instances)
+    out_of_order = np.bincount(next_instance_id[same_instance & (diff < 0)],
+            minlength=num_instances)
+
+    # duplicates: sort by (instance, sequence number) and compare neighbors
+    sorted_order = np.lexsort((seq, instance_id))
+    sorted_id = instance_id[sorted_order]
+    sorted_seq = seq[sorted_order]
+    repeated = (sorted_id[1:] == sorted_id[:-1]) \
+            & (sorted_seq[1:] == sorted_seq[:-1])
+    duplicates = np.bincount(sorted_id[1:][repeated], minlength=num_instances)
+    min_seq = np.minimum.reduceat(seq, group_start)
+    max_seq = np.maximum.reduceat(seq, group_start)
+    missing = (max_seq - min_seq + 1) - (count - duplicates)
+
+    # runs of consecutive sequence numbers
+    run_start = np.flatnonzero(np.r_[True, ~(same_instance & (diff == 1))])
+    run_length = np.diff(np.r_[run_start, num_samples])
+    run_keys, run_count = np.unique(
+            np.stack([instance_id[run_start], run_length]),
+            axis=1, return_counts=True)
+    run_lengths = [{} for _ in range(num_instances)]
+    for (i, length), value in zip(run_keys.T.tolist(), run_count.tolist()):
+        run_lengths[i][length] = value
+
+    # inter-arrival time. The time differences of each instance are
+    # contiguous because the samples are grouped by instance.
+    interarrival = np.diff(stamp)[same_instance] / 1e6
+    interarrival_id = next_instance_id[same_instance]
+    interarrival_end = np.cumsum(
+            np.bincount(interarrival_id, minlength=num_instances))
+
+    statistics = {}
+    for i, name in enumerate(samples.instances.tolist()):
+        values = interarrival[
+                (interarrival_end[i - 1] if i > 0 else 0):interarrival_end[i]]
+        if len(values):
+            p50, p99 = np.percentile(values, [50, 99])
+            interarrival_ms = {
+                'mean': float(values.mean()),
+                'std': float(values.std()),
+                'min': float(values.min()),
+                'max': float(values.max()),
+                'p50': float(p50),
+                'p99': float(p99)}
+        else:
+            interarrival_ms = None
+        statistics[name] = {
+            'samples': int(count[i]),
+            'first': int(first[i]),
+            'last': int(last[i]),
+            'missing': int(missing[i]),
+            'gaps': int(gaps[i]),
+            'duplicates': int(duplicates[i]),
+            'out_of_order': int(out_of_order[i]),
+            'run_lengths': run_lengths[i],
+            'interarrival_ms': interarrival_ms}
+    return statistics
+
+def print_statistics(entity_name, statistics):
+    print(f'{entity_name}:')
+    for name, values in statistics.items():
+        print(f'  {name}: samples {values["samples"]}, '
+                f'seq [{values["first"]}, {values["last"]}], '
+                f'missing {values["missing"]}, gaps {values["gaps"]}, '
+                f'duplicates {values["duplicates"]}, '
+                f'out of order {values["out_of_order"]}')
+        interarrival = values['interarrival_ms']
+        if interarrival is not None:
+            print(f'    inter-arrival (ms): mean {interarrival["mean"]:.3f}, '
+                    f'std {interarrival["std"]:.3f}, '
+                    f'min {interarrival["min"]:.3f}, '
+                    f'p50 {interarrival["p50"]:.3f}, '
+                    f'p99 {interarrival["p99"]:.3f}, '
+                    f'max {interarrival["max"]:.3f}')
+        runs = ', '.join(f'{length}: {value}' for length, value
+                in sorted(values['run_lengths'].items()))
+        print(f'    run lengths: {runs}')
+
+class Arguments:
+    def parser():
+        parser = argparse.ArgumentParser(
+            description='Analysis of the samples received in recordings '
+                'generated by interoperability_report.py --record.',
+            add_help=True)
+        parser.add_argument('recordings',
+            nargs='+',
+            metavar='recording',
+            type=str,
+            help='Recording files to analyze.')
+        parser.add_argument('-e', '--entity',
+            nargs='+',
+            default=None,
+            required=False,
+            metavar='entity',
+            type=str,
+            help='Entities to analyze, for example Publisher_1. '
+                'Default: all the Subscribers.')
+        return parser
+
+def main():
+    args = Arguments.parser().parse_args()
+    for filename in args.recordings:
+        header, recordings = load_recording(filename)
+        print(f'{header["test_case_name"]} ({filename})')
+        for entity_name, recording in zip(header['entities'], recordings):
+            if args.entity is None:
+                if not entity_name.startswith('Subscriber'):
+                    continue
+            elif entity_name not in args.entity:
+                continue
+            print_statistics(entity_name, instance_statistics(
+                    SampleArrays.from_recording(recording)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/python
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+# One-way latency between Publishers and Subscribers.
+#
+# The harness stamps every line it reads from the shape_main applications
+# (see rtps_recording.py). The samples printed by the Publishers (option -w)
+# are joined with the samples received by a Subscriber by
+# (topic, instance, size), so the difference between both stamps is the
+# one-way latency. Both applications run on the same host, so both stamps
+# come from the same monotonic clock. The latency includes the time the
+# applications need to print the sample and the harness to read it, which
+# is the same for all the products.
+#
+# If both applications print the time (also monotonic) at which they wrote
+# and received every sample (shape_main option --timestamps, which the
+# harness adds with --latency-report if the applications support it) or
+# print records (--output-format jsonl), those times are used instead of the
+# stamps of the harness, so the latency does not include the buffering of
+# the pseudo-terminals nor the read period.
+#
+# A Subscriber only prints the samples it takes every --read-period (100 ms
+# by default), so the stamps of the harness include up to a read period of
+# waiting. The harness runs the Subscribers that do not set a read period
+# with a read period of LATENCY_READ_PERIOD_MS when it measures the latency,
+# and the read period is part of the QoS configuration of the records.
+#
+# Only the samples whose size identifies them (printed once by the
+# Publishers, publisher option -z 0) are joined, and only the lines the
+# Subscriber printed while the harness was reading its output (before the
+# checking function finished).
+#
+# The harness appends the latency of every Subscriber as a JSON line to the
+# file passed with --latency-report. This script prints those files as a
+# matrix: one row per product pair and one column per QoS configuration
+# (reliability, history depth, payload size and read period).
+
+import argparse
+import json
+from array import array
+
+from rtps_test_utilities import shape_main_options, option_value
+from rtps_validators import parse_sample
+
+PERCENTILES = (50, 90, 99)
+# shape_main option to print the time the samples are written and read
+TIMESTAMPS_OPTION = '--timestamps'
+# shape_main option to set the read period (ms), its default and the read
+# period of the Subscribers that do not set it when measuring the latency
+READ_PERIOD_OPTION = '--read-period'
+DEFAULT_READ_PERIOD_MS = 100
+LATENCY_READ_PERIOD_MS = 1
+
+def published_stamps(recordings):
+    """
+    Returns a dictionary (topic, instance, size) -> (stamp, ns) with the
+    samples printed by the Publishers: the stamp of the harness and the time
+    printed by the application (None if it was not printed, see
+    rtps_validators.Sample). The samples printed more than once cannot be
+    joined, so they are stored as None.
+    """
+    stamps = {}
+    for recording in recordings:
+        for stamp, line in recording.complete_lines():
+            sample = parse_sample(line)
+            if sample is None:
+                continue
+            key = (sample.topic, sample.instance, sample.size)
+            stamps[key] = None if key in stamps else (stamp, sample.ns)
+    return stamps
+
+def sample_latencies(sent_stamps, recording):
+    """
+    Joins the samples received by a Subscriber (EntityRecording) with the
+    stamps returned by published_stamps(). Returns an array('q') with the
+    latency (ns) of every sample received for the first time and the number
+    of them measured with the times printed by the applications.
+    """
+    latencies = array('q')
+    application_stamps = 0
+    received = set()
+    check_end = recording.marks.get('check_end')
+    for stamp, line in recording.complete_lines():
+        if check_end is not None and stamp > check_end:
+            break
+        sample = parse_sample(line)
+        if sample is None:
+            continue
+        key = (sample.topic, sample.instance, sample.size)
+        sent = sent_stamps.get(key)
+        if sent is None or key in received:
+            continue
+        received.add(key)
+        sent_stamp, sent_ns = sent
+        if sent_ns is not None and sample.ns is not None:
+            latencies.append(sample.ns - sent_ns)
+            application_stamps += 1
+        else:
+            latencies.append(stamp - sent_stamp)
+    return latencies, application_stamps
+
+def latency_summary(latencies):
+    """
+    Returns a dictionary with the number of samples, the minimum, maximum
+    and percentiles (in us) and a histogram of the latencies (ns). The
+    histogram buckets are powers of 2: the key is the upper bound of
+    the bucket in us.
+    """
+    values = sorted(latencies)
+    count = len(values)
+    summary = {'count': count}
+    if count == 0:
+        return summary
+    summary['min_us'] = values[0] / 1000
+    for percentile in PERCENTILES:
+        index = min(count - 1, (count * percentile) // 100)
+        summary[f'p{percentile}_us'] = values[index] / 1000
+    summary['max_us'] = values[-1] / 1000
+    histogram = {}
+    for value in values:
+        upper_bound = 1 << max(0, value // 1000).bit_length()
+        histogram[upper_bound] = histogram.get(upper_bound, 0) + 1
+    summary['histogram_us'] = histogram
+    return summary
+
+def qos_configuration(publisher_parameters, subscriber_parameters):
+    """
+    Returns the reliability, history depth, payload size and read period of
+    the Subscriber used.
+    """
+    pub = shape_main_options(publisher_parameters)
+    sub = shape_main_options(subscriber_parameters)
+    if '-b' in pub or '-b' in sub:
+        reliability = 'BEST_EFFORT'
+    else:
+        reliability = 'RELIABLE'
+    depth = option_value(sub, '-k', option_value(pub, '-k', 'default'))
+    return {
+        'reliability': reliability,
+        'history_depth': 'KEEP_ALL' if depth == '0' else depth,
+        'payload_size': int(option_value(pub, '--additional-payload-size', 0)),
+        'read_period_ms': int(option_value(sub, READ_PERIOD_OPTION,
+            DEFAULT_READ_PERIOD_MS))}
+
+def latency_records(info, parameters, recordings, entity_type):
+    """
+    Returns a list with one latency record (dictionary) for every
+    Subscriber of a Test Case whose samples could be joined with the
+    samples of the Publishers.
+
+    info <<in>>: information about the Test Case added to the records
+            (test case and product names).
+    parameters <<in>>: list of shape_main application parameters.
+    recordings <<in>>: list of EntityRecording, one for each entity.
+    entity_type <<in>>: list of entity names (Publisher_1, etc).
+    """
+    publishers = [i for i, element in enumerate(parameters)
+            if '-P ' in element or element.endswith('-P')]
+    sent_stamps = published_stamps(recordings[i] for i in publishers)
+    if not sent_stamps:
+        return []
+    # the QoS configuration of the first Publisher printing samples
+    publisher = next((i for i in publishers if '-w' in
+            shape_main_options(parameters[i])), publishers[0])
+
+    records = []
+    for i, element in enumerate(parameters):
+        if not ('-S ' in element or element.endswith('-S')):
+            continue
+        latencies, application_stamps = sample_latencies(sent_stamps,
+                recordings[i])
+        if not latencies:
+            continue
+        record = dict(info, entity=entity_type[i], apps=parameters)
+        record.update(qos_configuration(parameters[publisher], element))
+        record.update(latency_summary(latencies))
+        record['application_stamps'] = application_stamps
+        records.append(record)
+    return records
+
+def save_latency_records(filename, records):
+    """ Appends the latency records to a JSON lines file. """
+    with open(filename, 'a') as file:
+        for record in records:
+            file.write(json.dumps(record) + '\n')
+
+def print_latency_matrix(records, statistic):
+    """
+    Prints the 'statistic' (for example 'p50_us') of the latency records
+    as a matrix: one row per product pair, one column per QoS configuration.
+    When there are several records for the same cell, the median is shown.
+    """
+    cells = {}
+    rows = []
+    columns = []
+    for record in records:
+        if statistic not in record:
+            continue
+        row = f'{record["publisher"]} -> {record["subscriber"]}'
+        column = (f'{record["reliability"]} '
+                f'{record["history_depth"]} {record["payload_size"]}B')
+        if 'read_period_ms' in record:
+            column += f' {record["read_period_ms"]}ms'
+        if row not in rows:
+            rows.append(row)
+        if column not in columns:
+            columns.append(column)
+        cells.setdefault((row, column), []).append(record[statistic])
+
+    if not rows:
+        print('No latency records found.')
+        return
+    columns.sort()
+    row_width = max(len(row) for row in rows)
+    widths = [max(len(column), 10) for column in columns]
+    print(f'{statistic}'.ljust(row_width) + ''.join(
+            f' | {column:>{width}}' for column, width in zip(columns, widths)))
+    for row in rows:
+        line = row.ljust(row_width)
+        for column, width in zip(columns, widths):
+            values = sorted(cells.get((row, column), []))
+            if values:
+                line += f' | {values[len(values) // 2]:>{width}.1f}'
+            else:
+                line += f' | {"-":>{width}}'
+        print(line)
+
+class Arguments:
+    def parser():
+        parser = argparse.ArgumentParser(
+            description='Prints the latency reports generated by '
+                'interoperability_report.py --latency-report as a matrix of '
+                'product pairs and QoS configurations.',
+            add_help=True)
+        parser.add_argument('reports',
+            nargs='+',
+            metavar='latency_report',
+            type=str,
+            help='Latency report files (JSON lines).')
+        parser.add_argument('--statistic',
+            default='p50_us',
+            choices=['min_us'] + [f'p{p}_us' for p in PERCENTILES]
+                + ['max_us'],
+            type=str,
+            help='Statistic shown in the matrix. Default: p50_us.')
+        return parser
+
+def main():
+    args = Arguments.parser().parse_args()
+    records = []
+    for filename in args.reports:
+        with open(filename) as file:
+            records += [json.loads(line) for line in file if line.strip()]
+    print_latency_matrix(records, args.statistic)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+# Recording and replay of the shape_main applications output.
+#
+# While a Test Case runs, every entity writes its output to a temporary file
+# through an OutputRecorder. Each line (or piece of a line) read from the
+# shape_main application is stored with the monotonic time (in ns) at which
+# the harness read it.
+# The recorder also stores marks: named timestamps of events of the harness
+# ('spawn', 'check_start', 'check_end', 'stop', 'eof') and, if the Test Case
+# samples them (see rtps_resources.py), the resources the application uses.
+#
+# Temporary file records (one per line, tab separated):
+#       L <ns> <escaped line, including its line terminator>
+#       M <ns> <mark name>
+#       U <ns> <resident set size (KiB)> <CPU time (ms)> <open files>
+#
+# A recording file (save_recording()) is a gzip text file whose first line is
+# a JSON header describing the Test Case, followed by the records of all the
+# entities, prefixed by the entity index. Timestamps are relative to the
+# earliest one of the Test Case, so they can be compared between entities.
+#
+# A ReplayChild replays the output of one entity to the same functions that
+# process a pexpect child (for example, the checking functions). Time is
+# virtual: an expect() that would need to wait longer than its timeout for
+# the next line returns TIMEOUT immediately. Output read after the harness
+# started stopping the entity is not replayed.
+
+import gzip
+import json
+import threading
+import time
+from array import array
+
+import pexpect
+from pexpect.spawnbase import SpawnBase
+
+RECORDING_FORMAT_VERSION = 1
+RECORDING_EXTENSION = '.rec.gz'
+
+def _escape(text):
+    return text.encode('unicode_escape').decode('ascii')
+
+def _unescape(text):
+    return text.encode('ascii').decode('unicode_escape')
+
+class OutputRecorder:
+    """
+    File-like object used as the logfile of a pexpect child. It writes the
+    output to 'file' as timestamped line records. If a line is read in
+    several pieces, every piece is written when it is read, so the replay
+    returns the same data the pexpect child returned at each time.
+    The records may be written from several threads (ResourceSampler).
+    """
+    def __init__(self, file):
+        self.file = file
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        now = time.monotonic_ns()
+        with self._lock:
+            for piece in data.splitlines(keepends=True):
+                self.file.write(f'L\t{now}\t{_escape(piece)}\n')
+
+    def flush(self):
+        with self._lock:
+            self.file.flush()
+
+    def mark(self, name):
+        with self._lock:
+            self.file.write(f'M\t{time.monotonic_ns()}\t{name}\n')
+            self.file.flush()
+
+    def usage(self, rss_kb, cpu_ms, fds):
+        with self._lock:
+            self.file.write(
+                    f'U\t{time.monotonic_ns()}\t{rss_kb}\t{cpu_ms}\t{fds}\n')
+
+class EntityRecording:
+    """
+    Output of one shape_main application.
+
+    lines: list of lines, including their line terminators. A line read
+            in several pieces is stored as several elements.
+    stamps: array with the monotonic time (ns) at which every element of
+            'lines' was read.
+    marks: dictionary mark name -> monotonic time (ns).
+    usage: list of (stamp, rss_kb, cpu_ms, fds) with the resources the
+            application used (see rtps_resources.py), if sampled.
+    """
+    def __init__(self):
+        self.lines = []
+        self.stamps = array('q')
+        self.marks = {}
+        self.usage = []
+
+    @property
+    def text(self):
+        return ''.join(self.lines)
+
+    def complete_lines(self):
+        """
+        Yields (stamp, line) for every line, joining the pieces of the lines
+        read in several pieces. The stamp is the time the first piece of the
+        line was read.
+        """
+        line = ''
+        stamp = 0
+        for piece, piece_stamp in zip(self.lines, self.stamps):
+            if not line:
+                stamp = piece_stamp
+            line += piece
+            if line.endswith('\n'):
+                yield stamp, line
+                line = ''
+        if line:
+            yield stamp, line
+
+    def _add_record(self, record):
+        kind, stamp, value = record.rstrip('\n').split('\t', 2)
+        if kind == 'L':
+            self.lines.append(_unescape(value))
+            self.stamps.append(int(stamp))
+        elif kind == 'M':
+            self.marks[value] = int(stamp)
+        elif kind == 'U':
+            self.usage.append((int(stamp),
+                    *(int(field) for field in value.split('\t'))))
+
+    def records(self, offset=0):
+        for name, stamp in self.marks.items():
+            yield f'M\t{stamp - offset}\t{name}\n'
+        for stamp, *usage in self.usage:
+            yield f'U\t{stamp - offset}\t' \
+                    + '\t'.join(str(field) for field in usage) + '\n'
+        for line, stamp in zip(self.lines, self.stamps):
+            yield f'L\t{stamp - offset}\t{_escape(line)}\n'
+
+    def first_stamp(self):
+        stamps = list(self.marks.values())
+        if self.stamps:
+            stamps.append(self.stamps[0])
+        return min(stamps, default=0)
+
+    @classmethod
+    def from_file(cls, file):
+        """ Reads the records an OutputRecorder wrote in 'file'. """
+        recording = cls()
+        file.seek(0)
+        for record in file:
+            recording._add_record(record)
+        return recording
+
+def save_recording(filename, header, recordings):
+    """
+    Saves the recordings of all the entities of a Test Case.
+
+    filename <<in>>: name of the recording file.
+    header <<in>>: dictionary with the information about the Test Case.
+    recordings <<in>>: list of EntityRecording, one for each entity.
+    """
+    offset = min((r.first_stamp() for r in recordings), default=0)
+    header = dict(header, format=RECORDING_FORMAT_VERSION)
+    with gzip.open(filename, 'wt', encoding='ascii') as file:
+        file.write(json.dumps(header) + '\n')
+        for i, recording in enumerate(recordings):
+            for record in recording.records(offset):
+                file.write(f'{i}\t{record}')
+
+def load_recording(filename):
+    """
+    Loads a recording file. Returns the header and the list of
+    EntityRecording, one for each entity.
+    """
+    with gzip.open(filename, 'rt', encoding='ascii') as file:
+        header = json.loads(file.readline())
+        if header.get('format') != RECORDING_FORMAT_VERSION:
+            raise RuntimeError(f'Unsupported recording format in {filename}')
+        recordings = [EntityRecording() for _ in header['entities']]
+        for record in file:
+            index, record = record.split('\t', 1)
+            recordings[int(index)]._add_record(record)
+    return header, recordings
+
+class ReplayChild(SpawnBase):
+    """
+    pexpect child that replays an EntityRecording with a virtual clock.
+
+    The replay finishes with EOF if the shape_main application finished
+    by itself during the Test Case. Otherwise (the harness stopped it),
+    the expect() calls after the last line return TIMEOUT.
+    """
+    def __init__(self, recording, timeout=30):
+        SpawnBase.__init__(self, timeout=timeout, encoding='utf-8')
+        # Virtual time, there is no need to wait between reads
+        self.delayafterread = None
+        self._lines = recording.lines
+        self._stamps = recording.stamps
+        self._next = 0
+        self._end = len(self._lines)
+        stop = recording.marks.get('stop')
+        if stop is not None:
+            while self._end > 0 and self._stamps[self._end - 1] > stop:
+                self._end -= 1
+        self._eof_at_end = stop is None
+        self.now = recording.marks.get('spawn', recording.first_stamp())
+        self._deadline = None
+
+    def _start_expect(self, timeout):
+        if timeout == -1:
+            timeout = self.timeout
+        if timeout is None:
+            self._deadline = None
+        else:
+            self._deadline = self.now + int(timeout * 1e9)
+
+    def expect_list(self, pattern_list, timeout=-1, *args, **kwargs):
+        self._start_expect(timeout)
+        return SpawnBase.expect_list(self, pattern_list, timeout,
+                *args, **kwargs)
+
+    def expect_exact(self, pattern_list, timeout=-1, *args, **kwargs):
+        self._start_expect(timeout)
+        return SpawnBase.expect_exact(self, pattern_list, timeout,
+                *args, **kwargs)
+
+    def read_nonblocking(self, size=1, timeout=None):
+        if self._next >= self._end:
+            if self._eof_at_end:
+                self.flag_eof = True
+                raise pexpect.EOF('End of the recording.')
+            if self._deadline is not None:
+                self.now = self._deadline
+            raise pexpect.TIMEOUT('Timeout exceeded.')
+        stamp = self._stamps[self._next]
+        if self._deadline is not None and stamp > self._deadline:
+            self.now = self._deadline
+            raise pexpect.TIMEOUT('Timeout exceeded.')
+        self.now = max(self.now, stamp)
+
+        # return all the lines read at the same time, as the pexpect child
+        # did when the recording was made
+        data = self._lines[self._next]
+        self._next += 1
+        while self._next < self._end \
+                and self._stamps[self._next] <= self.now \
+                and len(data) < size:
+            data += self._lines[self._next]
+            self._next += 1
+        self._log(data, 'read')
+        return data
+
+    def isalive(self):
+        return self._next < self._end or not self._eof_at_end
@@ -0,0 +1,73 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+# Resource usage of the shape_main applications.
+#
+# While a Test Case runs, a ResourceSampler periodically reads the resident
+# set size (RSS), the CPU time and the number of open file descriptors of a
+# shape_main application from /proc and stores them in its OutputRecorder
+# (rtps_recording.py), so they are saved with the rest of the recording.
+# Only Linux provides /proc: in other platforms nothing is sampled.
+
+import os
+import threading
+
+try:
+    CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+except (AttributeError, ValueError, OSError):
+    CLOCK_TICKS = 100
+
+def process_usage(pid):
+    """
+    Returns (rss_kb, cpu_ms, fds) of the process 'pid': resident set size in
+    KiB, CPU time (user + system) in ms and number of open file descriptors.
+    Returns None if the process does not exist or /proc is not available.
+    """
+    try:
+        with open(f'/proc/{pid}/status') as file:
+            rss_kb = next((int(line.split()[1]) for line in file
+                    if line.startswith('VmRSS:')), 0)
+        with open(f'/proc/{pid}/stat') as file:
+            # the process name (2nd field) may contain spaces
+            fields = file.read().rsplit(')', 1)[1].split()
+        fds = len(os.listdir(f'/proc/{pid}/fd'))
+    except (OSError, ValueError, IndexError):
+        return None
+    # utime and stime are the fields 14 and 15 of /proc/<pid>/stat
+    cpu_ms = (int(fields[11]) + int(fields[12])) * 1000 // CLOCK_TICKS
+    return rss_kb, cpu_ms, fds
+
+class ResourceSampler(threading.Thread):
+    """
+    Thread that samples the resource usage of the process 'pid' every
+    'period' seconds and stores it with recorder.usage() until stop() is
+    called or the process finishes.
+    """
+    def __init__(self, pid, recorder, period):
+        threading.Thread.__init__(self, daemon=True)
+        self.pid = pid
+        self.recorder = recorder
+        self.period = period
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            usage = process_usage(self.pid)
+            if usage is None:
+                break
+            self.recorder.usage(*usage)
+            self._stopped.wait(self.period)
+
+    def stop(self):
+        """ Takes a last sample and stops the thread. """
+        self._stopped.set()
+        self.join()
+        usage = process_usage(self.pid)
+        if usage is not None:
+            self.recorder.usage(*usage)
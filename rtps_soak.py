@@ -0,0 +1,223 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+# Soak (endurance) mode of the interoperability_report (option --soak).
+#
+# The Subscribers of the Test Case read samples for the soak duration
+# instead of the MAX_SAMPLES_READ samples of the checking functions, while
+# a ResourceSampler (rtps_resources.py) takes a snapshot of the resources of
+# every shape_main application every --soak-interval seconds. When the Test
+# Case finishes, soak_metrics() computes the delivered sample rate between
+# snapshots, fits the trends and flags:
+#   * memory_growth: the resident set size grows monotonically.
+#   * fd_growth: the number of open file descriptors grows monotonically.
+#   * throughput_decay: the delivered sample rate decreases monotonically
+#     by more than SOAK_DECAY_THRESHOLD.
+# To tolerate noise, the snapshots are split in SOAK_SEGMENTS segments and
+# the trend is monotonic if the mean of every segment is greater (or lower)
+# than the mean of the previous one. The first snapshots (SOAK_WARMUP of the
+# duration) are not used, the applications are still starting.
+
+import argparse
+
+import pexpect
+
+from rtps_test_utilities import ReturnCode, basic_check, receive_time, \
+    parse_record, SAMPLE_RECORD_PREFIX
+from rtps_validators import SAMPLE_PATTERN, parse_sample
+
+SOAK_SEGMENTS = 4
+SOAK_WARMUP = 0.1
+SOAK_DECAY_THRESHOLD = 0.05
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600}
+
+def duration(text):
+    """
+    argparse type of the durations: seconds, or a number followed by
+    's', 'm' or 'h' (for example 90, 30m or 8h). Returns seconds.
+    """
+    unit = DURATION_UNITS.get(text[-1:].lower())
+    try:
+        value = float(text[:-1] if unit is not None else text) * (unit or 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid duration: {text}')
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f'invalid duration: {text}')
+    return value
+
+class SoakCheck:
+    """
+    Checking function that reads the samples the Subscriber receives for
+    'duration' seconds, without checking them. Returns DATA_NOT_RECEIVED if
+    the Subscriber stops receiving samples (for 'timeout' seconds) or
+    finishes before.
+    """
+    record_output = True
+
+    def __init__(self, duration):
+        self.duration = duration
+        self.__name__ = 'soak_check'
+
+    def __call__(self, child_sub, samples_sent, last_sample_saved, timeout):
+        basic_check_retcode = basic_check(child_sub, samples_sent,
+                last_sample_saved, timeout)
+        if basic_check_retcode != ReturnCode.OK:
+            return basic_check_retcode
+
+        end = receive_time(child_sub) + int(self.duration * 1e9)
+        samples_read = 1
+        return_code = ReturnCode.OK
+        # the samples are only counted, the records are not parsed
+        if parse_record(child_sub.after) is not None:
+            expect = child_sub.expect_exact
+            sample_pattern = SAMPLE_RECORD_PREFIX
+        else:
+            expect = child_sub.expect
+            sample_pattern = SAMPLE_PATTERN
+        while receive_time(child_sub) < end:
+            index = expect(
+                [
+                    sample_pattern, # index = 0
+                    pexpect.TIMEOUT, # index = 1
+                    pexpect.EOF # index = 2
+                ],
+                timeout
+            )
+            if index != 0:
+                return_code = ReturnCode.DATA_NOT_RECEIVED
+                break
+            samples_read += 1
+
+        print(f'Samples read: {samples_read}')
+        return return_code
+
+def linear_trend(points):
+    """
+    Least-squares slope of a list of (x, y) points, or None if there are
+    less than two different x.
+    """
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+def segment_means(values, segments=SOAK_SEGMENTS):
+    """ Means of 'values' split in 'segments' consecutive segments. """
+    if len(values) < segments:
+        return []
+    size = len(values) / segments
+    means = []
+    for i in range(segments):
+        segment = values[round(i * size):round((i + 1) * size)]
+        means.append(sum(segment) / len(segment))
+    return means
+
+def grows_monotonically(values):
+    means = segment_means(values)
+    return bool(means) and all(b > a for a, b in zip(means, means[1:]))
+
+def decays_monotonically(values, threshold=SOAK_DECAY_THRESHOLD):
+    means = segment_means(values)
+    return (bool(means) and all(b < a for a, b in zip(means, means[1:]))
+            and means[-1] < means[0] * (1 - threshold))
+
+def soak_snapshots(recording, count_samples):
+    """
+    Returns the list of snapshots of a recording: one dictionary for every
+    resource usage sample, with the time since the application was run (s),
+    rss_kb, fds, cpu_ms and, if 'count_samples', the samples per second
+    received since the previous snapshot ('rate').
+    """
+    usage = recording.usage
+    if not usage:
+        return []
+    spawn = recording.marks.get('spawn', usage[0][0])
+    end = recording.marks.get('check_end')
+    sample_stamps = []
+    if count_samples:
+        sample_stamps = [stamp for stamp, line in recording.complete_lines()
+                if (end is None or stamp <= end)
+                    and parse_sample(line) is not None]
+
+    snapshots = []
+    sample_index = 0
+    previous = None
+    for stamp, rss_kb, cpu_ms, fds in usage:
+        snapshot = {
+            't_s': (stamp - spawn) / 1e9,
+            'rss_kb': rss_kb,
+            'fds': fds,
+            'cpu_ms': cpu_ms}
+        if count_samples:
+            samples = 0
+            while (sample_index < len(sample_stamps)
+                    and sample_stamps[sample_index] <= stamp):
+                sample_index += 1
+                samples += 1
+            if previous is not None and stamp > previous \
+                    and (end is None or stamp <= end):
+                snapshot['rate'] = samples * 1e9 / (stamp - previous)
+        snapshots.append(snapshot)
+        previous = stamp
+    return snapshots
+
+def soak_trends(snapshots):
+    """
+    Trends (per hour) and flags of the snapshots of one application, after
+    the warm-up.
+    """
+    if not snapshots:
+        return {}
+    warmup = snapshots[-1]['t_s'] * SOAK_WARMUP
+    snapshots = [snapshot for snapshot in snapshots
+            if snapshot['t_s'] >= warmup]
+
+    def per_hour(name):
+        slope = linear_trend([(snapshot['t_s'], snapshot[name])
+                for snapshot in snapshots if name in snapshot])
+        return None if slope is None else slope * 3600
+
+    trends = {
+        'rss_kb_per_hour': per_hour('rss_kb'),
+        'fds_per_hour': per_hour('fds'),
+        'memory_growth': grows_monotonically(
+                [snapshot['rss_kb'] for snapshot in snapshots]),
+        'fd_growth': grows_monotonically(
+                [snapshot['fds'] for snapshot in snapshots])}
+    rates = [snapshot['rate'] for snapshot in snapshots if 'rate' in snapshot]
+    if rates:
+        trends['rate_per_hour'] = per_hour('rate')
+        trends['throughput_decay'] = decays_monotonically(rates)
+    return trends
+
+def soak_metrics(parameters, recordings, entity_type):
+    """
+    Metrics function of the soak mode. For every entity:
+        snapshots: list of snapshots (see soak_snapshots()).
+        trends: rss_kb_per_hour, fds_per_hour, rate_per_hour (Subscribers)
+            and the flags memory_growth, fd_growth and throughput_decay
+            (Subscribers).
+    flagged: list of '<entity> <flag>' of the flags set.
+    """
+    entities = {}
+    flagged = []
+    for i, recording in enumerate(recordings):
+        is_subscriber = '-S ' in parameters[i] or parameters[i].endswith('-S')
+        snapshots = soak_snapshots(recording, is_subscriber)
+        trends = soak_trends(snapshots)
+        for flag in ('memory_growth', 'fd_growth', 'throughput_decay'):
+            if trends.get(flag):
+                flagged.append(f'{entity_type[i]} {flag}')
+        entities[entity_type[i]] = {'snapshots': snapshots, 'trends': trends}
+    return {'entities': entities, 'flagged': flagged}
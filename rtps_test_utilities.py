@@ -6,7 +6,10 @@
 # https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
 #
 #################################################################
+import json
 import re
+import shlex
+import time
 
 from enum import Enum
 class ReturnCode(Enum):
@@ -30,6 +33,7 @@ class ReturnCode(Enum):
     ORDERED_ACCESS_TOPIC : Subscriber reading with ordered access and access scope TOPIC
     PUB_UNSUPPORTED_FEATURE  : The test requires a feature not supported by the publisher implementation
     SUB_UNSUPPORTED_FEATURE  : The test requires a feature not supported by the subscriber implementation
+    NO_RESULT            : Publisher/Subscriber process finished without saving any ReturnCode
     """
     OK = 0
     TOPIC_NOT_CREATED = 1
@@ -48,11 +52,112 @@ class ReturnCode(Enum):
     ORDERED_ACCESS_TOPIC = 16
     PUB_UNSUPPORTED_FEATURE = 17
     SUB_UNSUPPORTED_FEATURE = 18
+    NO_RESULT = -1
+
+# Records of the shape_main applications run with '--output-format jsonl':
+# the samples and the instance state changes are printed as one JSON object
+# per line (see print_record_header in srcCxx/shape_main.cxx), for example:
+#   {"event":"sample","ns":12,"seq":1,"topic":"Square","instance":"BLUE",
+#       "x":10,"y":20,"size":30}
+# The rest of the output does not change.
+OUTPUT_FORMAT_OPTION = '--output-format'
+RECORD_OUTPUT_FORMAT = 'jsonl'
+RECORD_PREFIX = '{"event":'
+RECORD_DECODER = json.JSONDecoder()
+SAMPLE_RECORD_PREFIX = '{"event":"sample"'
+
+# The terminal of a shape_main application echoes the SIGINT the harness sends
+# to stop it (as '^C' or as the raw character), which may be printed in the
+# middle of a sample line.
+INTERRUPT_ECHO_PATTERN = re.compile(r'\^C|\x03')
+
+# Subscribers run with '--stats-interval <ms>' print, instead of the samples,
+# one summary per instance every interval (see SampleStatistics in
+# srcCxx/shape_main.cxx), for example:
+#   stats: topic=Square instance=BLUE interval_ns=1000123456 samples=1000
+#       bytes=17000 samples_per_s=999.9 bytes_per_s=16997.9 gaps=0
+#       duplicates=0 min_seq=1 max_seq=1000
+# or the record {"event":"stats",...} with the same fields.
+STATS_OPTION = '--stats-interval'
+STATS_PREFIX = 'stats: '
+STATS_RECORD_PREFIX = '{"event":"stats"'
+STATS_PATTERN = re.compile(re.escape(STATS_PREFIX) + r'[^\n]*\n|'
+    + re.escape(STATS_RECORD_PREFIX) + r'[^\n]*\n')
+
+# First sample printed by a shape_main application: the '[size]' of a text
+# line, a whole sample record or a whole summary (STATS_PATTERN).
+SAMPLE_START_PATTERN = re.compile(
+    r'\[[0-9]+\]|' + re.escape(SAMPLE_RECORD_PREFIX) + r'[^\n]*\n|'
+    + STATS_PATTERN.pattern)
+
+def parse_record(line):
+    """
+    Returns the dictionary of the record in 'line', or None if the line is
+    not a record. No regular expression is used.
+    """
+    start = line.find(RECORD_PREFIX)
+    if start < 0:
+        return None
+    try:
+        # The record may be followed by other output of the application
+        record, _ = RECORD_DECODER.raw_decode(line, start)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+def parse_stats(line):
+    """
+    Returns the dictionary of the summary (text or record) in 'line', with
+    the same keys as the record, or None if the line is not a summary. No
+    regular expression is used.
+    """
+    record = parse_record(line)
+    if record is not None:
+        return record if record.get('event') == 'stats' else None
+    start = line.find(STATS_PREFIX)
+    if start < 0:
+        return None
+    stats = {'event': 'stats'}
+    for field in line[start + len(STATS_PREFIX):].split():
+        name, _, value = field.partition('=')
+        if name in ('topic', 'instance'):
+            stats[name] = value
+            continue
+        try:
+            stats[name] = float(value) if '.' in value else int(value)
+        except ValueError:
+            return None
+    return stats
 
 def log_message(message, verbosity):
     if verbosity:
         print(message)
 
+def shape_main_options(parameters):
+    """ Splits a shape_main application parameter list into options. """
+    return shlex.split(parameters)
+
+def option_value(options, name, default=None):
+    """
+    Returns the value of the option 'name' (for example '-k') in the list
+    returned by shape_main_options(), or 'default' if it is not present.
+    """
+    if name in options:
+        index = options.index(name)
+        if index + 1 < len(options):
+            return options[index + 1]
+    return default
+
+def receive_time(child):
+    """
+    Returns the time (ns) at which the output just matched in 'child' was
+    read: the monotonic clock, or the virtual clock of a replayed recording
+    (rtps_recording.ReplayChild), so it can be compared with the time stamps
+    of the recordings.
+    """
+    now = getattr(child, 'now', None)
+    return time.monotonic_ns() if now is None else now
+
 def remove_ansi_colors(text):
     ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
     cleaned_str = ansi_escape.sub('', text)
@@ -61,8 +166,15 @@ def remove_ansi_colors(text):
 def no_check(child_sub, samples_sent, last_sample_saved, timeout):
     return ReturnCode.OK
 
+no_check.record_output = True
+
 def basic_check(child_sub, samples_sent, last_sample_saved, timeout):
     """ Only checks that the data is well formed and size is not zero."""
+    record = parse_record(child_sub.after)
+    if record is not None and record.get('event') == 'sample':
+        return (ReturnCode.DATA_NOT_CORRECT if record['size'] == 0
+                else ReturnCode.OK)
+
     sub_string = re.search(r'\w\s+\w+\s+[0-9]+ [0-9]+ \[([0-9]+)\]',
         child_sub.before + child_sub.after)
 
@@ -75,3 +187,5 @@ def basic_check(child_sub, samples_sent, last_sample_saved, timeout):
         return ReturnCode.DATA_NOT_CORRECT
 
     return ReturnCode.OK
+
+basic_check.record_output = True
@@ -0,0 +1,786 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+# Composable validators for the checking functions of the Test Suites.
+#
+# A SampleValidator reads the samples printed by a subscriber shape_main
+# application once and forwards each one of them to a list of stateful
+# rules. All rules share the same sample budget (the number of samples read
+# before the validator finishes). A SampleValidator can be used directly as
+# the 'check_function' of a Test Case:
+#
+#       'check_function' : SampleValidator(PerInstanceNoGaps(),
+#                               name='my_check_function'),
+#
+# Writing a new rule only requires subclassing Rule and overriding the
+# callbacks needed:
+#   * on_sample(sample): called for every sample received.
+#   * on_marker(marker): called for every marker line (for example
+#         'Reading coherent sets') the rule lists in its 'markers' attribute.
+#   * result(): called when the sample budget is reached (or the validator
+#         finished on timeout and does not require the budget).
+# on_sample() and on_marker() return None to continue reading or a
+# ReturnCode to finish the validation with that ReturnCode.
+
+import copy
+import re
+import pexpect
+
+from rtps_test_utilities import ReturnCode, basic_check, receive_time, \
+    parse_record, SAMPLE_RECORD_PREFIX, INTERRUPT_ECHO_PATTERN
+
+# Default number of samples (of the first instance) that the validators read.
+# This is the same value as test_suite_functions.MAX_SAMPLES_READ.
+MAX_SAMPLES_READ = 500
+
+# The terminal echoes the SIGINT sent to stop the applications as '^C', which
+# is glued to the next line if the application keeps printing samples.
+SAMPLE_PATTERN = re.compile(
+    r'(?:\^C)?(\w+)\s+(\w+)\s+([0-9]+)\s+([0-9]+)\s+\[([0-9]+)\]')
+# End of the sample lines printed with --timestamps, after the optional
+# '{payload}': ' ns=<monotonic time>[ source_ns=<source timestamp>]'.
+TIMESTAMPS_PATTERN = re.compile(
+    r'(?: \{[0-9]+\})? ns=([0-9]+)(?: source_ns=(-?[0-9]+))?')
+
+class Sample:
+    """
+    Sample printed by a shape_main application. 'stamp' is the time (ns) at
+    which the harness read it (see rtps_test_utilities.receive_time). 'ns'
+    is the monotonic time at which the application wrote or read it and
+    'source_ns' the source timestamp of the samples read, if the application
+    printed them (option --timestamps; 'ns' is also the time the records of
+    --output-format jsonl are printed), otherwise None.
+    """
+    __slots__ = ('topic', 'instance', 'x', 'y', 'size', 'stamp', 'ns',
+            'source_ns')
+
+    def __init__(self, topic, instance, x, y, size, stamp=None, ns=None,
+            source_ns=None):
+        self.topic = topic
+        self.instance = instance
+        self.x = x
+        self.y = y
+        self.size = size
+        self.stamp = stamp
+        self.ns = ns
+        self.source_ns = source_ns
+
+    @classmethod
+    def from_match(cls, match, stamp=None):
+        sample = cls(match.group(1), match.group(2), int(match.group(3)),
+                int(match.group(4)), int(match.group(5)), stamp)
+        timestamps = TIMESTAMPS_PATTERN.match(match.string, match.end())
+        if timestamps is not None:
+            sample.ns = int(timestamps.group(1))
+            if timestamps.group(2) is not None:
+                sample.source_ns = int(timestamps.group(2))
+        return sample
+
+    @classmethod
+    def from_record(cls, record, stamp=None):
+        # without --timestamps, 'ns' is the time the record was printed
+        return cls(record['topic'], record['instance'], record['x'],
+                record['y'], record['size'], stamp, record.get('ns'),
+                record.get('source_ns'))
+
+def parse_sample(line, stamp=None):
+    """
+    Returns the Sample printed in 'line' (text or record, see
+    rtps_test_utilities.parse_record), or None if there is no sample.
+    """
+    record = parse_record(line)
+    if record is not None:
+        if record.get('event') != 'sample':
+            return None
+        return Sample.from_record(record, stamp)
+    match = SAMPLE_PATTERN.search(line)
+    return None if match is None else Sample.from_match(match, stamp)
+
+def iter_samples(text):
+    """
+    Yields the Samples printed in 'text'. Text output is parsed with a
+    single pass of SAMPLE_PATTERN; output with records line by line.
+    """
+    text = INTERRUPT_ECHO_PATTERN.sub('', text)
+    if SAMPLE_RECORD_PREFIX not in text:
+        for match in SAMPLE_PATTERN.finditer(text):
+            yield Sample.from_match(match)
+        return
+    for line in text.splitlines():
+        sample = parse_sample(line)
+        if sample is not None:
+            yield sample
+
+class Rule:
+    """
+    Base class of the rules a SampleValidator runs. Rules are copied every
+    time the validator runs, so they can keep their state in attributes.
+
+    markers: list of strings that identify the marker lines the rule
+            needs. The marker passed to on_marker() is one of these strings.
+    """
+    markers = ()
+
+    def on_sample(self, sample):
+        return None
+
+    def on_marker(self, marker):
+        return None
+
+    def result(self):
+        return ReturnCode.OK
+
+class _SeqState:
+    __slots__ = ('seq_num',)
+
+    def __init__(self, seq_num):
+        self.seq_num = seq_num
+
+class PerInstanceMonotonic(Rule):
+    """
+    Checks that the value of the "size" member is always increasing for
+    every instance. Gaps are allowed (for example BEST_EFFORT reliability)
+    but duplicates and out-of-order samples are not.
+    """
+    def __init__(self):
+        self.instances = {}
+
+    def on_sample(self, sample):
+        key = (sample.topic, sample.instance)
+        instance = self.instances.get(key)
+        if instance is None:
+            self.instances[key] = _SeqState(sample.size)
+            return None
+        if sample.size <= instance.seq_num:
+            return ReturnCode.DATA_NOT_CORRECT
+        instance.seq_num = sample.size
+        return None
+
+class PerInstanceNoGaps(Rule):
+    """
+    Checks that the value of the "size" member of every instance increases
+    exactly by one between consecutive samples: no losses, no duplicates and
+    no out-of-order samples.
+    """
+    def __init__(self):
+        self.instances = {}
+
+    def on_sample(self, sample):
+        key = (sample.topic, sample.instance)
+        instance = self.instances.get(key)
+        if instance is None:
+            self.instances[key] = _SeqState(sample.size)
+            return None
+        instance.seq_num += 1
+        if sample.size != instance.seq_num:
+            return ReturnCode.DATA_NOT_CORRECT
+        return None
+
+class _HistoryState:
+    __slots__ = ('seq_num', 'count')
+
+    def __init__(self, seq_num):
+        self.seq_num = seq_num
+        self.count = 1
+
+class PerInstanceHistory(Rule):
+    """
+    Checks that a subscriber that joins late receives the KEEP_LAST 'depth'
+    history of the 'num_instances' instances of the publisher: the first
+    'depth' samples of every instance must have consecutive values of the
+    "size" member, and so must the next one (the first sample written after
+    the subscriber joined), so the history ends at the last sample sent
+    before it joined. The validation finishes with OK once every instance
+    received 'depth' + 1 samples, otherwise the result is DATA_NOT_CORRECT.
+    """
+    def __init__(self, depth, num_instances):
+        self.depth = depth
+        self.num_instances = num_instances
+        self.instances = {}
+        self.complete = 0
+
+    def on_sample(self, sample):
+        key = (sample.topic, sample.instance)
+        instance = self.instances.get(key)
+        if instance is None:
+            self.instances[key] = _HistoryState(sample.size)
+            return None
+        if instance.count > self.depth:
+            return None
+        instance.seq_num += 1
+        if sample.size != instance.seq_num:
+            print(f'{sample.topic} {sample.instance}: sample {sample.size} '
+                    f'received instead of {instance.seq_num} after '
+                    f'{instance.count} samples of the history')
+            return ReturnCode.DATA_NOT_CORRECT
+        instance.count += 1
+        if instance.count > self.depth:
+            self.complete += 1
+            if self.complete == self.num_instances:
+                return ReturnCode.OK
+        return None
+
+    def result(self):
+        if self.complete == self.num_instances:
+            return ReturnCode.OK
+        print(f'History received for {self.complete} of '
+                f'{self.num_instances} instances')
+        return ReturnCode.DATA_NOT_CORRECT
+
+class SourcePartitionedBySize(Rule):
+    """
+    Checks whether the samples come from one or several publishers that
+    publish different values of the "size" member. The first change of size
+    is ignored (the subscriber may start receiving from one publisher and
+    then switch to the other one). Receiving a size again after it
+    changed finishes with RECEIVING_FROM_BOTH, otherwise the result is
+    RECEIVING_FROM_ONE.
+    """
+    def __init__(self):
+        self.current_size = None
+        self.ignore_first_change = True
+
+    def on_sample(self, sample):
+        if self.current_size is None:
+            self.current_size = sample.size
+        elif sample.size != self.current_size:
+            if not self.ignore_first_change:
+                return ReturnCode.RECEIVING_FROM_BOTH
+            self.ignore_first_change = False
+            self.current_size = sample.size
+        return None
+
+    def result(self):
+        return ReturnCode.RECEIVING_FROM_ONE
+
+class SizeInRange(Rule):
+    """
+    Checks that the value of the "size" member of every sample is between
+    'min_size' and 'max_size' (inclusive), for example the samples that pass
+    a ContentFilteredTopic on "shapesize".
+    """
+    def __init__(self, min_size, max_size):
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def on_sample(self, sample):
+        if sample.size < self.min_size or sample.size > self.max_size:
+            return ReturnCode.DATA_NOT_CORRECT
+        return None
+
+class _OwnerState:
+    __slots__ = ('strength', 'handed_over')
+
+    def __init__(self, strength):
+        self.strength = strength
+        self.handed_over = False
+
+class StrongestWriterOwns(Rule):
+    """
+    Checks EXCLUSIVE ownership with several publishers that publish
+    different values of the "size" member with different strengths.
+    'strengths' is a dictionary size -> ownership strength of the publisher
+    sending it.
+
+    While the subscriber discovers the publishers, the owner of every
+    instance may change to stronger publishers. Once the owner changes to a
+    weaker publisher (the owner stopped), the owner can only change to
+    weaker publishers again: receiving a stronger publisher (for example the
+    one that lost the ownership) or a size no publisher sends finishes with
+    DATA_NOT_CORRECT.
+    """
+    def __init__(self, strengths):
+        self.strengths = strengths
+        self.instances = {}
+
+    def on_sample(self, sample):
+        strength = self.strengths.get(sample.size)
+        if strength is None:
+            return ReturnCode.DATA_NOT_CORRECT
+        key = (sample.topic, sample.instance)
+        instance = self.instances.get(key)
+        if instance is None:
+            self.instances[key] = _OwnerState(strength)
+        elif strength > instance.strength:
+            if instance.handed_over:
+                return ReturnCode.DATA_NOT_CORRECT
+            instance.strength = strength
+        elif strength < instance.strength:
+            instance.handed_over = True
+            instance.strength = strength
+        return None
+
+class _RunState:
+    __slots__ = ('seq_num', 'ignore_first_gap', 'run_length')
+
+    def __init__(self, seq_num):
+        self.seq_num = seq_num
+        self.ignore_first_gap = True
+        self.run_length = 1
+
+class ConsecutiveRunLength(Rule):
+    """
+    Checks that the runs of consecutive values of the "size" member of
+    every instance have one of the allowed lengths (for example 2 or 3 when
+    a LIFESPAN expires the rest of the samples). The first gap of every
+    instance is ignored if no consecutive samples were received before it.
+    The result is DATA_NOT_CORRECT if no run finished during the validation
+    (the samples never expired).
+    """
+    def __init__(self, allowed=(2, 3)):
+        self.allowed = frozenset(allowed)
+        self.instances = {}
+        self.run_finished = False
+
+    def on_sample(self, sample):
+        key = (sample.topic, sample.instance)
+        instance = self.instances.get(key)
+        if instance is None:
+            self.instances[key] = _RunState(sample.size)
+            return None
+        if instance.seq_num + 1 == sample.size:
+            instance.run_length += 1
+            instance.ignore_first_gap = False
+        elif instance.run_length in self.allowed:
+            instance.run_length = 1
+            self.run_finished = True
+        elif instance.ignore_first_gap:
+            instance.ignore_first_gap = False
+        else:
+            return ReturnCode.DATA_NOT_CORRECT
+        instance.seq_num = sample.size
+        return None
+
+    def result(self):
+        if self.run_finished:
+            return ReturnCode.OK
+        return ReturnCode.DATA_NOT_CORRECT
+
+class CoherentSetSize(Rule):
+    """
+    Checks that every time the subscriber reads coherent sets it receives
+    'expected' samples. The first 'ignore_first' reads that return samples
+    are not checked, as the DataReader may receive several coherent sets at
+    the beginning.
+    """
+    markers = ('Reading coherent sets',)
+
+    def __init__(self, expected, ignore_first=2):
+        self.expected = expected
+        self.ignore_first = ignore_first
+        self.count = 0
+
+    def on_sample(self, sample):
+        self.count += 1
+        return None
+
+    def on_marker(self, marker):
+        if self.count == 0:
+            return None
+        if self.ignore_first > 0:
+            self.ignore_first -= 1
+        elif self.count != self.expected:
+            print(f'Coherent set sample count is {self.count} instead of '
+                    f'{self.expected}')
+            return ReturnCode.DATA_NOT_CORRECT
+        self.count = 0
+        return None
+
+class CoherentSetDigest(Rule):
+    """
+    Checks that the subscriber reads complete coherent sets. In every
+    coherent set the publisher writes 'samples_per_instance' samples of
+    every instance of every topic ('topics' and 'instances' are lists of
+    names) with increasing values of the "size" member (publisher option
+    -z 0), so the coherent set of a sample is
+    (size - 1) // samples_per_instance.
+
+    The samples read between two 'Reading coherent sets' markers are
+    grouped by coherent set, and every set is compared with the expected
+    one using its number of samples and a multiset digest (the sum of the
+    hashes of its samples), so the validation is O(samples) regardless of
+    the number of topics and instances. The first 'ignore_first' reads that
+    return samples are not checked, as the subscriber may start reading in
+    the middle of a coherent set. Every read may return up to
+    'max_sets_per_read' coherent sets (None: no limit). The result is
+    DATA_NOT_RECEIVED if no coherent set was checked.
+    """
+    markers = ('Reading coherent sets',)
+
+    _DIGEST_MASK = (1 << 64) - 1
+
+    def __init__(self, topics, instances, samples_per_instance,
+            ignore_first=2, max_sets_per_read=1):
+        self.topics = list(topics)
+        self.instances = list(instances)
+        self.samples_per_instance = samples_per_instance
+        self.set_size = len(self.topics) * len(self.instances) \
+                * samples_per_instance
+        self.ignore_first = ignore_first
+        self.max_sets_per_read = max_sets_per_read
+        # coherent set -> [number of samples, digest] of the current read
+        self.sets = {}
+        self.sets_checked = 0
+
+    def on_sample(self, sample):
+        coherent_set = (sample.size - 1) // self.samples_per_instance
+        state = self.sets.get(coherent_set)
+        if state is None:
+            state = self.sets[coherent_set] = [0, 0]
+        state[0] += 1
+        state[1] = (state[1] + hash((sample.topic, sample.instance,
+                sample.size))) & self._DIGEST_MASK
+        return None
+
+    def expected_digest(self, coherent_set):
+        first_size = coherent_set * self.samples_per_instance + 1
+        sizes = range(first_size, first_size + self.samples_per_instance)
+        digest = 0
+        for topic in self.topics:
+            for instance in self.instances:
+                for size in sizes:
+                    digest += hash((topic, instance, size))
+        return digest & self._DIGEST_MASK
+
+    def on_marker(self, marker):
+        if not self.sets:
+            return None
+        sets, self.sets = self.sets, {}
+        if self.ignore_first > 0:
+            self.ignore_first -= 1
+            return None
+        if (self.max_sets_per_read is not None
+                and len(sets) > self.max_sets_per_read):
+            print(f'{len(sets)} coherent sets read at once instead of '
+                    f'{self.max_sets_per_read}')
+            return ReturnCode.DATA_NOT_CORRECT
+        for coherent_set, (count, digest) in sets.items():
+            if count != self.set_size:
+                print(f'Coherent set sample count is {count} instead of '
+                        f'{self.set_size}')
+                return ReturnCode.DATA_NOT_CORRECT
+            if digest != self.expected_digest(coherent_set):
+                print(f'Coherent set {coherent_set} does not contain the '
+                        'expected samples')
+                return ReturnCode.DATA_NOT_CORRECT
+        self.sets_checked += len(sets)
+        return None
+
+    def result(self):
+        if self.sets_checked == 0:
+            return ReturnCode.DATA_NOT_RECEIVED
+        return ReturnCode.OK
+
+def write_time_model(points):
+    """
+    Estimates when the samples of one instance were written, assuming the
+    publisher writes them periodically, from the (sequence number, stamp)
+    pairs of the samples received (stamps in ns, in reception order).
+    Returns (period, offset) so that the sample 'seq' was written at
+    offset + seq * period, or None if there are not enough samples.
+
+    The period is the least-squares slope of the stamps over the sequence
+    numbers, ignoring the first sample (it may be delivered late, when the
+    subscriber matches), so it includes the execution overhead of the
+    publisher. The offset is taken from the sample received with the lowest
+    delay: the ages computed with the model are relative to the fastest
+    delivery.
+    """
+    fitted = points[1:]
+    if len(fitted) < 2:
+        return None
+    mean_seq = sum(seq for seq, _ in fitted) / len(fitted)
+    mean_stamp = sum(stamp for _, stamp in fitted) / len(fitted)
+    variance = sum((seq - mean_seq) ** 2 for seq, _ in fitted)
+    if variance == 0:
+        return None
+    period = sum((seq - mean_seq) * (stamp - mean_stamp)
+            for seq, stamp in fitted) / variance
+    offset = min(stamp - seq * period for seq, stamp in points)
+    return period, offset
+
+def _summary_ms(values):
+    return (f'min {min(values) / 1e6:.1f}, '
+            f'mean {sum(values) / len(values) / 1e6:.1f}, '
+            f'max {max(values) / 1e6:.1f}')
+
+class _TimedRule(Rule):
+    """ Base class of the rules that keep the samples received with stamps. """
+    def __init__(self):
+        self.instances = {}
+
+    def on_sample(self, sample):
+        self.instances.setdefault((sample.topic, sample.instance), []).append(
+                (sample.size, sample.stamp))
+        return None
+
+def filter_intervals(points):
+    """
+    Returns the write period (ns) and the time between the writing of
+    consecutive samples received (ns) of one instance (see
+    write_time_model), ignoring the first sample, or None.
+    """
+    model = write_time_model(points)
+    if model is None:
+        return None
+    period = model[0]
+    return period, [(points[i][0] - points[i - 1][0]) * period
+            for i in range(2, len(points))]
+
+class TimeBasedFilterInterval(_TimedRule):
+    """
+    Checks the TIME_BASED_FILTER of 'time_filter' ms using the time at which
+    the samples were received instead of the number of samples filtered.
+    The time between the writing of consecutive samples received is
+    measured with write_time_model(). The minimum must not be lower than
+    the filter and the mean must not be higher than the filter plus one
+    write period, with a tolerance of half the write period.
+    """
+    def __init__(self, time_filter):
+        super().__init__()
+        self.time_filter = time_filter * 1e6
+
+    def result(self):
+        measured = False
+        for (topic, instance), points in self.instances.items():
+            intervals = filter_intervals(points)
+            if intervals is None:
+                continue
+            period, values = intervals
+            if not values:
+                continue
+            measured = True
+            print(f'{topic} {instance}: write period {period / 1e6:.1f} ms, '
+                    f'filter interval (ms): {_summary_ms(values)}')
+            if (min(values) < self.time_filter - period / 2
+                    or sum(values) / len(values)
+                        > self.time_filter + period * 1.5):
+                return ReturnCode.DATA_NOT_CORRECT
+        return ReturnCode.OK if measured else ReturnCode.DATA_NOT_RECEIVED
+
+def lifespan_ages(points):
+    """
+    Returns the write period (ns), the age (ns) of every sample of one
+    instance when it was received and the age (ns) of every sample not
+    received when the next one was received (see write_time_model),
+    ignoring the samples before the second one received, or None.
+    """
+    model = write_time_model(points)
+    if model is None:
+        return None
+    period, offset = model
+    ages = [stamp - offset - seq * period for seq, stamp in points[1:]]
+    missing_ages = []
+    for i in range(2, len(points)):
+        stamp = points[i][1]
+        for seq in range(points[i - 1][0] + 1, points[i][0]):
+            missing_ages.append(stamp - offset - seq * period)
+    return period, ages, missing_ages
+
+class LifespanExpiry(_TimedRule):
+    """
+    Checks the LIFESPAN of 'lifespan' ms using the time at which the
+    samples were received instead of the number of consecutive samples. The
+    age of the samples is computed with write_time_model(): every sample
+    received must be younger than the lifespan and every sample not received
+    must be older than the lifespan when the next one is received, with a
+    tolerance of half the write period. At least one sample must expire.
+    """
+    def __init__(self, lifespan):
+        super().__init__()
+        self.lifespan = lifespan * 1e6
+
+    def result(self):
+        expired = False
+        for (topic, instance), points in self.instances.items():
+            measured = lifespan_ages(points)
+            if measured is None:
+                continue
+            period, ages, missing_ages = measured
+            print(f'{topic} {instance}: write period {period / 1e6:.1f} ms, '
+                    f'age received (ms): {_summary_ms(ages)}'
+                    + (f', age expired (ms): {_summary_ms(missing_ages)}'
+                        if missing_ages else ''))
+            if max(ages) > self.lifespan + period / 2:
+                return ReturnCode.DATA_NOT_CORRECT
+            if missing_ages:
+                expired = True
+                if min(missing_ages) < self.lifespan - period / 2:
+                    return ReturnCode.DATA_NOT_CORRECT
+        return ReturnCode.OK if expired else ReturnCode.DATA_NOT_CORRECT
+
+class SampleValidator:
+    """
+    Checking function that runs several rules in one pass over the samples
+    received by the subscriber.
+
+    rules: Rule objects. They are copied every time the validator runs.
+    name: name of the checking function (shown in the logs).
+    max_samples: sample budget. When it is reached the result is the first
+            ReturnCode different than OK returned by the rules' result(),
+            or OK.
+    count_first_instance_only: if True, only the samples of the first
+            instance (and topic) received count for the budget (as the
+            *_w_instances checking functions do). Otherwise all samples
+            count.
+    require_budget: if True, finishing because of a timeout before reaching
+            the budget returns DATA_NOT_RECEIVED. Otherwise the result is
+            computed with the rules' result().
+    markers: additional marker strings consumed (and ignored) while reading.
+    max_markers: number of marker lines read after which the validator
+            finishes with DATA_NOT_RECEIVED (the subscriber is not printing
+            samples). Default: max_samples.
+
+    If the subscriber prints records (--output-format jsonl), the output is
+    read line by line and the lines are parsed without regular expressions.
+    """
+    # the harness can run the applications with --output-format jsonl
+    record_output = True
+    def __init__(self, *rules, name='sample_validator',
+            max_samples=MAX_SAMPLES_READ, count_first_instance_only=True,
+            require_budget=True, markers=(), max_markers=None):
+        self.rules = rules
+        self.__name__ = name
+        self.max_samples = max_samples
+        self.max_markers = max_samples if max_markers is None else max_markers
+        self.count_first_instance_only = count_first_instance_only
+        self.require_budget = require_budget
+
+        self.markers = list(markers)
+        for rule in rules:
+            for marker in rule.markers:
+                if marker not in self.markers:
+                    self.markers.append(marker)
+
+    def _result(self, rules):
+        for rule in rules:
+            retcode = rule.result()
+            if retcode != ReturnCode.OK:
+                return retcode
+        return ReturnCode.OK
+
+    def _expect_record(self, child_sub, timeout):
+        """
+        Equivalent to the child_sub.expect() of the text output for the
+        output with records. Returns the index of the pattern matched
+        (0: sample, 1..len(markers): marker, then TIMEOUT and EOF) and the
+        Sample read, if any.
+        """
+        while True:
+            index = child_sub.expect_exact(
+                    ['\n', pexpect.TIMEOUT, pexpect.EOF], timeout)
+            if index != 0:
+                return len(self.markers) + index, None
+            line = child_sub.before
+            record = parse_record(line)
+            if record is not None:
+                if record.get('event') == 'sample':
+                    return 0, Sample.from_record(record,
+                            receive_time(child_sub))
+                continue
+            for i, marker in enumerate(self.markers):
+                if marker in line:
+                    return i + 1, None
+
+    def __call__(self, child_sub, samples_sent, last_sample_saved, timeout):
+        basic_check_retcode = basic_check(child_sub, samples_sent,
+                last_sample_saved, timeout)
+        if basic_check_retcode != ReturnCode.OK:
+            return basic_check_retcode
+
+        rules = copy.deepcopy(self.rules)
+        sample_rules = [rule.on_sample for rule in rules
+                if type(rule).on_sample is not Rule.on_sample]
+        # marker index in the expect list -> callbacks of the rules using it
+        marker_rules = {}
+        for i, marker in enumerate(self.markers):
+            marker_rules[i + 1] = (marker, [rule.on_marker for rule in rules
+                    if marker in rule.markers])
+
+        patterns = [SAMPLE_PATTERN]
+        patterns += [re.compile(re.escape(marker) + r'.*?\n')
+                for marker in self.markers]
+        timeout_index = len(patterns)
+        eof_index = timeout_index + 1
+        patterns += [pexpect.TIMEOUT, pexpect.EOF]
+
+        # The first sample has already been matched by the caller
+        record = parse_record(child_sub.after)
+        records = record is not None
+        if records:
+            sample = Sample.from_record(record, receive_time(child_sub))
+        else:
+            match = SAMPLE_PATTERN.search(child_sub.before + child_sub.after)
+            sample = Sample.from_match(match, receive_time(child_sub))
+        first_instance = (sample.topic, sample.instance)
+        instances = {}
+        samples_read = 0
+        marker_count = 0
+        produced_code = None
+
+        while samples_read < self.max_samples:
+            if sample is not None:
+                instances[sample.instance] = None
+                for on_sample in sample_rules:
+                    produced_code = on_sample(sample)
+                    if produced_code is not None:
+                        break
+                if produced_code is not None:
+                    break
+
+            if records:
+                index, next_sample = self._expect_record(child_sub, timeout)
+            else:
+                index = child_sub.expect(patterns, timeout)
+            if index == 0:
+                # the sample processed counts for the budget once the next
+                # one is read
+                if not self.count_first_instance_only:
+                    samples_read += 1
+                elif (sample is not None
+                        and (sample.topic, sample.instance) == first_instance):
+                    samples_read += 1
+                if records:
+                    sample = next_sample
+                else:
+                    sample = Sample.from_match(child_sub.match,
+                            receive_time(child_sub))
+                continue
+            sample = None
+            if index == timeout_index:
+                # no more data to process
+                break
+            elif index == eof_index:
+                return ReturnCode.DATA_NOT_RECEIVED
+            else:
+                marker_count += 1
+                marker, callbacks = marker_rules[index]
+                for on_marker in callbacks:
+                    produced_code = on_marker(marker)
+                    if produced_code is not None:
+                        break
+                if produced_code is not None:
+                    break
+                # Exit condition in case there are no samples being printed
+                if marker_count > self.max_markers:
+                    produced_code = ReturnCode.DATA_NOT_RECEIVED
+                    break
+
+        if produced_code is None:
+            if samples_read == self.max_samples or not self.require_budget:
+                produced_code = self._result(rules)
+            else:
+                produced_code = ReturnCode.DATA_NOT_RECEIVED
+
+        if self.count_first_instance_only:
+            print(f'Samples read per instance: {samples_read}, '
+                    f'instances: {list(instances)}')
+        else:
+            print(f'Samples read: {samples_read}')
+        return produced_code
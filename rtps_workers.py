@@ -0,0 +1,273 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+# Persistent shape_main applications (option --persistent-workers of the
+# interoperability_report).
+#
+# A shape_main application run with '--control stdin' stays alive between
+# Test Cases: it prints CONTROL_READY and runs the commands read from stdin
+# ('run <parameters>', 'stop', 'reset' and 'exit', see run_control in
+# srcCxx/shape_main.cxx). Every run ends with 'control: exit <code>'. The
+# library is loaded and initialized once, and the participant is reused by
+# the next run if it has the same options, so the Test Cases do not pay the
+# startup of the applications.
+#
+# The WorkerPool of the main process keeps the idle applications (Worker)
+# of every executable. run_test() takes one for every entity of the Test
+# Case and the process of the entity (forked, so it inherits the
+# pseudo-terminal of the application) runs it with Worker.run(), which
+# returns a WorkerChild: a pexpect-like object for which the end of the run
+# is the EOF of the application. This way publisher_steps(),
+# subscriber_steps(), the checking functions and stop_process() work without
+# changes. A Worker whose run does not end cleanly is killed and replaced.
+
+import multiprocessing
+import os
+import re
+import signal
+
+import pexpect
+import pexpect.fdpexpect
+
+CONTROL_OPTION = '--control'
+CONTROL_READY_PATTERN = re.compile(r'control: ready\r?\n')
+CONTROL_EXIT = 'control: exit '
+CONTROL_EXIT_PATTERN = re.compile(re.escape(CONTROL_EXIT) + r'(-?[0-9]+)\r?\n')
+# character that the pseudo-terminal turns into a SIGINT (Ctrl-C)
+INTR_CHAR = chr(3)
+
+_application_help = {}
+def application_help(executable):
+    """
+    Returns the output of 'executable -h' (empty if it cannot be run). The
+    result is cached.
+    """
+    if executable not in _application_help:
+        try:
+            help_text = pexpect.run(f'{executable} -h', timeout=10,
+                    encoding='utf-8')
+        except (pexpect.ExceptionPexpect, OSError):
+            help_text = ''
+        _application_help[executable] = help_text
+    return _application_help[executable]
+
+class WorkerChild:
+    """
+    Run of a Worker in the process of an entity. It behaves like the
+    pexpect.spawn of a shape_main application run with 'parameters': the end
+    of the run is the EOF, isalive() returns False once the run finished and
+    terminate() kills the application.
+    """
+    def __init__(self, worker, parameters):
+        self.worker = worker
+        self.pid = worker.pid
+        self.flag_eof = False
+        self.exitstatus = None
+        # the pexpect.spawn of the Worker belongs to the main process, which
+        # is the only one that may wait for the application
+        self._child = pexpect.fdpexpect.fdspawn(worker.process.child_fd,
+                encoding='utf-8')
+        self._tail = ''
+        self._child.sendline(f'run {parameters}')
+
+    def __getattr__(self, name):
+        # before, after, match...
+        return getattr(self._child, name)
+
+    @property
+    def logfile(self):
+        return self._child.logfile_read
+
+    @logfile.setter
+    def logfile(self, value):
+        # the commands sent are not part of the output
+        self._child.logfile_read = value
+
+    def _end_run(self, exit_line=None):
+        """
+        Called when the end of the run ('control: exit <code>') or the EOF is
+        read. 'exit_line' is the text from the 'control: exit' marker, None
+        if it was the EOF.
+        """
+        self.flag_eof = True
+        if exit_line is None:
+            return
+        if '\n' not in exit_line:
+            # read the rest of the line, so the next run does not get it
+            try:
+                self._child.expect_exact('\n', timeout=1)
+                exit_line += self._child.before
+            except (pexpect.TIMEOUT, pexpect.EOF):
+                return
+        try:
+            self.exitstatus = int(exit_line[len(CONTROL_EXIT):].split()[0])
+        except (ValueError, IndexError):
+            return
+        self.worker.released.value = 1
+
+    def _expect(self, expect, pattern, timeout, exit_pattern):
+        patterns = pattern if isinstance(pattern, list) else [pattern]
+        eof_index = patterns.index(pexpect.EOF) \
+                if pexpect.EOF in patterns else None
+        if self.flag_eof:
+            if eof_index is None:
+                raise pexpect.EOF('The run of the application finished.')
+            return eof_index
+        # the end of the run is matched as the EOF, the EOF (the application
+        # exited) is added at the end
+        patterns = [exit_pattern if element is pexpect.EOF else element
+                for element in patterns]
+        exit_index = eof_index
+        if exit_index is None:
+            exit_index = len(patterns)
+            patterns.append(exit_pattern)
+        patterns.append(pexpect.EOF)
+        index = expect(patterns, timeout)
+        if index == exit_index:
+            self._end_run(self._child.after)
+        elif index == len(patterns) - 1:
+            self._end_run()
+        else:
+            return index
+        if eof_index is None:
+            raise pexpect.EOF('The run of the application finished.')
+        return eof_index
+
+    def expect(self, pattern, timeout=-1):
+        return self._expect(self._child.expect, pattern, timeout,
+                CONTROL_EXIT_PATTERN)
+
+    def expect_exact(self, pattern, timeout=-1):
+        return self._expect(self._child.expect_exact, pattern, timeout,
+                CONTROL_EXIT)
+
+    def read_nonblocking(self, size=1, timeout=-1):
+        if self.flag_eof:
+            raise pexpect.EOF('The run of the application finished.')
+        try:
+            data = self._child.read_nonblocking(size, timeout)
+        except pexpect.EOF:
+            self._end_run()
+            raise
+        # the marker may be split between two reads
+        self._tail = (self._tail + data)[-(len(data) + len(CONTROL_EXIT)):]
+        position = self._tail.find(CONTROL_EXIT)
+        if position >= 0:
+            self._end_run(self._tail[position:])
+        return data
+
+    def isalive(self):
+        if self.flag_eof:
+            return False
+        try:
+            self.expect(pexpect.EOF, timeout=0)
+        except pexpect.TIMEOUT:
+            return True
+        return False
+
+    def sendintr(self):
+        self._child.send(INTR_CHAR)
+
+    def terminate(self, force=False):
+        try:
+            os.kill(self.pid, signal.SIGKILL if force else signal.SIGTERM)
+        except OSError:
+            pass
+        self.flag_eof = True
+        return True
+
+class Worker:
+    """
+    shape_main application 'executable' run with '--control stdin'. Raises
+    pexpect.ExceptionPexpect if it does not get ready within 'timeout'.
+    """
+    def __init__(self, executable, timeout):
+        self.executable = executable
+        self.process = pexpect.spawnu(f'{executable} {CONTROL_OPTION} stdin',
+                echo=False)
+        try:
+            self.process.expect(CONTROL_READY_PATTERN, timeout)
+        except pexpect.ExceptionPexpect:
+            self.close()
+            raise
+        # set by the process of the entity if the run ended cleanly and the
+        # application can run the next Test Case
+        self.released = multiprocessing.Value('b', 0, lock=False)
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def run(self, parameters):
+        """ Runs the application with 'parameters'. Returns a WorkerChild. """
+        self.released.value = 0
+        return WorkerChild(self, parameters)
+
+    def isalive(self):
+        return self.process.isalive()
+
+    def close(self):
+        if self.process.isalive():
+            try:
+                self.process.sendline('exit')
+                self.process.expect(pexpect.EOF, timeout=5)
+            except pexpect.ExceptionPexpect:
+                pass
+        if self.process.isalive():
+            self.process.terminate(force=True)
+        self.process.close()
+
+class WorkerPool:
+    """
+    Idle Workers of every executable. The processes of the entities must be
+    forked (multiprocessing start method 'fork') to inherit them.
+    """
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.idle = {}
+
+    @staticmethod
+    def supported(executable):
+        """ Whether 'executable' lists the option --control in its help. """
+        return CONTROL_OPTION in application_help(executable)
+
+    def acquire(self, executable):
+        """
+        Returns an idle Worker of 'executable' (a new one if there is none),
+        or None if 'executable' does not support the control mode or the
+        Worker cannot be created.
+        """
+        if not self.supported(executable):
+            return None
+        idle = self.idle.setdefault(executable, [])
+        while idle:
+            worker = idle.pop()
+            if worker.isalive():
+                return worker
+            worker.close()
+        try:
+            return Worker(executable, self.timeout)
+        except pexpect.ExceptionPexpect:
+            return None
+
+    def release(self, worker):
+        """
+        Returns 'worker' to the pool if its run ended cleanly, otherwise it
+        is closed.
+        """
+        if worker.released.value and worker.isalive():
+            self.idle.setdefault(worker.executable, []).append(worker)
+        else:
+            worker.close()
+
+    def close(self):
+        for workers in self.idle.values():
+            for worker in workers:
+                worker.close()
+        self.idle = {}
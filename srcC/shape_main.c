@@ -13,6 +13,7 @@
 #include <signal.h>
 #include <math.h>
 #include <inttypes.h>
+#include <stdatomic.h>
 
 const size_t default_buffer_size = 256;
 #define MAX_SAMPLES 500
@@ -44,6 +45,142 @@ install_sig_handlers()
     return 0;
 }
 
+/*************************************************************/
+unsigned long long
+monotonic_ns()
+{
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return (unsigned long long) now.tv_sec * 1000000000ULL + now.tv_nsec;
+}
+
+/*************************************************************/
+/* Monotonic time of the last on_data_available() (or on_data_on_readers())
+ * notification since the samples were last taken, 0 if none. The samples
+ * taken were received at the latest at that time.
+ */
+atomic_ullong data_available_ns = 0;
+
+/* Time the samples just taken were received: the last data available
+ * notification, or 'read_ns' (the time they were taken) if there was no
+ * notification. Resets the notification time.
+ */
+unsigned long long
+received_ns(unsigned long long read_ns)
+{
+    unsigned long long notified_ns = atomic_exchange(&data_available_ns, 0);
+    return notified_ns != 0 ? notified_ns : read_ns;
+}
+
+/*************************************************************/
+/* Records printed with --output-format jsonl, one JSON object per line and
+ * without spaces:
+ *   {"event":"sample","ns":<monotonic time>,"seq":<record number>,
+ *       "topic":<topic name>,"instance":<color>,"x":<x>,"y":<y>,
+ *       "size":<shapesize>[,"payload":<last byte of additional payload>]
+ *       [,"source_ns":<source timestamp>]}
+ *   {"event":"instance_state","ns":<monotonic time>,"seq":<record number>,
+ *       "topic":<topic name>,"instance":<color>,"state":<instance state>}
+ * The rest of the output is the same as with --output-format text.
+ *
+ * With --timestamps, the text sample lines end with " ns=<monotonic time>"
+ * and, the samples read, " source_ns=<source timestamp>" (the records get
+ * "source_ns"). The monotonic time is taken before writing the sample or
+ * when it is received (the last data available notification before taking
+ * it, see received_ns()), so it does not include the read period nor the
+ * time to print it. The source timestamp (dds_sample_info_t) uses the clock
+ * of the DataWriter (not monotonic).
+ */
+unsigned long long output_record_seq = 0;
+
+void
+print_json_string(const char *value)
+{
+    if (value == NULL) {
+        printf("null");
+        return;
+    }
+    putchar('"');
+    for (const char *c = value; *c != '\0'; ++c) {
+        if (*c == '"' || *c == '\\') {
+            printf("\\%c", *c);
+        } else if ((unsigned char) *c < 0x20) {
+            printf("\\u%04x", (unsigned char) *c);
+        } else {
+            putchar(*c);
+        }
+    }
+    putchar('"');
+}
+
+void
+print_record_header(const char *event, unsigned long long ns,
+        const char *topic_name, const char *color)
+{
+    printf("{\"event\":\"%s\",\"ns\":%llu,\"seq\":%llu,\"topic\":",
+            event, ns, ++output_record_seq);
+    print_json_string(topic_name);
+    printf(",\"instance\":");
+    print_json_string(color);
+}
+
+/*************************************************************/
+/* Time stamps of a sample: 'ns' is the monotonic time it was written or
+ * received, 'source_ns' the source timestamp of a sample read (-1 for the
+ * samples written). They are only printed if 'enabled' (--timestamps).
+ */
+typedef struct SampleStamps {
+    bool enabled;
+    unsigned long long ns;
+    long long source_ns;
+} SampleStamps_t;
+
+/*************************************************************/
+void
+print_sample(bool jsonl, const char *topic_name, const char *color,
+        int x, int y, int shapesize, bool has_payload, unsigned int payload,
+        const SampleStamps_t *stamps)
+{
+    if (jsonl) {
+        print_record_header("sample",
+                stamps->enabled ? stamps->ns : monotonic_ns(),
+                topic_name, color);
+        printf(",\"x\":%d,\"y\":%d,\"size\":%d", x, y, shapesize);
+        if (has_payload) {
+            printf(",\"payload\":%u", payload);
+        }
+        if (stamps->enabled && stamps->source_ns >= 0) {
+            printf(",\"source_ns\":%lld", stamps->source_ns);
+        }
+        printf("}\n");
+    } else {
+        printf("%-10s %-10s %03d %03d [%d]", topic_name, color, x, y, shapesize);
+        if (has_payload) {
+            printf(" {%u}", payload);
+        }
+        if (stamps->enabled) {
+            printf(" ns=%llu", stamps->ns);
+            if (stamps->source_ns >= 0) {
+                printf(" source_ns=%lld", stamps->source_ns);
+            }
+        }
+        printf("\n");
+    }
+}
+
+/*************************************************************/
+void
+print_instance_state(bool jsonl, const char *topic_name, const char *color,
+        const char *state)
+{
+    if (jsonl) {
+        print_record_header("instance_state", monotonic_ns(), topic_name, color);
+        printf(",\"state\":\"%s\"}\n", state);
+    } else {
+        printf("%-10s %-10s %s\n", topic_name, color, state);
+    }
+}
+
 typedef enum {
     ERROR = 1,
     DEBUG = 2,
@@ -216,6 +353,9 @@ typedef struct ShapeOptions {
     unsigned int        datafrag_size;
     char*               cft_expression;
     int                 size_modulo;
+
+    bool                output_jsonl;
+    bool                print_timestamps;
 } ShapeOptions_t;
 
 
@@ -277,6 +417,10 @@ void shape_options_init(ShapeOptions_t* shape_options)
 
     shape_options->size_modulo = 0; // 0 means disabled
 
+    shape_options->output_jsonl = false;
+
+    shape_options->print_timestamps = false;
+
     return;
 }
 
@@ -359,6 +503,12 @@ void print_usage( const char *prog )
     printf("                         shapesize. This will make that shapesize is in the\n");
     printf("                         range [1,N]. This only applies if shapesize is\n");
     printf("                         increased (-z 0)\n");
+    printf("   --output-format [text|jsonl] : format of the samples printed. jsonl\n");
+    printf("                         prints one JSON record per sample and instance\n");
+    printf("                         state change. Default: text\n");
+    printf("   --timestamps : print the monotonic time (ns) the samples are\n");
+    printf("                  written or received and the source timestamp of\n");
+    printf("                  the samples read\n");
 }
 
 bool validate(Logger* logger, ShapeOptions_t* shape_options) {
@@ -445,6 +595,8 @@ bool parse(int argc, char *argv[], Logger* logger, ShapeOptions_t* shape_options
         {"datafrag-size", required_argument, NULL, 'Z'},
         {"cft", required_argument, NULL, 'F'},
         {"size-modulo", required_argument, NULL, 'Q'},
+        {"output-format", required_argument, NULL, 'j'},
+        {"timestamps", no_argument, NULL, 'Y'},
         {NULL, 0, NULL, 0 }
     };
 
@@ -794,6 +946,19 @@ bool parse(int argc, char *argv[], Logger* logger, ShapeOptions_t* shape_options
             }
             break;
         }
+        case 'j':
+            if (strcmp(optarg, "text") == 0) {
+                shape_options->output_jsonl = false;
+            } else if (strcmp(optarg, "jsonl") == 0) {
+                shape_options->output_jsonl = true;
+            } else {
+                log_message(logger, ERROR, "unrecognized value for output-format %s", optarg);
+                parse_ok = false;
+            }
+            break;
+        case 'Y':
+            shape_options->print_timestamps = true;
+            break;
         case '?':
             parse_ok = false;
             break;
@@ -838,6 +1003,8 @@ bool parse(int argc, char *argv[], Logger* logger, ShapeOptions_t* shape_options
                      (shape_options->unregister ? "Unregister" : (shape_options->dispose ? "Dispose" : "not specified")));
         printf("    Periodic Announcement Period = %" PRId64 " ms\n", shape_options->periodic_announcement_period_us / INT64_C(1000));
         printf("    Data Fragmentation Size = %u bytes\n", shape_options->datafrag_size);
+        printf("    Output format = %s\n", shape_options->output_jsonl ? "jsonl" : "text");
+        printf("    Timestamps = %s\n", shape_options->print_timestamps ? "true" : "false");
         if (shape_options->topic_name != NULL){
             printf("    Topic = %s\n", shape_options->topic_name);
         }
@@ -1095,9 +1262,14 @@ void on_liveliness_changed (dds_entity_t reader, const dds_liveliness_changed_st
 }
 
 void on_sample_rejected (dds_entity_t e, const dds_sample_rejected_status_t status, void* data) {}
-void on_data_available (dds_entity_t e, void* data) {}
+void on_data_available (dds_entity_t e, void* data) {
+    atomic_store(&data_available_ns, monotonic_ns());
+}
 void on_sample_lost (dds_entity_t e, const dds_sample_lost_status_t status, void* data) {}
-void on_data_on_readers (dds_entity_t e, void* data) {}
+void on_data_on_readers (dds_entity_t e, void* data) {
+    /* takes precedence over on_data_available() */
+    atomic_store(&data_available_ns, monotonic_ns());
+}
 
 void set_reliability(dds_qos_t* qos, dds_reliability_kind_t reliability_kind, Logger* logger) {
     dds_time_t duration;
@@ -1572,6 +1744,7 @@ bool run_subscriber(ShapeApp_t app, ShapeOptions_t opts) {
                 
                 if (retval > DDS_RETCODE_OK) {
                     log_message(app.logger, DEBUG, "Read %d sample(s), printing them...",retval);
+                    SampleStamps_t stamps = { opts.print_timestamps, received_ns(monotonic_ns()), -1 };
                     
                     for (size_t n_sample = 0; n_sample < retval; n_sample++) {
                         log_message(app.logger, DEBUG, "Processing sample %lu",n_sample);
@@ -1585,12 +1758,16 @@ bool run_subscriber(ShapeApp_t app, ShapeOptions_t opts) {
                             dds_entity_t topic = dds_get_topic(app.readers[i]);
                             dds_get_name(topic, name, default_buffer_size);
                             
-                            printf("%-10s %-10s %03d %03d [%d]",name,sample->color,sample->x,sample->y,sample->shapesize);
-                            if(sample->additional_payload_size._length > 0){
+                            bool has_payload = sample->additional_payload_size._length > 0;
+                            unsigned int payload = 0;
+                            if (has_payload) {
                                 int additional_payload_index = sample->additional_payload_size._length - 1;
-                                printf(" {%u}", sample->additional_payload_size._buffer[additional_payload_index]);
+                                payload = sample->additional_payload_size._buffer[additional_payload_index];
                             }
-                            printf("\n");
+                            stamps.source_ns = sample_info->source_timestamp;
+                            print_sample(opts.output_jsonl, name, sample->color,
+                                    sample->x, sample->y, sample->shapesize,
+                                    has_payload, payload, &stamps);
                         }
                         if (sample_info->instance_state != DDS_IST_ALIVE) {
                             ShapeType shape_key = *sample;
@@ -1601,7 +1778,8 @@ bool run_subscriber(ShapeApp_t app, ShapeOptions_t opts) {
                                 dds_return_t name_len = dds_get_name(reader_topic, &temp, 1);
                                 char* name = calloc(name_len + 1, sizeof(char));
                                 dds_get_name(reader_topic, name, name_len + 1);
-                                printf("%-10s %-10s NOT_ALIVE_NO_WRITERS_INSTANCE_STATE\n", name, shape_key.color);
+                                print_instance_state(opts.output_jsonl, name, shape_key.color,
+                                        "NOT_ALIVE_NO_WRITERS_INSTANCE_STATE");
                                 free(name);
                             } else if (sample_info->instance_state == DDS_IST_NOT_ALIVE_DISPOSED) {
                                 dds_entity_t reader_topic = dds_get_topic(app.readers[i]);
@@ -1609,7 +1787,8 @@ bool run_subscriber(ShapeApp_t app, ShapeOptions_t opts) {
                                 dds_return_t name_len = dds_get_name(reader_topic, &temp, 1);
                                 char* name = calloc(name_len + 1, sizeof(char));
                                 dds_get_name(reader_topic, name, name_len + 1);
-                                printf("%-10s %-10s NOT_ALIVE_DISPOSED_INSTANCE_STATE\n", name, shape_key.color);
+                                print_instance_state(opts.output_jsonl, name, shape_key.color,
+                                        "NOT_ALIVE_DISPOSED_INSTANCE_STATE");
                                 free(name);
                             }
                         }
@@ -1724,6 +1903,7 @@ bool run_publisher(ShapeApp_t app, ShapeOptions_t opts) {
                         sprintf(shape.color, "%s", opts.color);
                     }
                 }
+                SampleStamps_t stamps = { opts.print_timestamps, monotonic_ns(), -1 };
                 dds_return_t rc = dds_write(app.writers[i], &shape);
                 if (opts.print_writer_samples) {
                     dds_entity_t writer_topic = dds_get_topic(app.writers[i]);
@@ -1731,16 +1911,19 @@ bool run_publisher(ShapeApp_t app, ShapeOptions_t opts) {
                     dds_return_t name_len = dds_get_name(writer_topic, &temp, 1);
                     char* name = calloc(name_len + 1, sizeof(char));
                     dds_get_name(writer_topic, name, name_len + 1);
-                    printf("%-10s %-10s %03d %03d [%d]", name,
-                        shape.color,
-                        shape.x,
-                        shape.y,
-                        shape.shapesize);
+                    unsigned int payload = 0;
                     if (opts.additional_payload_size > 0) {
                         int additional_payload_index = opts.additional_payload_size - 1;
-                        printf(" {%u}", shape.additional_payload_size._buffer[additional_payload_index]);
+                        payload = shape.additional_payload_size._buffer[additional_payload_index];
                     }
-                    printf("\n");
+                    print_sample(opts.output_jsonl, name,
+                        shape.color,
+                        shape.x,
+                        shape.y,
+                        shape.shapesize,
+                        opts.additional_payload_size > 0,
+                        payload,
+                        &stamps);
                     free(name);
                 }
             }
@@ -17,9 +17,15 @@
 #include <stdarg.h>
 #include <iostream>
 #include <getopt.h>
+#include <errno.h>
+#include <poll.h>
 #include <sys/types.h>
 
+#include <string>
 #include <vector>
+#include <map>
+#include <utility>
+#include <atomic>
 
 #if defined(RTI_CONNEXT_DDS)
 #include "shape_configurator_rti_connext_dds.h"
@@ -102,6 +108,289 @@ install_sig_handlers()
     return 0;
 }
 
+/*************************************************************/
+unsigned long long
+monotonic_ns()
+{
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return (unsigned long long) now.tv_sec * 1000000000ULL + now.tv_nsec;
+}
+
+/*************************************************************/
+/* Monotonic time of a time of CLOCK_REALTIME (ns), such as the reception
+ * timestamp of a SampleInfo.
+ */
+unsigned long long
+realtime_to_monotonic_ns(long long realtime_ns)
+{
+    struct timespec now;
+    clock_gettime(CLOCK_REALTIME, &now);
+    long long realtime_now = (long long) now.tv_sec * 1000000000LL + now.tv_nsec;
+    return monotonic_ns() - (realtime_now - realtime_ns);
+}
+
+/*************************************************************/
+/* Monotonic time of the last on_data_available() (or on_data_on_readers())
+ * notification since the samples were last taken, 0 if none. The samples
+ * taken were received at the latest at that time.
+ */
+std::atomic<unsigned long long> data_available_ns(0);
+
+/* Time the samples just taken were received: the last data available
+ * notification, or 'read_ns' (the time they were taken) if the middleware
+ * did not notify. Resets the notification time.
+ */
+unsigned long long
+received_ns(unsigned long long read_ns)
+{
+    unsigned long long notified_ns = data_available_ns.exchange(0);
+    return notified_ns != 0 ? notified_ns : read_ns;
+}
+
+/*************************************************************/
+/* Records printed with --output-format jsonl, one JSON object per line and
+ * without spaces:
+ *   {"event":"sample","ns":<monotonic time>,"seq":<record number>,
+ *       "topic":<topic name>,"instance":<color>,"x":<x>,"y":<y>,
+ *       "size":<shapesize>[,"payload":<last byte of additional payload>]
+ *       [,"source_ns":<source timestamp>]}
+ *   {"event":"instance_state","ns":<monotonic time>,"seq":<record number>,
+ *       "topic":<topic name>,"instance":<color>,"state":<instance state>}
+ * The rest of the output is the same as with --output-format text.
+ *
+ * With --timestamps, the text sample lines end with " ns=<monotonic time>"
+ * and, the samples read, " source_ns=<source timestamp>" (the records get
+ * "source_ns"). The monotonic time is taken before writing the sample or
+ * when it is received: the reception timestamp of the SampleInfo if the
+ * middleware provides it, otherwise the time of the last data available
+ * notification before taking it (see received_ns()). It does not include
+ * the read period nor the time to print it. The source timestamp
+ * (SampleInfo) uses the clock of the DataWriter (not monotonic).
+ */
+unsigned long long output_record_seq = 0;
+
+void
+print_json_string(const char *value)
+{
+    if (value == NULL) {
+        printf("null");
+        return;
+    }
+    putchar('"');
+    for (const char *c = value; *c != '\0'; ++c) {
+        if (*c == '"' || *c == '\\') {
+            printf("\\%c", *c);
+        } else if ((unsigned char) *c < 0x20) {
+            printf("\\u%04x", (unsigned char) *c);
+        } else {
+            putchar(*c);
+        }
+    }
+    putchar('"');
+}
+
+void
+print_record_header(const char *event, unsigned long long ns,
+        const char *topic_name, const char *color)
+{
+    printf("{\"event\":\"%s\",\"ns\":%llu,\"seq\":%llu,\"topic\":",
+            event, ns, ++output_record_seq);
+    print_json_string(topic_name);
+    printf(",\"instance\":");
+    print_json_string(color);
+}
+
+/*************************************************************/
+/* Time stamps of a sample: 'ns' is the monotonic time it was written or
+ * received, 'source_ns' the source timestamp of a sample read (-1 for the
+ * samples written). They are only printed if 'enabled' (--timestamps).
+ */
+struct SampleStamps {
+    bool enabled;
+    unsigned long long ns;
+    long long source_ns;
+};
+
+/*************************************************************/
+void
+print_sample(bool jsonl, const char *topic_name, const char *color,
+        int x, int y, int shapesize, bool has_payload, unsigned int payload,
+        const SampleStamps &stamps)
+{
+    if (jsonl) {
+        print_record_header("sample",
+                stamps.enabled ? stamps.ns : monotonic_ns(),
+                topic_name, color);
+        printf(",\"x\":%d,\"y\":%d,\"size\":%d", x, y, shapesize);
+        if (has_payload) {
+            printf(",\"payload\":%u", payload);
+        }
+        if (stamps.enabled && stamps.source_ns >= 0) {
+            printf(",\"source_ns\":%lld", stamps.source_ns);
+        }
+        printf("}\n");
+    } else {
+        printf("%-10s %-10s %03d %03d [%d]", topic_name, color, x, y, shapesize);
+        if (has_payload) {
+            printf(" {%u}", payload);
+        }
+        if (stamps.enabled) {
+            printf(" ns=%llu", stamps.ns);
+            if (stamps.source_ns >= 0) {
+                printf(" source_ns=%lld", stamps.source_ns);
+            }
+        }
+        printf("\n");
+    }
+}
+
+/*************************************************************/
+void
+print_instance_state(bool jsonl, const char *topic_name, const char *color,
+        const char *state)
+{
+    if (jsonl) {
+        print_record_header("instance_state", monotonic_ns(), topic_name, color);
+        printf(",\"state\":\"%s\"}\n", state);
+    } else {
+        printf("%-10s %-10s %s\n", topic_name, color, state);
+    }
+}
+
+/*************************************************************/
+/* Statistics printed with --stats-interval instead of the samples read.
+ * Every interval, one line (or record) per instance received, in order of
+ * topic name and color:
+ *   stats: topic=<topic name> instance=<color> interval_ns=<ns>
+ *       samples=<n> bytes=<n> samples_per_s=<n> bytes_per_s=<n>
+ *       gaps=<n> duplicates=<n>[ min_seq=<n> max_seq=<n>]
+ *   {"event":"stats","ns":<monotonic time>,"seq":<record number>,
+ *       "topic":<topic name>,"instance":<color>,"interval_ns":<ns>,
+ *       "samples":<n>,"bytes":<n>,"samples_per_s":<n>,"bytes_per_s":<n>,
+ *       "gaps":<n>,"duplicates":<n>[,"min_seq":<n>,"max_seq":<n>]}
+ * The sequence number of a sample is its shapesize (publishers run with
+ * -z 0). 'gaps' counts the samples whose sequence number is greater than
+ * the next one expected and 'duplicates' the samples whose sequence number
+ * is not greater than the highest one received (duplicated or out of
+ * order), both since the instance was first received. The rest is for the
+ * interval (min_seq and max_seq only if samples were received). 'bytes' is
+ * the size of the fields of the samples (color, x, y, shapesize and
+ * additional payload), not their serialized size.
+ */
+struct InstanceStatistics {
+    std::string topic_name;
+    std::string color;
+    unsigned long long samples;
+    unsigned long long bytes;
+    int min_seq;
+    int max_seq;
+    int highest_seq;
+    unsigned long long gaps;
+    unsigned long long duplicates;
+};
+
+class SampleStatistics {
+    /* Indexed by (topic name, color), so that every sample is counted with
+     * one lookup and the instances are printed in order. */
+    std::map<std::pair<std::string, std::string>, InstanceStatistics>
+            instances;
+    unsigned long long interval_start_ns;
+
+public:
+    SampleStatistics()
+    {
+        interval_start_ns = monotonic_ns();
+    }
+
+    //-------------------------------------------------------------
+    unsigned long long interval_start() const
+    {
+        return interval_start_ns;
+    }
+
+    //-------------------------------------------------------------
+    void add_sample(const char *topic_name, const char *color, int seq,
+            unsigned long long bytes)
+    {
+        if (color == NULL) {
+            color = "";
+        }
+        std::pair<std::string, std::string> key(topic_name, color);
+        auto found = instances.find(key);
+        if (found == instances.end()) {
+            InstanceStatistics new_instance = {
+                    topic_name, color, 0, 0, 0, 0, seq - 1, 0, 0 };
+            found = instances.emplace(key, new_instance).first;
+        }
+        InstanceStatistics *instance = &found->second;
+
+        if (seq <= instance->highest_seq) {
+            instance->duplicates++;
+        } else {
+            if (seq > instance->highest_seq + 1) {
+                instance->gaps++;
+            }
+            instance->highest_seq = seq;
+        }
+        if (instance->samples == 0 || seq < instance->min_seq) {
+            instance->min_seq = seq;
+        }
+        if (instance->samples == 0 || seq > instance->max_seq) {
+            instance->max_seq = seq;
+        }
+        instance->samples++;
+        instance->bytes += bytes;
+    }
+
+    //-------------------------------------------------------------
+    /* Prints the statistics of the interval that finishes now and starts
+     * the next one.
+     */
+    void print(bool jsonl)
+    {
+        unsigned long long now = monotonic_ns();
+        unsigned long long interval_ns = now - interval_start_ns;
+        double seconds = interval_ns > 0 ? interval_ns / 1e9 : 1;
+        for (auto &element : instances) {
+            InstanceStatistics &instance = element.second;
+            double samples_per_s = instance.samples / seconds;
+            double bytes_per_s = instance.bytes / seconds;
+            if (jsonl) {
+                print_record_header("stats", now,
+                        instance.topic_name.c_str(), instance.color.c_str());
+                printf(",\"interval_ns\":%llu,\"samples\":%llu,\"bytes\":%llu"
+                        ",\"samples_per_s\":%.1f,\"bytes_per_s\":%.1f"
+                        ",\"gaps\":%llu,\"duplicates\":%llu",
+                        interval_ns, instance.samples, instance.bytes,
+                        samples_per_s, bytes_per_s,
+                        instance.gaps, instance.duplicates);
+                if (instance.samples > 0) {
+                    printf(",\"min_seq\":%d,\"max_seq\":%d",
+                            instance.min_seq, instance.max_seq);
+                }
+                printf("}\n");
+            } else {
+                printf("stats: topic=%s instance=%s interval_ns=%llu samples=%llu"
+                        " bytes=%llu samples_per_s=%.1f bytes_per_s=%.1f"
+                        " gaps=%llu duplicates=%llu",
+                        instance.topic_name.c_str(), instance.color.c_str(),
+                        interval_ns, instance.samples, instance.bytes,
+                        samples_per_s, bytes_per_s,
+                        instance.gaps, instance.duplicates);
+                if (instance.samples > 0) {
+                    printf(" min_seq=%d max_seq=%d",
+                            instance.min_seq, instance.max_seq);
+                }
+                printf("\n");
+            }
+            instance.samples = 0;
+            instance.bytes = 0;
+        }
+        interval_start_ns = now;
+    }
+};
+
 enum Verbosity
 {
     ERROR=1,
@@ -260,6 +549,7 @@ public:
     bool                use_read;
 
     useconds_t          write_period_us;
+    unsigned int        write_burst;
     useconds_t          read_period_us;
     unsigned int        num_iterations;
 
@@ -285,6 +575,12 @@ public:
 
     int                 size_modulo;
 
+    bool                output_jsonl;
+    bool                print_timestamps;
+    useconds_t          stats_interval_us;
+
+    bool                control_stdin;
+
 public:
     //-------------------------------------------------------------
     ShapeOptions()
@@ -319,6 +615,7 @@ public:
         use_read = false;
 
         write_period_us = 33000; /* 33ms */
+        write_burst = 1;
         read_period_us = 100000; /* 100ms */
 
         num_iterations = 0;
@@ -344,6 +641,13 @@ public:
         cft_expression = NULL;
 
         size_modulo = 0; // 0 means disabled
+
+        output_jsonl = false;
+
+        print_timestamps = false;
+        stats_interval_us = 0; /* off */
+
+        control_stdin = false;
     }
 
     //-------------------------------------------------------------
@@ -379,7 +683,11 @@ public:
         printf("   -z <int>        : set shapesize (0: increase the size for every sample)\n");
         printf("   -R              : use 'read()' instead of 'take()'\n");
         printf("   --write-period <ms>: waiting period between 'write()' operations in ms.\n");
-        printf("                        Default: 33ms\n");
+        printf("                        Default: 33ms. 0: write as fast as possible\n");
+        printf("   --write-period-us <us>: waiting period between 'write()' operations in\n");
+        printf("                           microseconds (instead of --write-period)\n");
+        printf("   --burst <int>: number of samples (per instance) written back to back\n");
+        printf("                  before waiting the write period. Default: 1\n");
         printf("   --read-period <ms> : waiting period between 'read()' or 'take()' operations\n");
         printf("                        in ms. Default: 100ms\n");
         printf("   --time-filter <interval> : apply 'time based filter' with interval \n");
@@ -427,10 +735,30 @@ public:
         printf("                         shapesize. This will make that shapesize is in the\n");
         printf("                         range [1,N]. This only applies if shapesize is\n");
         printf("                         increased (-z 0)\n");
+        printf("   --output-format [text|jsonl] : format of the samples printed. jsonl\n");
+        printf("                         prints one JSON record per sample and instance\n");
+        printf("                         state change. Default: text\n");
+        printf("   --timestamps : print the monotonic time (ns) the samples are\n");
+        printf("                  written or received and the source timestamp of\n");
+        printf("                  the samples read\n");
+        printf("   --stats-interval <ms> : instead of the samples read, print every\n");
+        printf("                           interval the samples/s, bytes/s, gaps,\n");
+        printf("                           duplicates and min/max sequence number\n");
+        printf("                           (shapesize) of every instance [0: OFF]\n");
+        printf("   --control stdin : keep running and read the commands from stdin:\n");
+        printf("                       run <options>: run with the options above\n");
+        printf("                       stop: stop the run in progress (or Ctrl-C)\n");
+        printf("                       reset: delete the participant kept from the\n");
+        printf("                              previous run\n");
+        printf("                       exit: exit the application\n");
     }
 
     //-------------------------------------------------------------
     bool validate() {
+        if (control_stdin) {
+            // the options are read with every 'run' command
+            return true;
+        }
         if (topic_name == NULL) {
             logger.log_message("please specify topic name [-t]", Verbosity::ERROR);
             return false;
@@ -456,6 +784,12 @@ public:
         if (publish && take_read_next_instance == false ) {
             logger.log_message("warning: --take-read ignored on publisher applications", Verbosity::ERROR);
         }
+        if (subscribe && write_burst > 1) {
+            logger.log_message("warning: --burst ignored on subscriber applications", Verbosity::ERROR);
+        }
+        if (publish && stats_interval_us > 0) {
+            logger.log_message("warning: --stats-interval ignored on publisher applications", Verbosity::ERROR);
+        }
         if (publish && cft_expression != NULL) {
             logger.log_message("warning: --cft ignored on publisher applications", Verbosity::ERROR);
         }
@@ -517,6 +851,8 @@ public:
         static struct option long_options[] = {
             {"help", no_argument, NULL, 'h'},
             {"write-period", required_argument, NULL, 'W'},
+            {"write-period-us", required_argument, NULL, 'U'},
+            {"burst", required_argument, NULL, 'J'},
             {"read-period", required_argument, NULL, 'A'},
             {"final-instance-state", required_argument, NULL, 'M'},
             {"access-scope", required_argument, NULL, 'C'},
@@ -534,6 +870,10 @@ public:
             {"datafrag-size", required_argument, NULL, 'Z'},
             {"cft", required_argument, NULL, 'F'},
             {"size-modulo", required_argument, NULL, 'Q'},
+            {"output-format", required_argument, NULL, 'j'},
+            {"control", required_argument, NULL, 'X'},
+            {"timestamps", no_argument, NULL, 'Y'},
+            {"stats-interval", required_argument, NULL, 'G'},
             {NULL, 0, NULL, 0 }
         };
 
@@ -736,6 +1076,32 @@ public:
                 write_period_us = (useconds_t) converted_param * 1000;
                 break;
             }
+            case 'U': {
+                int converted_param = 0;
+                if (sscanf(optarg, "%d", &converted_param) == 0) {
+                    logger.log_message("unrecognized value for write-period-us "
+                                + std::string(1, optarg[0]),
+                            Verbosity::ERROR);
+                    parse_ok = false;
+                } else if (converted_param < 0) {
+                    logger.log_message("incorrect value for write-period-us "
+                                + std::to_string(converted_param),
+                            Verbosity::ERROR);
+                    parse_ok = false;
+                }
+                write_period_us = (useconds_t) converted_param;
+                break;
+            }
+            case 'J': {
+                int converted_param = 0;
+                if (sscanf(optarg, "%d", &converted_param) == 0 || converted_param < 1) {
+                    logger.log_message("incorrect value for burst, must be >=1", Verbosity::ERROR);
+                    parse_ok = false;
+                } else {
+                    write_burst = converted_param;
+                }
+                break;
+            }
             case 'A': {
                 int converted_param = 0;
                 if (sscanf(optarg, "%d", &converted_param) == 0) {
@@ -951,6 +1317,47 @@ public:
                 }
                 break;
             }
+            case 'j':
+                if (strcmp(optarg, "text") == 0) {
+                    output_jsonl = false;
+                } else if (strcmp(optarg, "jsonl") == 0) {
+                    output_jsonl = true;
+                } else {
+                    logger.log_message("unrecognized value for output-format "
+                                + std::string(optarg),
+                            Verbosity::ERROR);
+                    parse_ok = false;
+                }
+                break;
+            case 'Y':
+                print_timestamps = true;
+                break;
+            case 'G': {
+                int converted_param = 0;
+                if (sscanf(optarg, "%d", &converted_param) == 0) {
+                    logger.log_message("unrecognized value for stats-interval "
+                                + std::string(1, optarg[0]),
+                            Verbosity::ERROR);
+                    parse_ok = false;
+                } else if (converted_param < 0) {
+                    logger.log_message("incorrect value for stats-interval "
+                                + std::to_string(converted_param),
+                            Verbosity::ERROR);
+                    parse_ok = false;
+                }
+                stats_interval_us = (useconds_t) converted_param * 1000;
+                break;
+            }
+            case 'X':
+                if (strcmp(optarg, "stdin") == 0) {
+                    control_stdin = true;
+                } else {
+                    logger.log_message("unrecognized value for control "
+                                + std::string(optarg),
+                            Verbosity::ERROR);
+                    parse_ok = false;
+                }
+                break;
             case '?':
                 parse_ok = false;
                 break;
@@ -979,7 +1386,8 @@ public:
                     "\n    Reading method = " + (use_read
                             ? (take_read_next_instance ? "read_next_instance" : "read")
                             : (take_read_next_instance ? "take_next_instance" : "take")) +
-                    "\n    Write period = " + std::to_string(write_period_us / 1000) + "ms" +
+                    "\n    Write period = " + std::to_string(write_period_us) + "us" +
+                    "\n    Write burst = " + std::to_string(write_burst) +
                     "\n    Read period = " + std::to_string(read_period_us / 1000) + "ms" +
                     "\n    Lifespan = " + std::to_string(lifespan_us / 1000) + "ms" +
                     "\n    Number of iterations = " + std::to_string(num_iterations) +
@@ -994,7 +1402,10 @@ public:
                             + (unregister ? "Unregister" : (dispose ? "Dispose" : "not specified")) +
                     "\n    Periodic Announcement Period = "
                             + std::to_string(periodic_announcement_period_us / 1000) + "ms" +
-                    "\n    Data Fragmentation Size = " + std::to_string(datafrag_size) + " bytes",
+                    "\n    Data Fragmentation Size = " + std::to_string(datafrag_size) + " bytes" +
+                    "\n    Output format = " + (output_jsonl ? "jsonl" : "text") +
+                    "\n    Timestamps = " + (print_timestamps ? "true" : "false") +
+                    "\n    Stats interval = " + std::to_string(stats_interval_us / 1000) + "ms",
                     Verbosity::DEBUG);
             if (topic_name != NULL){
                 logger.log_message("    Topic = " + std::string(topic_name),
@@ -1094,12 +1505,102 @@ public:
     }
 
   void on_sample_rejected (DataReader *, const SampleRejectedStatus &) {}
-  void on_data_available (DataReader *) {}
+  void on_data_available (DataReader *) {
+      data_available_ns = monotonic_ns();
+  }
   void on_sample_lost (DataReader *, const SampleLostStatus &) {}
-  void on_data_on_readers (Subscriber *) {}
+  void on_data_on_readers (Subscriber *) {
+      // takes precedence over on_data_available()
+      data_available_ns = monotonic_ns();
+  }
 };
 
 
+/*************************************************************/
+/* Participant kept between the runs of the control mode (--control stdin),
+ * so the next run with the same participant options does not create it
+ * again. The key identifies the options the participant was created with.
+ */
+class ParticipantCache {
+public:
+    bool                      enabled;
+
+    ParticipantCache()
+    {
+        enabled = false;
+        dpf = NULL;
+        dp  = NULL;
+    }
+
+    static std::string key(ShapeOptions *options)
+    {
+        return std::to_string(options->domain_id)
+                + " " + std::to_string(options->periodic_announcement_period_us)
+                + " " + std::to_string(options->datafrag_size);
+    }
+
+    // Returns the participant kept if it was created with the same options,
+    // otherwise deletes it and returns NULL.
+    DomainParticipant *take(ShapeOptions *options, DomainParticipantFactory **factory)
+    {
+        DomainParticipant *result = NULL;
+        if (dp != NULL && dp_key == key(options)) {
+            result = dp;
+            *factory = dpf;
+            dp = NULL;
+        }
+        clear();
+        return result;
+    }
+
+    void keep(DomainParticipantFactory *factory, DomainParticipant *participant,
+            const std::string &participant_key)
+    {
+        clear();
+        dpf = factory;
+        dp = participant;
+        dp_key = participant_key;
+    }
+
+    void clear()
+    {
+        if (dp != NULL && dpf != NULL) {
+            dpf->delete_participant(dp);
+        }
+        dp = NULL;
+    }
+
+private:
+    DomainParticipantFactory *dpf;
+    DomainParticipant        *dp;
+    std::string               dp_key;
+};
+
+ParticipantCache participant_cache;
+
+/*************************************************************/
+/* Returns true if the command 'stop' (or the end of stdin) is read while
+ * running in the control mode. */
+bool
+control_stop_requested()
+{
+    if (!participant_cache.enabled) {
+        return false;
+    }
+    struct pollfd stdin_fd;
+    stdin_fd.fd = STDIN_FILENO;
+    stdin_fd.events = POLLIN;
+    stdin_fd.revents = 0;
+    if (poll(&stdin_fd, 1, 0) <= 0) {
+        return false;
+    }
+    char line[256];
+    if (fgets(line, sizeof(line), stdin) == NULL) {
+        return !(ferror(stdin) && errno == EINTR);
+    }
+    return strncmp(line, "stop", 4) == 0;
+}
+
 /*************************************************************/
 class ShapeApplication {
 
@@ -1116,6 +1617,8 @@ private:
 
     char                     *color;
 
+    std::string               participant_key;
+
     int                        xvel;
     int                        yvel;
     int                        da_width;
@@ -1141,7 +1644,12 @@ public:
     ~ShapeApplication()
     {
         if (dp)  dp->delete_contained_entities( );
-        if (dpf) dpf->delete_participant( dp );
+        if (dp && participant_cache.enabled) {
+            dp->set_listener(NULL, LISTENER_STATUS_MASK_NONE);
+            participant_cache.keep(dpf, dp, participant_key);
+        } else if (dpf) {
+            dpf->delete_participant( dp );
+        }
 
         free(topics);
         free(drs);
@@ -1189,7 +1697,52 @@ public:
 #endif
         logger.log_message("Running initialize() function", Verbosity::DEBUG);
 
-        DomainParticipantFactory *dpf = OBTAIN_DOMAIN_PARTICIPANT_FACTORY;
+        participant_key = ParticipantCache::key(options);
+        dp = participant_cache.take(options, &dpf);
+        if (dp != NULL) {
+            dp->set_listener(&dp_listener, LISTENER_STATUS_MASK_ALL);
+            logger.log_message("Participant reused", Verbosity::DEBUG);
+        } else if (!create_participant(options)) {
+            return false;
+        }
+
+#ifndef REGISTER_TYPE
+#define REGISTER_TYPE ShapeTypeTypeSupport::register_type
+#endif
+        REGISTER_TYPE(dp, "ShapeType");
+
+        // Create different topics (depending on the number of entities)
+        // being the first topic name the provide one, and the rest appending
+        // a number after, for example: Square, Square1, Square2...
+        for (unsigned int i = 0; i < options->num_topics; ++i) {
+            std::string topic_name;
+            topic_name = std::string(options->topic_name) + (i > 0 ? std::to_string(i) : "");
+            printf("Create topic: %s\n", topic_name.c_str());
+            topics[i] = dp->create_topic( topic_name.c_str(), "ShapeType", TOPIC_QOS_DEFAULT, NULL, LISTENER_STATUS_MASK_NONE);
+            if (topics[i] == NULL) {
+                logger.log_message("failed to create topic <" + topic_name + ">", Verbosity::ERROR);
+                return false;
+            }
+        }
+        logger.log_message("Topics created:", Verbosity::DEBUG);
+        for (unsigned int i = 0; i < options->num_topics; ++i) {
+            if (logger.verbosity() == Verbosity::DEBUG) {
+                printf("    topic(%d)=%p\n",i,(void*)topics[i]);
+            }
+        }
+
+        if ( options->publish ) {
+            return init_publisher(options);
+        }
+        else {
+            return init_subscriber(options);
+        }
+    }
+
+    //-------------------------------------------------------------
+    bool create_participant(ShapeOptions *options)
+    {
+        dpf = OBTAIN_DOMAIN_PARTICIPANT_FACTORY;
         if (dpf == NULL) {
             logger.log_message("failed to create participant factory (missing license?).", Verbosity::ERROR);
             return false;
@@ -1247,38 +1800,7 @@ public:
             return false;
         }
         logger.log_message("Participant created", Verbosity::DEBUG);
-
-#ifndef REGISTER_TYPE
-#define REGISTER_TYPE ShapeTypeTypeSupport::register_type
-#endif
-        REGISTER_TYPE(dp, "ShapeType");
-
-        // Create different topics (depending on the number of entities)
-        // being the first topic name the provide one, and the rest appending
-        // a number after, for example: Square, Square1, Square2...
-        for (unsigned int i = 0; i < options->num_topics; ++i) {
-            std::string topic_name;
-            topic_name = std::string(options->topic_name) + (i > 0 ? std::to_string(i) : "");
-            printf("Create topic: %s\n", topic_name.c_str());
-            topics[i] = dp->create_topic( topic_name.c_str(), "ShapeType", TOPIC_QOS_DEFAULT, NULL, LISTENER_STATUS_MASK_NONE);
-            if (topics[i] == NULL) {
-                logger.log_message("failed to create topic <" + topic_name + ">", Verbosity::ERROR);
-                return false;
-            }
-        }
-        logger.log_message("Topics created:", Verbosity::DEBUG);
-        for (unsigned int i = 0; i < options->num_topics; ++i) {
-            if (logger.verbosity() == Verbosity::DEBUG) {
-                printf("    topic(%d)=%p\n",i,(void*)topics[i]);
-            }
-        }
-
-        if ( options->publish ) {
-            return init_publisher(options);
-        }
-        else {
-            return init_subscriber(options);
-        }
+        return true;
     }
 
     //-------------------------------------------------------------
@@ -1821,6 +2343,7 @@ public:
         // generated via SPDP lease expiry, so we cache the mapping ourselves.
         std::map<InstanceHandle_t, std::string> instance_handle_color;
 #endif
+        SampleStatistics statistics;
 
         while ( ! all_done ) {
             ReturnCode_t     retval;
@@ -1894,6 +2417,8 @@ public:
                     }
 
                     if (retval == RETCODE_OK) {
+                        SampleStamps stamps = {
+                                options->print_timestamps, received_ns(monotonic_ns()), -1 };
 #if   defined(INTERCOM_DDS)
                         auto n_samples = samples.size();
 #else
@@ -1915,23 +2440,52 @@ public:
                             SampleInfo         *sample_info = &sample_infos[n_sample];
 #endif
                             if (sample_info->valid_data)  {
-                                printf("%-10s %-10s %03d %03d [%d]", drs[i]->get_topicdescription()->get_name() NAME_ACCESSOR,
-                                        sample->color FIELD_ACCESSOR STRING_IN,
-                                        sample->x FIELD_ACCESSOR,
-                                        sample->y FIELD_ACCESSOR,
-                                        sample->shapesize FIELD_ACCESSOR );
+                                bool has_payload = false;
+                                unsigned int payload = 0;
+                                unsigned int payload_size = 0;
 #if   defined(OPENDDS)
                                 if (sample->additional_payload_size.length() > 0) {
                                     int additional_payload_index = sample->additional_payload_size.length() - 1;
-                                    printf(" {%u}", sample->additional_payload_size[additional_payload_index] FIELD_ACCESSOR);
+                                    has_payload = true;
+                                    payload_size = sample->additional_payload_size.length();
+                                    payload = sample->additional_payload_size[additional_payload_index] FIELD_ACCESSOR;
                                 }
 #else
                                 if (DDS_UInt8Seq_get_length(&sample->additional_payload_size FIELD_ACCESSOR) > 0) {
                                     int additional_payload_index = DDS_UInt8Seq_get_length(&sample->additional_payload_size FIELD_ACCESSOR) - 1;
-                                    printf(" {%u}", sample->additional_payload_size FIELD_ACCESSOR [additional_payload_index]);
+                                    has_payload = true;
+                                    payload_size = DDS_UInt8Seq_get_length(&sample->additional_payload_size FIELD_ACCESSOR);
+                                    payload = sample->additional_payload_size FIELD_ACCESSOR [additional_payload_index];
                                 }
 #endif
-                                printf("\n");
+                                if (options->stats_interval_us > 0) {
+                                    const char *color = sample->color FIELD_ACCESSOR STRING_IN;
+                                    // color (with the terminating NUL), x, y and shapesize
+                                    unsigned long long bytes = (color != NULL ? strlen(color) : 0) + 1
+                                            + 3 * sizeof(int) + payload_size;
+                                    statistics.add_sample(
+                                            drs[i]->get_topicdescription()->get_name() NAME_ACCESSOR,
+                                            color,
+                                            sample->shapesize FIELD_ACCESSOR,
+                                            bytes);
+                                } else {
+                                    stamps.source_ns = (long long) sample_info->source_timestamp.SECONDS_FIELD_NAME * 1000000000LL
+                                            + sample_info->source_timestamp.nanosec;
+#if   defined(RTI_CONNEXT_DDS) || defined(EPROSIMA_FAST_DDS)
+                                    stamps.ns = realtime_to_monotonic_ns(
+                                            (long long) sample_info->reception_timestamp.SECONDS_FIELD_NAME * 1000000000LL
+                                            + sample_info->reception_timestamp.nanosec);
+#endif
+                                    print_sample(options->output_jsonl,
+                                            drs[i]->get_topicdescription()->get_name() NAME_ACCESSOR,
+                                            sample->color FIELD_ACCESSOR STRING_IN,
+                                            sample->x FIELD_ACCESSOR,
+                                            sample->y FIELD_ACCESSOR,
+                                            sample->shapesize FIELD_ACCESSOR,
+                                            has_payload,
+                                            payload,
+                                            stamps);
+                                }
 #if defined(EPROSIMA_FAST_DDS)
                                 instance_handle_color[sample_info->instance_handle] = sample->color FIELD_ACCESSOR STRING_IN;
 #elif defined(RTI_CONNEXT_MICRO)
@@ -1962,13 +2516,15 @@ public:
                                 drs[i]->get_key_value(shape_key, sample_info->instance_handle);
 #endif
                                 if (sample_info->instance_state == NOT_ALIVE_NO_WRITERS_INSTANCE_STATE) {
-                                    printf("%-10s %-10s NOT_ALIVE_NO_WRITERS_INSTANCE_STATE\n",
+                                    print_instance_state(options->output_jsonl,
                                             drs[i]->get_topicdescription()->get_name() NAME_ACCESSOR,
-                                            shape_key.color FIELD_ACCESSOR STRING_IN);
+                                            shape_key.color FIELD_ACCESSOR STRING_IN,
+                                            "NOT_ALIVE_NO_WRITERS_INSTANCE_STATE");
                                 } else if (sample_info->instance_state == NOT_ALIVE_DISPOSED_INSTANCE_STATE) {
-                                    printf("%-10s %-10s NOT_ALIVE_DISPOSED_INSTANCE_STATE\n",
+                                    print_instance_state(options->output_jsonl,
                                             drs[i]->get_topicdescription()->get_name() NAME_ACCESSOR,
-                                            shape_key.color FIELD_ACCESSOR STRING_IN);
+                                            shape_key.color FIELD_ACCESSOR STRING_IN,
+                                            "NOT_ALIVE_DISPOSED_INSTANCE_STATE");
                                 }
                             }
                         }
@@ -1998,10 +2554,24 @@ public:
             if (options->num_iterations != 0 && options->num_iterations <= n) {
                 all_done = 1;
             }
+            if (control_stop_requested()) {
+                all_done = 1;
+            }
+
+            if (options->stats_interval_us > 0
+                    && monotonic_ns() - statistics.interval_start()
+                            >= options->stats_interval_us * 1000ULL) {
+                statistics.print(options->output_jsonl);
+            }
 
             usleep(options->read_period_us);
         }
 
+        // the last (partial) interval
+        if (options->stats_interval_us > 0) {
+            statistics.print(options->output_jsonl);
+        }
+
         free(previous_handles);
 
         return true;
@@ -2090,6 +2660,8 @@ public:
                         shape_set_color(shape, instance_color.c_str());
                     }
 
+                    SampleStamps stamps = {
+                            options->print_timestamps, monotonic_ns(), -1 };
 #if   defined(RTI_CONNEXT_DDS) || defined(RTI_CONNEXT_MICRO) || defined(OPENDDS) || defined(INTERCOM_DDS) || defined(TWINOAKS_COREDX)
                     dws[i]->write( shape, HANDLE_NIL );
 #elif defined(EPROSIMA_FAST_DDS)
@@ -2097,16 +2669,20 @@ public:
 #endif
 
                     if (options->print_writer_samples) {
-                        printf("%-10s %-10s %03d %03d [%d]", dws[i]->get_topic()->get_name() NAME_ACCESSOR,
-                                                shape.color FIELD_ACCESSOR STRING_IN,
-                                                shape.x FIELD_ACCESSOR,
-                                                shape.y FIELD_ACCESSOR,
-                                                shape.shapesize FIELD_ACCESSOR);
+                        unsigned int payload = 0;
                         if (options->additional_payload_size > 0) {
                             int additional_payload_index = options->additional_payload_size - 1;
-                            printf(" {%u}", shape.additional_payload_size FIELD_ACCESSOR [additional_payload_index]);
+                            payload = shape.additional_payload_size FIELD_ACCESSOR [additional_payload_index];
                         }
-                        printf("\n");
+                        print_sample(options->output_jsonl,
+                                dws[i]->get_topic()->get_name() NAME_ACCESSOR,
+                                shape.color FIELD_ACCESSOR STRING_IN,
+                                shape.x FIELD_ACCESSOR,
+                                shape.y FIELD_ACCESSOR,
+                                shape.shapesize FIELD_ACCESSOR,
+                                options->additional_payload_size > 0,
+                                payload,
+                                stamps);
                     }
                 }
             }
@@ -2121,7 +2697,12 @@ public:
                 }
             }
 #endif
-            usleep(options->write_period_us);
+            // write_burst samples (per instance) every write period, and
+            // no waiting at all with a write period of 0 (maximum rate)
+            if (options->write_period_us > 0
+                    && (n + 1) % options->write_burst == 0) {
+                usleep(options->write_period_us);
+            }
 
             // increase number of iterations
             n++;
@@ -2133,6 +2714,9 @@ public:
             if (options->num_iterations != 0 && options->num_iterations <= n) {
                 all_done = 1;
             }
+            if (control_stop_requested()) {
+                all_done = 1;
+            }
         }
 
         // Unregister or dispose instances of all DataWriters
@@ -2180,23 +2764,55 @@ public:
 };
 
 /*************************************************************/
-int main( int argc, char * argv[] )
+/* Splits a command line in arguments: separated by spaces, and quoted with
+ * single or double quotes. */
+std::vector<std::string>
+split_command_line(const char *line)
 {
-    install_sig_handlers();
-
-    ShapeOptions options;
-    logger.log_message("Parsing command line parameters...", Verbosity::DEBUG);
-    bool parseResult = options.parse(argc, argv);
-    if ( !parseResult ) {
-        return ERROR_PARSING_ARGUMENTS;
+    std::vector<std::string> args;
+    std::string arg;
+    bool in_arg = false;
+    char quote = '\0';
+    for (const char *c = line; *c != '\0'; ++c) {
+        if (quote != '\0') {
+            if (*c == quote) {
+                quote = '\0';
+            } else {
+                arg += *c;
+            }
+        } else if (*c == '"' || *c == '\'') {
+            quote = *c;
+            in_arg = true;
+        } else if (isspace((unsigned char) *c)) {
+            if (in_arg) {
+                args.push_back(arg);
+                arg.clear();
+                in_arg = false;
+            }
+        } else {
+            arg += *c;
+            in_arg = true;
+        }
+    }
+    if (in_arg) {
+        args.push_back(arg);
     }
+    return args;
+}
+
+/*************************************************************/
+/* Runs the application once with the options parsed. Returns the exit
+ * code. */
+int
+run_shape_application(ShapeOptions *options)
+{
     logger.log_message("Initializing ShapeApp...", Verbosity::DEBUG);
     ShapeApplication shapeApp;
-    if ( !shapeApp.initialize(&options) ) {
+    if ( !shapeApp.initialize(options) ) {
         return ERROR_INITIALIZING;
     }
     logger.log_message("Running ShapeApp...", Verbosity::DEBUG);
-    if ( !shapeApp.run(&options) ) {
+    if ( !shapeApp.run(options) ) {
         return ERROR_RUNNING;
     }
 
@@ -2204,3 +2820,97 @@ int main( int argc, char * argv[] )
 
     return 0;
 }
+
+/*************************************************************/
+/* Control mode (--control stdin): the application runs the commands read
+ * from stdin, one per line, instead of exiting after one run:
+ *   run <options>: runs with <options> (the command line options of a normal
+ *                  run) until it finishes or it is stopped with the command
+ *                  'stop' or Ctrl-C.
+ *   reset: deletes the participant kept from the previous run.
+ *   exit: exits (also at the end of stdin).
+ * "control: ready" is printed when a command can be read, and
+ * "control: exit <code>" when a run finishes, <code> being the exit code of
+ * the application without the control mode. The library is loaded and
+ * initialized once, and the participant of a run is reused by the next one
+ * if it has the same domain id, periodic announcement period and data
+ * fragment size. */
+int
+run_control(const char *program)
+{
+    participant_cache.enabled = true;
+    char line[4096];
+    printf("control: ready\n");
+    fflush(stdout);
+    while (true) {
+        if (fgets(line, sizeof(line), stdin) == NULL) {
+            if (ferror(stdin) && errno == EINTR) {
+                // Ctrl-C without a run in progress
+                clearerr(stdin);
+                continue;
+            }
+            break;
+        }
+        std::vector<std::string> args = split_command_line(line);
+        if (args.empty() || args[0] == "stop") {
+            continue;
+        }
+        if (args[0] == "exit") {
+            break;
+        }
+        if (args[0] == "reset") {
+            participant_cache.clear();
+            printf("control: ready\n");
+        } else if (args[0] == "run") {
+            std::vector<char *> run_argv;
+            run_argv.push_back((char *) program);
+            for (size_t i = 1; i < args.size(); ++i) {
+                run_argv.push_back((char *) args[i].c_str());
+            }
+            run_argv.push_back(NULL);
+            // every run starts from the initial state of the application
+#if defined(__APPLE__) || defined(__FreeBSD__)
+            optreset = 1;
+            optind = 1;
+#else
+            optind = 0;
+#endif
+            logger.verbosity(ERROR);
+            all_done = 0;
+            output_record_seq = 0;
+            int exit_code = ERROR_PARSING_ARGUMENTS;
+            ShapeOptions options;
+            if (options.parse((int) run_argv.size() - 1, run_argv.data())) {
+                if (options.control_stdin) {
+                    logger.log_message("--control cannot be used in a run command",
+                            Verbosity::ERROR);
+                } else {
+                    exit_code = run_shape_application(&options);
+                }
+            }
+            printf("control: exit %d\n", exit_code);
+        } else {
+            printf("control: unknown command %s\n", args[0].c_str());
+        }
+        fflush(stdout);
+    }
+    participant_cache.clear();
+    return 0;
+}
+
+/*************************************************************/
+int main( int argc, char * argv[] )
+{
+    install_sig_handlers();
+
+    ShapeOptions options;
+    logger.log_message("Parsing command line parameters...", Verbosity::DEBUG);
+    bool parseResult = options.parse(argc, argv);
+    if ( !parseResult ) {
+        return ERROR_PARSING_ARGUMENTS;
+    }
+    if (options.control_stdin) {
+        return run_control(argv[0]);
+    }
+    return run_shape_application(&options);
+}
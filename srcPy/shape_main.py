@@ -0,0 +1,1794 @@
+#!/usr/bin/env python3
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+# Pure-Python simulator of the shape_main application.
+#
+# It accepts the same command line options as srcCxx/shape_main.cxx and
+# prints the same output (topic/reader/writer creation, listener callbacks,
+# samples, instance states and the coherent/ordered access markers), so the
+# interoperability_report can run Test Cases without any DDS
+# implementation installed:
+#     python3 interoperability_report.py -P srcPy/shape_main.py \
+#         -S srcPy/shape_main.py
+#
+# Discovery and data exchange use Unix datagram sockets: every application
+# binds a socket in the rendezvous directory of its domain
+# (SHAPE_MAIN_SIM_DIR/domain_<id>, by default in the temporary directory)
+# and every ANNOUNCE_PERIOD (or --periodic-announcement) announces its
+# DataWriters and DataReaders to the other sockets of the directory. The
+# endpoints match following the DDS rules for topic, partition (with
+# wildcards), reliability, durability, deadline, ownership, data
+# representation and presentation; incompatible endpoints trigger the
+# incompatible QoS callbacks. The DataReaders model the history (KEEP_LAST
+# / KEEP_ALL), content filters (-c and --cft), time based filter,
+# lifespan, deadline, exclusive ownership, instance states, coherent sets
+# and ordered access. TRANSIENT and PERSISTENT durability behave as
+# TRANSIENT_LOCAL: the DataWriter keeps the history for the late joiners.
+#
+# The initial position and velocity of the shapes come from a random
+# generator seeded with SHAPE_MAIN_SIM_SEED (default 0) instead of the
+# time, so the runs are deterministic. The simulator can also inject
+# faults (see FAULTS_VARIABLE) to check how the interoperability_report
+# behaves with misbehaving applications.
+#
+# With --control stdin the simulator runs the commands read from stdin, as
+# shape_main.cxx does (see run_control()). The participant is not kept
+# between runs: creating it only takes a socket and a thread.
+
+import collections
+import fnmatch
+import getopt
+import itertools
+import json
+import os
+import queue
+import random
+import re
+import shlex
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+SIM_DIR = os.environ.get('SHAPE_MAIN_SIM_DIR',
+        os.path.join(tempfile.gettempdir(), 'shape_main_sim'))
+SIM_SEED = int(os.environ.get('SHAPE_MAIN_SIM_SEED', 0))
+
+# Fault injection: comma-separated <fault>=<value> in FAULTS_VARIABLE (all
+# the applications), PUB_FAULTS_VARIABLE (Publishers) and
+# SUB_FAULTS_VARIABLE (Subscribers); the latter override the former.
+#   * seed=<int>: seed of the random decisions (default SHAPE_MAIN_SIM_SEED).
+#         The samples sent to every application are decided by a generator
+#         seeded with the seed and the address of the application.
+#   * discovery_delay=<s>: the application ignores discovery for s seconds.
+#   * loss=<p>: probability that a sample is not sent to a DataReader.
+#   * reorder=<p>: probability that a sample is sent after the next one.
+#   * duplicate=<p>: probability that a sample is sent twice.
+#   * stall=<p>:<s>: probability that an iteration of the main loop (write
+#     or read) stalls for s seconds.
+#   * shutdown_delay=<s>: the application keeps running for s seconds after
+#     receiving SIGINT and ignores the next ones.
+FAULTS_VARIABLE = 'SHAPE_MAIN_SIM_FAULTS'
+PUB_FAULTS_VARIABLE = 'SHAPE_MAIN_SIM_PUB_FAULTS'
+SUB_FAULTS_VARIABLE = 'SHAPE_MAIN_SIM_SUB_FAULTS'
+
+ANNOUNCE_PERIOD = 0.2 # seconds
+TICK = 0.01 # seconds between deadline checks
+SEND_TIMEOUT = 0.1 # seconds between retries of a RELIABLE write
+# seconds a RELIABLE write retries on a reader that does not read before
+# the reader is lost
+LOST_PEER_TIMEOUT = 10
+
+TYPE_NAME = 'ShapeType'
+
+ERROR_PARSING_ARGUMENTS = 1
+ERROR_INITIALIZING = 2
+ERROR_RUNNING = 3
+
+# Verbosity
+ERROR = 1
+DEBUG = 2
+
+# QoS kinds, ordered so that offered >= requested is compatible
+BEST_EFFORT, RELIABLE = 0, 1
+VOLATILE, TRANSIENT_LOCAL, TRANSIENT, PERSISTENT = 0, 1, 2, 3
+INSTANCE_PRESENTATION, TOPIC_PRESENTATION, GROUP_PRESENTATION = 0, 1, 2
+XCDR, XCDR2 = 0, 2
+
+DURABILITY_NAMES = ['VOLATILE', 'TRANSIENT_LOCAL', 'TRANSIENT', 'PERSISTENT']
+ACCESS_SCOPE_NAMES = ['INSTANCE', 'TOPIC', 'GROUP']
+
+# QosPolicyId_t of the policies checked when matching
+DURABILITY_QOS_POLICY_ID = 2
+PRESENTATION_QOS_POLICY_ID = 3
+DEADLINE_QOS_POLICY_ID = 4
+OWNERSHIP_QOS_POLICY_ID = 6
+RELIABILITY_QOS_POLICY_ID = 11
+DATA_REPRESENTATION_QOS_POLICY_ID = 23
+
+QOS_POLICY_NAMES = {
+    DURABILITY_QOS_POLICY_ID: 'DURABILITY',
+    PRESENTATION_QOS_POLICY_ID: 'PRESENTATION',
+    DEADLINE_QOS_POLICY_ID: 'DEADLINE',
+    OWNERSHIP_QOS_POLICY_ID: 'OWNERSHIP',
+    RELIABILITY_QOS_POLICY_ID: 'RELIABILITY',
+    DATA_REPRESENTATION_QOS_POLICY_ID: 'DATAREPRESENTATION'}
+
+# Instance states
+ALIVE = 'ALIVE_INSTANCE_STATE'
+NOT_ALIVE_NO_WRITERS = 'NOT_ALIVE_NO_WRITERS_INSTANCE_STATE'
+NOT_ALIVE_DISPOSED = 'NOT_ALIVE_DISPOSED_INSTANCE_STATE'
+
+all_done = threading.Event()
+output_lock = threading.Lock()
+
+def emit(lines):
+    """ Prints 'lines' (a string or a list of strings) and flushes stdout. """
+    if isinstance(lines, str):
+        lines = [lines]
+    if not lines:
+        return
+    with output_lock:
+        sys.stdout.write('\n'.join(lines) + '\n')
+        sys.stdout.flush()
+
+class Logger:
+    def __init__(self, verbosity):
+        self.verbosity = verbosity
+
+    def log_message(self, message, level_verbosity):
+        if level_verbosity <= self.verbosity:
+            emit(message)
+
+logger = Logger(ERROR)
+
+def scan_int(text):
+    """ Integer at the beginning of 'text' (like sscanf %d), or None. """
+    match = re.match(r'\s*([+-]?[0-9]+)', text)
+    return int(match.group(1)) if match else None
+
+class ShapeOptions:
+    """ Command line options, see ShapeOptions in srcCxx/shape_main.cxx. """
+    SHORT_OPTIONS = 'hPSbrRwc:d:D:f:k:p:s:x:t:v:z:'
+    LONG_OPTIONS = {
+        'help': 'h',
+        'write-period=': 'W',
+        'write-period-us=': 'U',
+        'burst=': 'J',
+        'read-period=': 'A',
+        'final-instance-state=': 'M',
+        'access-scope=': 'C',
+        'coherent': 'T',
+        'ordered': 'O',
+        'coherent-sample-count=': 'H',
+        'additional-payload-size=': 'B',
+        'num-topics=': 'E',
+        'lifespan=': 'l',
+        'num-instances=': 'I',
+        'num-iterations=': 'n',
+        'take-read': 'K',
+        'time-filter=': 'i',
+        'periodic-announcement=': 'N',
+        'datafrag-size=': 'Z',
+        'cft=': 'F',
+        'size-modulo=': 'Q',
+        'output-format=': 'j',
+        'control=': 'X',
+        'timestamps': 'Y',
+        'stats-interval=': 'G'}
+
+    def __init__(self):
+        self.domain_id = 0
+        self.reliability_kind = RELIABLE
+        self.durability_kind = VOLATILE
+        self.data_representation = XCDR
+        self.history_depth = -1 # means default
+        self.ownership_strength = -1 # means shared
+        self.coherent_set_access_scope = INSTANCE_PRESENTATION
+
+        self.topic_name = None
+        self.color = None
+        self.partition = None
+
+        self.publish = False
+        self.subscribe = False
+
+        self.timebasedfilter_interval_us = 0 # off
+        self.deadline_interval_us = 0 # off
+        self.lifespan_us = 0 # off
+
+        self.da_width = 240
+        self.da_height = 270
+
+        self.xvel = 3
+        self.yvel = 3
+        self.shapesize = 20
+
+        self.print_writer_samples = False
+        self.use_read = False
+
+        self.write_period_us = 33000 # 33ms
+        self.write_burst = 1
+        self.read_period_us = 100000 # 100ms
+
+        self.num_iterations = 0
+        self.num_instances = 1
+        self.num_topics = 1
+
+        self.unregister = False
+        self.dispose = False
+
+        self.coherent_set_enabled = False
+        self.ordered_access_enabled = False
+        self.coherent_set_access_scope_set = False
+        self.coherent_set_sample_count = 0
+
+        self.additional_payload_size = 0
+        self.take_read_next_instance = True
+        self.periodic_announcement_period_us = 0
+        self.datafrag_size = 0 # means not set
+        self.cft_expression = None
+        self.size_modulo = 0 # 0 means disabled
+        self.output_jsonl = False
+        self.print_timestamps = False
+        self.stats_interval_us = 0 # off
+        self.control_stdin = False
+
+    @staticmethod
+    def print_usage(prog):
+        emit([
+            f'{prog}: ',
+            '   --help, -h      : print this menu',
+            '   -v [e|d]        : set log message verbosity [e: ERROR, d: DEBUG]',
+            '   -P              : publish samples',
+            '   -S              : subscribe samples',
+            '   -d <int>        : domain id (default: 0)',
+            '   -b              : BEST_EFFORT reliability',
+            '   -r              : RELIABLE reliability',
+            '   -k <depth>      : keep history depth [0: KEEP_ALL]',
+            "   -f <interval>   : set a 'deadline' with interval (ms) [0: OFF]",
+            '   -s <strength>   : set ownership strength [-1: SHARED]',
+            '   -t <topic_name> : set the topic name',
+            '   -c <color>      : set color to publish (filter if subscriber)',
+            "   -p <partition>  : set a 'partition' string",
+            '   -D [v|l|t|p]    : set durability [v: VOLATILE,  l: TRANSIENT_LOCAL]',
+            '                                     t: TRANSIENT, p: PERSISTENT]',
+            '   -x [1|2]        : set data representation [1: XCDR, 2: XCDR2]',
+            "   -w              : print Publisher's samples",
+            '   -z <int>        : set shapesize (0: increase the size for every sample)',
+            "   -R              : use 'read()' instead of 'take()'",
+            "   --write-period <ms>: waiting period between 'write()' operations in ms.",
+            '                        Default: 33ms. 0: write as fast as possible',
+            "   --write-period-us <us>: waiting period between 'write()' operations in",
+            '                           microseconds (instead of --write-period)',
+            '   --burst <int>: number of samples (per instance) written back to back',
+            '                  before waiting the write period. Default: 1',
+            "   --read-period <ms> : waiting period between 'read()' or 'take()' operations",
+            '                        in ms. Default: 100ms',
+            "   --time-filter <interval> : apply 'time based filter' with interval ",
+            '                              in ms [0: OFF]',
+            '   --lifespan <int>      : indicates the lifespan of a sample in ms',
+            '   --num-iterations <int>: indicates the number of iterations of the main loop',
+            '                           After that, the application will exit.',
+            '                           Default: infinite',
+            '   --num-instances <int>: indicates the number of instances a DataWriter writes',
+            '                          If the value is > 1, the additional instances are',
+            '                          created by appending a number. For example, if the',
+            '                          original color is "BLUE" the instances used are',
+            '                          "BLUE", "BLUE1", "BLUE2"...',
+            '   --num-topics <int>: indicates the number of topics created (using the same',
+            '                       type). This also creates a DataReader or DataWriter per',
+            '                       topic. If the value is > 1, the additional topic names',
+            '                       are created by appending a number: For example, if the',
+            '                       original topic name is "Square", the topics created are',
+            '                       "Square", "Square1", "Square2"...',
+            '   --final-instance-state [u|d]: indicates the action performed after the',
+            '                                 DataWriter finishes its execution (before',
+            '                                 deleting it):',
+            '                                   - u: unregister',
+            '                                   - d: dispose',
+            '   --access-scope [i|t|g]: sets Presentation.access_scope to INSTANCE, TOPIC',
+            '                           or GROUP',
+            '   --coherent            : sets Presentation.coherent_access = true',
+            '   --ordered             : sets Presentation.ordered_access = true',
+            '   --coherent-sample-count <int>: amount of samples sent for each DataWriter',
+            '                                  and instance that are grouped in a coherent',
+            '                                  set',
+            '   --additional-payload-size <bytes>: indicates the amount of bytes added to',
+            '                                      the samples written (for example to use',
+            '                                      large data)',
+            '   --take-read           : uses take()/read() instead of take_next_instance()',
+            '                           read_next_instance()',
+            '   --periodic-announcement <ms> : indicates the periodic participant',
+            '                                  announcement period in ms. Default 0 (off)',
+            '   --datafrag-size <bytes> : set the data fragment size (default: 0, means',
+            '                           not set)',
+            '   --cft <expression> : ContentFilteredTopic filter expression (quotes',
+            '                       required around the expression). Cannot be used with',
+            '                        -c on subscriber applications',
+            '   --size-modulo <int> : If set, the modulo operation is applied to the',
+            '                         shapesize. This will make that shapesize is in the',
+            '                         range [1,N]. This only applies if shapesize is',
+            '                         increased (-z 0)',
+            '   --output-format [text|jsonl] : format of the samples printed. jsonl',
+            '                         prints one JSON record per sample and instance',
+            '                         state change. Default: text',
+            '   --timestamps : print the monotonic time (ns) the samples are',
+            '                  written or received and the source timestamp of',
+            '                  the samples read',
+            '   --stats-interval <ms> : instead of the samples read, print every',
+            '                           interval the samples/s, bytes/s, gaps,',
+            '                           duplicates and min/max sequence number',
+            '                           (shapesize) of every instance [0: OFF]',
+            '   --control stdin : keep running and read the commands from stdin:',
+            '                       run <options>: run with the options above',
+            '                       stop: stop the run in progress (or Ctrl-C)',
+            '                       reset: delete the participant kept from the',
+            '                              previous run',
+            '                       exit: exit the application'])
+
+    def validate(self):
+        if self.control_stdin:
+            # the options are read with every 'run' command
+            return True
+        if self.topic_name is None:
+            logger.log_message('please specify topic name [-t]', ERROR)
+            return False
+        if not self.publish and not self.subscribe:
+            logger.log_message('please specify publish [-P] or subscribe [-S]',
+                    ERROR)
+            return False
+        if self.publish and self.subscribe:
+            logger.log_message('please specify only one of: publish [-P] or '
+                    'subscribe [-S]', ERROR)
+            return False
+        if self.publish and self.color is None:
+            self.color = 'BLUE'
+            logger.log_message('warning: color was not specified, defaulting '
+                    'to "BLUE"', ERROR)
+        warnings = [
+            (self.publish and self.timebasedfilter_interval_us > 0,
+                'time base filter [--time-filter] ignored on publisher '
+                'applications'),
+            (self.publish and self.use_read,
+                'use read [-R] ignored on publisher applications'),
+            (self.publish and not self.take_read_next_instance,
+                '--take-read ignored on publisher applications'),
+            (self.subscribe and self.write_burst > 1,
+                '--burst ignored on subscriber applications'),
+            (self.publish and self.stats_interval_us > 0,
+                '--stats-interval ignored on publisher applications'),
+            (self.publish and self.cft_expression is not None,
+                '--cft ignored on publisher applications'),
+            (self.subscribe and self.shapesize != 20,
+                'shapesize [-z] ignored on subscriber applications'),
+            (self.subscribe and self.lifespan_us > 0,
+                '--lifespan ignored on subscriber applications'),
+            (self.subscribe and self.num_instances > 1,
+                '--num-instances ignored on subscriber applications'),
+            (self.subscribe and (self.unregister or self.dispose),
+                '--final-instance-state ignored on subscriber applications'),
+            (self.subscribe and self.coherent_set_sample_count > 0,
+                '--coherent-sample-count ignored on subscriber applications'),
+            (not self.coherent_set_enabled and not self.ordered_access_enabled
+                    and self.coherent_set_sample_count,
+                '--coherent-sample-count ignored because not coherent, or '
+                'ordered access enabled'),
+            (self.subscribe and self.additional_payload_size > 0,
+                '--additional-payload-size ignored on subscriber applications'),
+            (not self.coherent_set_enabled and not self.ordered_access_enabled
+                    and self.coherent_set_access_scope_set,
+                '--access-scope set but not coherent, or ordered access '
+                'enabled'),
+            (self.size_modulo > 0 and self.shapesize != 0,
+                '--size-modulo has no effect unless shapesize (-z) is set to 0')]
+        for condition, message in warnings:
+            if condition:
+                logger.log_message(f'warning: {message}', ERROR)
+        if (self.subscribe and self.color is not None
+                and self.cft_expression is not None):
+            logger.log_message('error: cannot specify both --cft and -c for '
+                    'subscriber applications', ERROR)
+            return False
+        return True
+
+    def parse_int(self, name, value, minimum, message_minimum=None):
+        """
+        Parses the integer 'value' of the option 'name'. Returns None (and
+        logs the error) if it is not a number or it is lower than 'minimum'.
+        """
+        converted = scan_int(value)
+        if converted is None:
+            logger.log_message(f'unrecognized value for {name} {value[:1]}',
+                    ERROR)
+            return None
+        if converted < minimum:
+            logger.log_message(f'incorrect value for {name}'
+                    f'{message_minimum or " "}{converted}', ERROR)
+            return None
+        return converted
+
+    def parse(self, argv):
+        logger.log_message('Running parse() function', DEBUG)
+        parse_ok = True
+        try:
+            opts, _ = getopt.gnu_getopt(argv[1:], self.SHORT_OPTIONS,
+                    list(self.LONG_OPTIONS))
+        except getopt.GetoptError as error:
+            print(f'{argv[0]}: {error}', file=sys.stderr)
+            opts = []
+            parse_ok = False
+
+        long_options = {f'--{name.rstrip("=")}': opt
+                for name, opt in self.LONG_OPTIONS.items()}
+        for name, value in opts:
+            opt = long_options.get(name, name[1:])
+            if opt == 'v':
+                if value[:1] == 'd':
+                    logger.verbosity = DEBUG
+                elif value[:1] == 'e':
+                    logger.verbosity = ERROR
+                elif value:
+                    logger.log_message('unrecognized value for verbosity '
+                            f'{value[:1]}', ERROR)
+                    parse_ok = False
+            elif opt == 'w':
+                self.print_writer_samples = True
+            elif opt == 'b':
+                self.reliability_kind = BEST_EFFORT
+            elif opt == 'r':
+                self.reliability_kind = RELIABLE
+            elif opt == 'R':
+                self.use_read = True
+            elif opt == 'c':
+                self.color = value
+            elif opt == 'd':
+                converted = self.parse_int('domain_id', value, 0)
+                parse_ok = parse_ok and converted is not None
+                self.domain_id = converted or 0
+            elif opt == 'D':
+                if value[:1] in 'vltp' and value:
+                    self.durability_kind = 'vltp'.index(value[0])
+                elif value:
+                    logger.log_message('unrecognized value for durability '
+                            f'{value[:1]}', ERROR)
+                    parse_ok = False
+            elif opt in ('i', 'f', 'W', 'A', 'l', 'N', 'G'):
+                name = {
+                    'i': 'timebasedfilter_interval',
+                    'f': 'deadline_interval',
+                    'W': 'write-period',
+                    'A': 'read-period',
+                    'l': 'lifespan',
+                    'N': 'periodic-announcement',
+                    'G': 'stats-interval'}[opt]
+                converted = self.parse_int(name, value, 0,
+                        ', it must be >=0 ' if opt == 'N' else None)
+                parse_ok = parse_ok and converted is not None
+                interval_us = (converted or 0) * 1000
+                if opt == 'i':
+                    self.timebasedfilter_interval_us = interval_us
+                elif opt == 'f':
+                    self.deadline_interval_us = interval_us
+                elif opt == 'W':
+                    self.write_period_us = interval_us
+                elif opt == 'A':
+                    self.read_period_us = interval_us
+                elif opt == 'l':
+                    self.lifespan_us = interval_us
+                elif opt == 'G':
+                    self.stats_interval_us = interval_us
+                else:
+                    self.periodic_announcement_period_us = interval_us
+            elif opt == 'k':
+                converted = self.parse_int('history_depth', value, 0)
+                parse_ok = parse_ok and converted is not None
+                if converted is not None:
+                    self.history_depth = converted
+            elif opt == 'p':
+                self.partition = value
+            elif opt == 's':
+                converted = self.parse_int('ownership_strength', value, -1)
+                parse_ok = parse_ok and converted is not None
+                if converted is not None:
+                    self.ownership_strength = converted
+            elif opt == 't':
+                self.topic_name = value
+            elif opt == 'P':
+                self.publish = True
+            elif opt == 'S':
+                self.subscribe = True
+            elif opt == 'h':
+                self.print_usage(argv[0])
+                sys.exit(0)
+            elif opt == 'x':
+                if value[:1] == '1':
+                    self.data_representation = XCDR
+                elif value[:1] == '2':
+                    self.data_representation = XCDR2
+                elif value:
+                    logger.log_message('unrecognized value for data '
+                            f'representation {value[:1]}', ERROR)
+                    parse_ok = False
+            elif opt == 'z':
+                converted = self.parse_int('shapesize', value, 0)
+                parse_ok = parse_ok and converted is not None
+                if converted is not None:
+                    self.shapesize = converted
+            elif opt in ('n', 'I', 'E', 'B', 'H'):
+                name, minimum = {
+                    'n': ('num-iterations', 1),
+                    'I': ('num-instances', 1),
+                    'E': ('num-topics', 1),
+                    'B': ('additional-payload-size', 1),
+                    'H': ('coherent-sample-count', 2)}[opt]
+                converted = self.parse_int(name, value, minimum,
+                        f', it must be >={minimum} ')
+                if converted is None:
+                    parse_ok = False
+                elif opt == 'n':
+                    self.num_iterations = converted
+                elif opt == 'I':
+                    self.num_instances = converted
+                elif opt == 'E':
+                    self.num_topics = converted
+                elif opt == 'B':
+                    self.additional_payload_size = converted
+                else:
+                    self.coherent_set_sample_count = converted
+            elif opt == 'M':
+                if value[:1] == 'u':
+                    self.unregister = True
+                elif value[:1] == 'd':
+                    self.dispose = True
+                elif value:
+                    logger.log_message('unrecognized value for '
+                            f'final-instance-state {value[:1]}', ERROR)
+                    parse_ok = False
+                if self.unregister and self.dispose:
+                    logger.log_message('error, cannot configure unregister '
+                            'and dispose at the same time', ERROR)
+                    parse_ok = False
+            elif opt == 'C':
+                self.coherent_set_access_scope_set = True
+                if value[:1] and value[:1] in 'itg':
+                    self.coherent_set_access_scope = 'itg'.index(value[0])
+                elif value:
+                    logger.log_message('unrecognized value for coherent-sets '
+                            f'{value[:1]}', ERROR)
+                    parse_ok = False
+                    self.coherent_set_access_scope_set = False
+            elif opt == 'T':
+                self.coherent_set_enabled = True
+            elif opt == 'O':
+                self.ordered_access_enabled = True
+            elif opt == 'K':
+                self.take_read_next_instance = False
+            elif opt == 'Z':
+                converted = scan_int(value)
+                if converted is None:
+                    logger.log_message('unrecognized value for datafrag-size '
+                            f'{value[:1]}', ERROR)
+                    parse_ok = False
+                elif converted > 65535:
+                    logger.log_message('incorrect value for datafrag-size, '
+                            f'it must be <= 65535 bytes{converted}', ERROR)
+                    parse_ok = False
+                self.datafrag_size = converted or 0
+            elif opt == 'F':
+                self.cft_expression = value
+            elif opt == 'U':
+                converted = self.parse_int('write-period-us', value, 0)
+                parse_ok = parse_ok and converted is not None
+                self.write_period_us = converted or 0
+            elif opt == 'J':
+                converted = scan_int(value)
+                if converted is None or converted < 1:
+                    logger.log_message('incorrect value for burst, must be >=1',
+                            ERROR)
+                    parse_ok = False
+                else:
+                    self.write_burst = converted
+            elif opt == 'Q':
+                converted = scan_int(value)
+                if converted is None or converted < 1:
+                    logger.log_message('incorrect value for size-modulo, must '
+                            'be >=1', ERROR)
+                    parse_ok = False
+                else:
+                    self.size_modulo = converted
+            elif opt == 'j':
+                if value in ('text', 'jsonl'):
+                    self.output_jsonl = value == 'jsonl'
+                else:
+                    logger.log_message('unrecognized value for output-format '
+                            f'{value}', ERROR)
+                    parse_ok = False
+            elif opt == 'Y':
+                self.print_timestamps = True
+            elif opt == 'X':
+                if value == 'stdin':
+                    self.control_stdin = True
+                else:
+                    logger.log_message(f'unrecognized value for control {value}',
+                            ERROR)
+                    parse_ok = False
+
+        if parse_ok:
+            parse_ok = self.validate()
+        if not parse_ok:
+            self.print_usage(argv[0])
+        else:
+            self.log_options()
+        return parse_ok
+
+    def log_options(self):
+        reading_method = ('read' if self.use_read else 'take') + (
+                '_next_instance' if self.take_read_next_instance else '')
+        final_state = ('Unregister' if self.unregister
+                else 'Dispose' if self.dispose else 'not specified')
+        logger.log_message('Shape Options: '
+            f'\n    Verbosity = {"DEBUG" if logger.verbosity == DEBUG else "ERROR"}'
+            '\n    This application is a '
+                f'{"publisher" if self.publish else "subscriber"}'
+            f'\n    DomainId = {self.domain_id}'
+            '\n    ReliabilityKind = '
+                f'{"RELIABLE" if self.reliability_kind else "BEST_EFFORT"}'
+            f'\n    DurabilityKind = {DURABILITY_NAMES[self.durability_kind]}'
+            '\n    DataRepresentation = '
+                f'{"XCDR2" if self.data_representation == XCDR2 else "XCDR"}'
+            f'\n    HistoryDepth = {self.history_depth}'
+            f'\n    OwnershipStrength = {self.ownership_strength}'
+            '\n    TimeBasedFilterInterval = '
+                f'{self.timebasedfilter_interval_us // 1000}ms'
+            f'\n    DeadlineInterval = {self.deadline_interval_us // 1000}ms'
+            f'\n    Shapesize = {self.shapesize}'
+            f'\n    Reading method = {reading_method}'
+            f'\n    Write period = {self.write_period_us}us'
+            f'\n    Write burst = {self.write_burst}'
+            f'\n    Read period = {self.read_period_us // 1000}ms'
+            f'\n    Lifespan = {self.lifespan_us // 1000}ms'
+            f'\n    Number of iterations = {self.num_iterations}'
+            f'\n    Number of instances = {self.num_instances}'
+            f'\n    Number of entities = {self.num_topics}'
+            '\n    Coherent sets = '
+                f'{"true" if self.coherent_set_enabled else "false"}'
+            '\n    Ordered access = '
+                f'{"true" if self.ordered_access_enabled else "false"}'
+            '\n    Access Scope = '
+                f'{ACCESS_SCOPE_NAMES[self.coherent_set_access_scope]}'
+            f'\n    Coherent Sample Count = {self.coherent_set_sample_count}'
+            '\n    Additional Payload Size = '
+                f'{self.additional_payload_size}'
+            f'\n    Final Instance State = {final_state}'
+            '\n    Periodic Announcement Period = '
+                f'{self.periodic_announcement_period_us // 1000}ms'
+            f'\n    Data Fragmentation Size = {self.datafrag_size} bytes'
+            '\n    Output format = '
+                f'{"jsonl" if self.output_jsonl else "text"}'
+            f'\n    Timestamps = {str(self.print_timestamps).lower()}'
+            f'\n    Stats interval = {self.stats_interval_us // 1000}ms',
+            DEBUG)
+        for name, value in (('Topic', self.topic_name), ('Color', self.color),
+                ('Partition', self.partition)):
+            if value is not None:
+                logger.log_message(f'    {name} = {value}', DEBUG)
+
+class ContentFilter:
+    """
+    Filter expression of a ContentFilteredTopic: comparisons (=, <>, !=, <,
+    <=, >, >=, BETWEEN, LIKE, MATCH) of the ShapeType members (color, x, y,
+    shapesize) and constants, combined with AND, OR, NOT and parentheses.
+    Raises ValueError if the expression is not valid.
+    """
+    TOKEN = re.compile(r"\s*(?:([0-9]+(?:\.[0-9]+)?)|'([^']*)'"
+            r"|(<=|>=|<>|!=|=|<|>|\(|\))|([A-Za-z_][A-Za-z_0-9]*))")
+    MEMBERS = {'color': 'c', 'x': 'x', 'y': 'y', 'shapesize': 'z'}
+    COMPARISONS = {
+        '=': lambda a, b: a == b,
+        '<>': lambda a, b: a != b,
+        '!=': lambda a, b: a != b,
+        '<': lambda a, b: a < b,
+        '<=': lambda a, b: a <= b,
+        '>': lambda a, b: a > b,
+        '>=': lambda a, b: a >= b}
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = []
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = self.TOKEN.match(expression, position)
+            if match is None:
+                raise ValueError(f'invalid filter expression: {expression}')
+            number, string, operator, name = match.groups()
+            if number is not None:
+                self.tokens.append(('value', float(number)))
+            elif string is not None:
+                self.tokens.append(('value', string))
+            elif operator is not None:
+                self.tokens.append(('op', operator))
+            else:
+                self.tokens.append(('name', name))
+            position = match.end()
+        self.position = 0
+        self.evaluate = self.parse_or()
+        if self.position != len(self.tokens):
+            raise ValueError(f'invalid filter expression: {expression}')
+
+    def __call__(self, sample):
+        return self.evaluate(sample)
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def next(self):
+        token = self.peek()
+        if token[0] is None:
+            raise ValueError(f'invalid filter expression: {self.expression}')
+        self.position += 1
+        return token
+
+    def keyword(self, word):
+        kind, value = self.peek()
+        if kind == 'name' and value.upper() == word:
+            self.position += 1
+            return True
+        return False
+
+    def parse_or(self):
+        operands = [self.parse_and()]
+        while self.keyword('OR'):
+            operands.append(self.parse_and())
+        if len(operands) == 1:
+            return operands[0]
+        return lambda sample: any(operand(sample) for operand in operands)
+
+    def parse_and(self):
+        operands = [self.parse_not()]
+        while self.keyword('AND'):
+            operands.append(self.parse_not())
+        if len(operands) == 1:
+            return operands[0]
+        return lambda sample: all(operand(sample) for operand in operands)
+
+    def parse_not(self):
+        if self.keyword('NOT'):
+            operand = self.parse_not()
+            return lambda sample: not operand(sample)
+        if self.peek() == ('op', '('):
+            self.next()
+            operand = self.parse_or()
+            if self.next() != ('op', ')'):
+                raise ValueError(
+                        f'invalid filter expression: {self.expression}')
+            return operand
+        return self.parse_predicate()
+
+    def parse_operand(self):
+        kind, value = self.next()
+        if kind == 'value':
+            return lambda sample: value
+        if kind == 'name' and value in self.MEMBERS:
+            member = self.MEMBERS[value]
+            return lambda sample: sample[member]
+        raise ValueError(f'invalid filter expression: {self.expression}')
+
+    def parse_predicate(self):
+        left = self.parse_operand()
+        if self.keyword('BETWEEN'):
+            low = self.parse_operand()
+            if not self.keyword('AND'):
+                raise ValueError(
+                        f'invalid filter expression: {self.expression}')
+            high = self.parse_operand()
+            return lambda sample: low(sample) <= left(sample) <= high(sample)
+        if self.keyword('MATCH') or self.keyword('LIKE'):
+            kind, pattern = self.next()
+            if kind != 'value' or not isinstance(pattern, str):
+                raise ValueError(
+                        f'invalid filter expression: {self.expression}')
+            pattern = re.compile(''.join(
+                    '.*' if char in '%*' else '.' if char in '_?'
+                    else re.escape(char) for char in pattern))
+            return lambda sample: pattern.fullmatch(str(left(sample))) \
+                    is not None
+        kind, operator = self.next()
+        if kind != 'op' or operator not in self.COMPARISONS:
+            raise ValueError(f'invalid filter expression: {self.expression}')
+        right = self.parse_operand()
+        compare = self.COMPARISONS[operator]
+        return lambda sample: compare(left(sample), right(sample))
+
+def partitions_match(a, b):
+    """ Partition names match if they are equal or one matches the other. """
+    return a == b or fnmatch.fnmatchcase(a, b) or fnmatch.fnmatchcase(b, a)
+
+def incompatible_policy(writer, reader):
+    """
+    QosPolicyId_t of the first policy the 'writer' offers that is not
+    compatible with the one the 'reader' requests, or None.
+    """
+    if writer['durability'] < reader['durability']:
+        return DURABILITY_QOS_POLICY_ID
+    if (writer['scope'] < reader['scope']
+            or writer['coherent'] < reader['coherent']
+            or writer['ordered'] < reader['ordered']):
+        return PRESENTATION_QOS_POLICY_ID
+    if reader['deadline'] and (not writer['deadline']
+            or writer['deadline'] > reader['deadline']):
+        return DEADLINE_QOS_POLICY_ID
+    if writer['exclusive'] != reader['exclusive']:
+        return OWNERSHIP_QOS_POLICY_ID
+    if writer['reliability'] < reader['reliability']:
+        return RELIABILITY_QOS_POLICY_ID
+    if writer['representation'] != reader['representation']:
+        return DATA_REPRESENTATION_QOS_POLICY_ID
+    return None
+
+# Record number of the records printed with --output-format jsonl (see
+# print_record_header in srcCxx/shape_main.cxx for their format)
+record_seq = itertools.count(1)
+
+def record_line(event, topic_name, color, ns=None, **fields):
+    record = {'event': event,
+            'ns': time.monotonic_ns() if ns is None else ns,
+            'seq': next(record_seq), 'topic': topic_name, 'instance': color}
+    record.update(fields)
+    return json.dumps(record, separators=(',', ':'))
+
+def sample_line(topic_name, sample, jsonl=False, stamps=None):
+    """
+    Sample as shape_main prints it. 'stamps' is the (monotonic time, source
+    timestamp) printed with --timestamps; the source timestamp is None for
+    the samples written.
+    """
+    ns, source_ns = stamps if stamps is not None else (None, None)
+    if jsonl:
+        fields = {'payload': 255} if sample['p'] > 0 else {}
+        if source_ns is not None:
+            fields['source_ns'] = source_ns
+        return record_line('sample', topic_name, sample['c'], ns=ns,
+                x=sample['x'], y=sample['y'], size=sample['z'], **fields)
+    line = (f'{topic_name:<10s} {sample["c"]:<10s} {sample["x"]:03d} '
+            f'{sample["y"]:03d} [{sample["z"]}]')
+    if sample['p'] > 0:
+        line += ' {255}'
+    if ns is not None:
+        line += f' ns={ns}'
+        if source_ns is not None:
+            line += f' source_ns={source_ns}'
+    return line
+
+def instance_state_line(topic_name, color, state, jsonl=False):
+    """ Instance state change as shape_main prints it. """
+    if jsonl:
+        return record_line('instance_state', topic_name, color, state=state)
+    return f'{topic_name:<10s} {color:<10s} {state}'
+
+class SampleStatistics:
+    """
+    Statistics printed with --stats-interval instead of the samples read,
+    see SampleStatistics in srcCxx/shape_main.cxx.
+    """
+    def __init__(self, jsonl=False):
+        self.jsonl = jsonl
+        # (topic, color) -> dictionary, in the order they are received
+        self.instances = collections.OrderedDict()
+        self.interval_start_ns = time.monotonic_ns()
+
+    def add_sample(self, topic_name, sample):
+        instance = self.instances.get((topic_name, sample['c']))
+        if instance is None:
+            instance = self.instances[(topic_name, sample['c'])] = {
+                'samples': 0, 'bytes': 0, 'min_seq': 0, 'max_seq': 0,
+                'highest_seq': sample['z'] - 1, 'gaps': 0, 'duplicates': 0}
+        seq = sample['z']
+        if seq <= instance['highest_seq']:
+            instance['duplicates'] += 1
+        else:
+            if seq > instance['highest_seq'] + 1:
+                instance['gaps'] += 1
+            instance['highest_seq'] = seq
+        if instance['samples'] == 0:
+            instance['min_seq'] = instance['max_seq'] = seq
+        else:
+            instance['min_seq'] = min(instance['min_seq'], seq)
+            instance['max_seq'] = max(instance['max_seq'], seq)
+        instance['samples'] += 1
+        # color (with the terminating NUL), x, y, shapesize and payload
+        instance['bytes'] += len(sample['c']) + 1 + 3 * 4 + sample['p']
+
+    def interval_elapsed(self, interval_us):
+        return time.monotonic_ns() - self.interval_start_ns >= interval_us * 1000
+
+    def lines(self):
+        """
+        Returns the lines of the interval that finishes now and starts the
+        next one.
+        """
+        now = time.monotonic_ns()
+        interval_ns = now - self.interval_start_ns
+        seconds = interval_ns / 1e9 if interval_ns > 0 else 1
+        lines = []
+        for (topic_name, color), instance in self.instances.items():
+            fields = {
+                'interval_ns': interval_ns,
+                'samples': instance['samples'],
+                'bytes': instance['bytes'],
+                'samples_per_s': round(instance['samples'] / seconds, 1),
+                'bytes_per_s': round(instance['bytes'] / seconds, 1),
+                'gaps': instance['gaps'],
+                'duplicates': instance['duplicates']}
+            if instance['samples'] > 0:
+                fields['min_seq'] = instance['min_seq']
+                fields['max_seq'] = instance['max_seq']
+            if self.jsonl:
+                lines.append(record_line('stats', topic_name, color, ns=now,
+                        **fields))
+            else:
+                lines.append(f'stats: topic={topic_name} instance={color} '
+                        + ' '.join(f'{name}={value:.1f}'
+                                if isinstance(value, float)
+                                else f'{name}={value}'
+                            for name, value in fields.items()))
+            instance['samples'] = instance['bytes'] = 0
+        self.interval_start_ns = now
+        return lines
+
+class Endpoint:
+    """
+    DataWriter or DataReader of a topic. 'qos' is announced to the other
+    applications. 'remotes' contains the remote endpoints already
+    discovered: id -> (address of its application, endpoint if matched).
+    """
+    kind = None
+
+    def __init__(self, participant, index, topic_name, name, options):
+        self.participant = participant
+        self.id = f'{os.getpid()}:{self.kind}{index}'
+        self.topic_name = topic_name
+        self.name = name
+        depth = options.history_depth
+        self.depth = None if depth == 0 else (1 if depth < 0 else depth)
+        self.qos = {
+            'id': self.id,
+            'kind': self.kind,
+            'topic': topic_name,
+            'partition': options.partition or '',
+            'reliability': options.reliability_kind,
+            'durability': options.durability_kind,
+            'deadline': options.deadline_interval_us,
+            'exclusive': options.ownership_strength != -1,
+            'strength': max(options.ownership_strength, 0),
+            'representation': options.data_representation,
+            'scope': (options.coherent_set_access_scope
+                if options.coherent_set_enabled
+                    or options.ordered_access_enabled
+                else INSTANCE_PRESENTATION),
+            'coherent': options.coherent_set_enabled,
+            'ordered': options.ordered_access_enabled}
+        self.remotes = {}
+
+    @property
+    def matched(self):
+        return {id: remote for id, (_, remote) in self.remotes.items()
+                if remote is not None}
+
+    def discover(self, remote, address):
+        if (remote['kind'] == self.kind or remote['topic'] != self.topic_name
+                or remote['id'] in self.remotes):
+            return
+        self.remotes[remote['id']] = (address, None)
+        if not partitions_match(remote['partition'], self.qos['partition']):
+            return
+        if self.kind == 'writer':
+            policy_id = incompatible_policy(self.qos, remote)
+        else:
+            policy_id = incompatible_policy(remote, self.qos)
+        if policy_id is not None:
+            function = ('on_offered_incompatible_qos' if self.kind == 'writer'
+                    else 'on_requested_incompatible_qos')
+            emit(f"{function}() topic: '{self.name}'  type: '{TYPE_NAME}' : "
+                    f'{policy_id} ({QOS_POLICY_NAMES[policy_id]})')
+            return
+        self.remotes[remote['id']] = (address, remote)
+        self.on_matched(remote, address, 1)
+
+    def lose(self, address):
+        """ Removes the remote endpoints of the application 'address'. """
+        for id, (remote_address, remote) in list(self.remotes.items()):
+            if remote_address == address:
+                del self.remotes[id]
+                if remote is not None:
+                    self.on_matched(remote, address, -1)
+
+    def on_matched(self, remote, address, change):
+        raise NotImplementedError
+
+class Writer(Endpoint):
+    kind = 'writer'
+
+    def __init__(self, participant, index, topic_name, options):
+        Endpoint.__init__(self, participant, index, topic_name, topic_name,
+                options)
+        self.lifespan_us = options.lifespan_us
+        # history kept for the late joiners: color -> deque of samples
+        self.history = {} if options.durability_kind >= TRANSIENT_LOCAL \
+                else None
+        self.last_write = {}
+        self.deadline_missed = 0
+
+    def on_matched(self, remote, address, change):
+        emit(f"on_publication_matched() topic: '{self.name}'  type: "
+                f"'{TYPE_NAME}' : matched readers {len(self.matched)} "
+                f'(change = {change})')
+        if (change > 0 and self.history is not None
+                and remote['durability'] >= TRANSIENT_LOCAL):
+            samples = sorted((sample for samples in self.history.values()
+                    for sample in samples), key=lambda sample: sample['seq'])
+            for sample in samples:
+                if not self.expired(sample, time.time()):
+                    self.participant.send_sample(address,
+                            dict(sample, s=None),
+                            self.qos['reliability'] == RELIABLE)
+
+    def expired(self, sample, now):
+        return (self.lifespan_us > 0
+                and now - sample['ts'] > self.lifespan_us / 1e6)
+
+    def addresses(self):
+        return {address for address, remote in self.remotes.values()
+                if remote is not None}
+
+    def write(self, color, x, y, size, payload, coherent_set):
+        sample = {'t': 'data', 'w': self.id, 'c': color, 'x': x, 'y': y,
+                'z': size, 'p': payload, 'ts': time.time(),
+                'l': self.lifespan_us, 's': coherent_set,
+                'seq': self.participant.next_sequence()}
+        self.last_write[color] = time.monotonic()
+        if self.history is not None:
+            self.history.setdefault(color,
+                    collections.deque(maxlen=self.depth)).append(sample)
+        reliable = self.qos['reliability'] == RELIABLE
+        for address in sorted(self.addresses()):
+            self.participant.send_sample(address, sample, reliable)
+
+    def instance_message(self, kind, color):
+        message = {'t': kind, 'w': self.id, 'c': color}
+        if self.history is not None:
+            self.history.pop(color, None)
+        self.last_write.pop(color, None)
+        for address in sorted(self.addresses()):
+            self.participant.flush_samples(address)
+            self.participant.send(address, message, True)
+
+    def check_deadline(self, now):
+        period = self.qos['deadline'] / 1e6
+        for color, last in list(self.last_write.items()):
+            if now - last > period:
+                self.last_write[color] = last + period
+                self.deadline_missed += 1
+                emit(f"on_offered_deadline_missed() topic: '{self.name}'  "
+                        f"type: '{TYPE_NAME}' : (total = "
+                        f'{self.deadline_missed}, change = 1)')
+
+class Instance:
+    def __init__(self, depth):
+        self.samples = collections.deque(maxlen=depth)
+        self.state = ALIVE
+        self.notify = False
+        self.writers = set()
+        self.owner = None
+        self.last_accepted = None
+        self.last_received = None
+
+class Reader(Endpoint):
+    kind = 'reader'
+
+    def __init__(self, participant, index, topic_name, name, content_filter,
+            options):
+        Endpoint.__init__(self, participant, index, topic_name, name, options)
+        self.content_filter = content_filter
+        self.time_filter = options.timebasedfilter_interval_us / 1e6
+        self.take = not options.use_read
+        self.jsonl = options.output_jsonl
+        self.timestamps = options.print_timestamps
+        # SampleStatistics of the application with --stats-interval
+        self.statistics = None
+        # ordered access with TOPIC or GROUP scope presents the samples in
+        # the order they are received, instead of grouped by instance
+        self.ordered = (options.ordered_access_enabled
+                and self.qos['scope'] >= TOPIC_PRESENTATION)
+        self.instances = collections.OrderedDict()
+        self.arrivals = 0
+        self.deadline_missed = 0
+
+    def on_matched(self, remote, address, change):
+        emit(f"on_subscription_matched() topic: '{self.name}'  type: "
+                f"'{TYPE_NAME}' : matched writers {len(self.matched)} "
+                f'(change = {change})')
+        emit(f"on_liveliness_changed() topic: '{self.name}'  type: "
+                f"'{TYPE_NAME}' : (alive = {len(self.matched)}, "
+                'not_alive = 0)')
+        if change < 0:
+            for instance in self.instances.values():
+                self.remove_writer(instance, remote['id'])
+
+    def remove_writer(self, instance, writer_id):
+        instance.writers.discard(writer_id)
+        if instance.owner == writer_id:
+            instance.owner = None
+        if not instance.writers and instance.state == ALIVE:
+            instance.state = NOT_ALIVE_NO_WRITERS
+            instance.notify = True
+
+    def receive(self, sample):
+        """ Adds a sample of a matched DataWriter to the history. """
+        writers = self.matched
+        writer = writers.get(sample['w'])
+        if writer is None:
+            return
+        if self.content_filter is not None and not self.content_filter(sample):
+            return
+        instance = self.instances.get(sample['c'])
+        if instance is None:
+            instance = self.instances[sample['c']] = Instance(self.depth)
+        instance.writers.add(writer['id'])
+        if self.qos['exclusive']:
+            owner = writers.get(instance.owner)
+            if (owner is not None and owner['id'] != writer['id']
+                    and owner['strength'] >= writer['strength']):
+                return
+            instance.owner = writer['id']
+        now = time.monotonic()
+        if (self.time_filter and instance.last_accepted is not None
+                and now - instance.last_accepted < self.time_filter):
+            return
+        instance.last_accepted = now
+        instance.last_received = now
+        instance.state = ALIVE
+        self.arrivals += 1
+        # the time it is received is printed with --timestamps
+        instance.samples.append((self.arrivals, time.monotonic_ns(), sample))
+
+    def change_state(self, message):
+        instance = self.instances.get(message['c'])
+        if instance is None or message['w'] not in self.remotes:
+            return
+        if message['t'] == 'dispose':
+            instance.state = NOT_ALIVE_DISPOSED
+            instance.notify = True
+        else:
+            self.remove_writer(instance, message['w'])
+
+    def read(self):
+        """ Returns the lines printed when reading or taking the samples. """
+        now = time.time()
+        lines = []
+        entries = []
+        for color, instance in self.instances.items():
+            for entry in list(instance.samples):
+                sample = entry[2]
+                if sample['l'] and now - sample['ts'] > sample['l'] / 1e6:
+                    instance.samples.remove(entry)
+            entries.extend((arrival, received_ns, color, instance, sample)
+                    for arrival, received_ns, sample in instance.samples)
+        if self.ordered:
+            entries.sort(key=lambda entry: entry[0])
+        for _, received_ns, color, instance, sample in entries:
+            if self.statistics is not None:
+                self.statistics.add_sample(self.name, sample)
+            else:
+                stamps = (received_ns, int(sample['ts'] * 1e9)) \
+                        if self.timestamps else None
+                lines.append(sample_line(self.name, sample, self.jsonl,
+                        stamps))
+            if instance.state != ALIVE:
+                lines.append(instance_state_line(self.name, color,
+                        instance.state, self.jsonl))
+        for color, instance in self.instances.items():
+            if (instance.notify and not instance.samples
+                    and instance.state != ALIVE):
+                lines.append(instance_state_line(self.name, color,
+                        instance.state, self.jsonl))
+            if self.take:
+                instance.samples.clear()
+                instance.notify = False
+        return lines
+
+    def check_deadline(self, now):
+        period = self.qos['deadline'] / 1e6
+        for instance in self.instances.values():
+            if (instance.state == ALIVE and instance.last_received is not None
+                    and now - instance.last_received > period):
+                instance.last_received += period
+                self.deadline_missed += 1
+                emit(f"on_requested_deadline_missed() topic: '{self.name}'  "
+                        f"type: '{TYPE_NAME}' : (total = "
+                        f'{self.deadline_missed}, change = 1)')
+
+class Faults:
+    """
+    Faults the application injects, described by 'spec': comma-separated
+    <fault>=<value> (see FAULTS_VARIABLE). Raises ValueError if 'spec' is
+    not valid. The random decisions come from generators seeded with
+    'seed', so the same spec reproduces the same faults. The samples sent to
+    every remote application use their own generator, seeded with 'seed' and
+    its address, so the faults one of them sees do not depend on the others.
+    """
+    DEFAULTS = {
+        'seed': SIM_SEED,
+        'discovery_delay': 0.0,
+        'loss': 0.0,
+        'reorder': 0.0,
+        'duplicate': 0.0,
+        'stall': '0:0',
+        'shutdown_delay': 0.0}
+
+    def __init__(self, spec=''):
+        values = dict(self.DEFAULTS)
+        for item in spec.split(','):
+            if not item.strip():
+                continue
+            name, _, value = item.partition('=')
+            name = name.strip()
+            if name not in values:
+                raise ValueError(f'unknown fault: {name}')
+            values[name] = value.strip()
+        self.seed = int(values['seed'])
+        self.discovery_delay = float(values['discovery_delay'])
+        self.loss = float(values['loss'])
+        self.reorder = float(values['reorder'])
+        self.duplicate = float(values['duplicate'])
+        probability, _, seconds = values['stall'].partition(':')
+        self.stall_probability = float(probability)
+        self.stall_seconds = float(seconds or 0)
+        self.shutdown_delay = float(values['shutdown_delay'])
+        self.spec = spec
+        # independent generators, so the decisions of the sample path do not
+        # depend on the number of iterations and vice versa
+        self.send_random = {}
+        self.stall_random = random.Random(self.seed + 1)
+        self.held = {}
+        self.shutdown_timer = None
+
+    def deliveries(self, address, sample):
+        """
+        Samples to send to the application 'address' instead of 'sample':
+        none if it is lost, two copies if it is duplicated. If it is
+        reordered, it is held and sent after the next sample.
+        """
+        send_random = self.send_random.get(address)
+        if send_random is None:
+            send_random = self.send_random[address] = random.Random(
+                    f'{self.seed}:{address}')
+        lost, duplicated, reordered = (send_random.random()
+                for _ in range(3))
+        samples = []
+        if lost >= self.loss:
+            samples.append(sample)
+            if duplicated < self.duplicate:
+                samples.append(sample)
+        held = self.held.pop(address, None)
+        if held is not None:
+            samples.append(held)
+        elif samples and reordered < self.reorder:
+            self.held[address] = samples.pop()
+        return samples
+
+    def flush(self, address):
+        """ Samples held for the application 'address'. """
+        held = self.held.pop(address, None)
+        return [] if held is None else [held]
+
+    def stall(self):
+        """ Seconds the main loop stalls in this iteration. """
+        if self.stall_random.random() < self.stall_probability:
+            return self.stall_seconds
+        return 0
+
+    def handle_sigint(self, signum, frame):
+        if self.shutdown_delay <= 0:
+            all_done.set()
+        elif self.shutdown_timer is None:
+            # slow shutdown: keep running, ignoring SIGINT, for a while
+            self.shutdown_timer = threading.Timer(self.shutdown_delay,
+                    all_done.set)
+            self.shutdown_timer.daemon = True
+            self.shutdown_timer.start()
+
+class Participant(threading.Thread):
+    """
+    DomainParticipant: socket of the application in the rendezvous
+    directory of the domain and the thread that receives the messages of the
+    other applications, announces the local endpoints and checks the
+    deadlines. 'lock' protects the endpoints.
+    """
+    def __init__(self, options, faults):
+        threading.Thread.__init__(self, daemon=True)
+        self.faults = faults
+        # discovery is ignored until then (fault discovery_delay)
+        self.discovery_start = time.monotonic() + faults.discovery_delay
+        self.lock = threading.RLock()
+        self.directory = os.path.join(SIM_DIR, f'domain_{options.domain_id}')
+        os.makedirs(self.directory, exist_ok=True)
+        self.address = os.path.join(self.directory, f'{os.getpid()}.sock')
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.socket.bind(self.address)
+        self.socket.settimeout(TICK)
+        self.send_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.send_socket.settimeout(SEND_TIMEOUT)
+        self.announce_period = (options.periodic_announcement_period_us / 1e6
+                or ANNOUNCE_PERIOD)
+        self.endpoints = []
+        self.peers = {}
+        self.pending_sets = {}
+        self.sequence = 0
+        self.coherent_set = None
+        self.coherent_sets = 0
+        self._stopped = threading.Event()
+
+    def next_sequence(self):
+        self.sequence += 1
+        return self.sequence
+
+    def send(self, address, message, reliable=True):
+        """
+        Sends 'message' to the application 'address'. BEST_EFFORT messages
+        are dropped if the receiver is full. RELIABLE messages are never
+        dropped: they are retried every SEND_TIMEOUT until they are sent or
+        the receiver is lost (it finished, or it did not read for
+        LOST_PEER_TIMEOUT). Returns False if the message is not sent.
+        """
+        data = json.dumps(message, separators=(',', ':')).encode()
+        deadline = time.monotonic() + LOST_PEER_TIMEOUT
+        while True:
+            try:
+                if reliable:
+                    self.send_socket.sendto(data, address)
+                else:
+                    self.send_socket.sendto(data, socket.MSG_DONTWAIT,
+                            address)
+                return True
+            except (BlockingIOError, socket.timeout):
+                if not reliable:
+                    return False
+                if time.monotonic() >= deadline:
+                    logger.log_message(f'error: {address} did not read for '
+                            f'{LOST_PEER_TIMEOUT} s, RELIABLE samples cannot '
+                            'be delivered, losing it', ERROR)
+                    self.lose(address)
+                    return False
+            except (ConnectionRefusedError, FileNotFoundError):
+                # the application finished without saying goodbye
+                if address.endswith('.sock'):
+                    try:
+                        os.unlink(address)
+                    except OSError:
+                        pass
+                self.lose(address)
+                return False
+
+    def send_sample(self, address, sample, reliable):
+        """ Sends a sample to the application 'address', injecting faults. """
+        for delivery in self.faults.deliveries(address, sample):
+            self.send(address, delivery, reliable)
+
+    def flush_samples(self, address):
+        """ Sends the samples held (reordered) for the application 'address'. """
+        for delivery in self.faults.flush(address):
+            self.send(address, delivery)
+
+    def announce(self, addresses=None):
+        message = {'t': 'announce', 'from': self.address,
+                'endpoints': [endpoint.qos for endpoint in self.endpoints]}
+        if addresses is None:
+            try:
+                addresses = {os.path.join(self.directory, entry)
+                        for entry in os.listdir(self.directory)
+                        if entry.endswith('.sock')}
+            except OSError:
+                addresses = set()
+            addresses.discard(self.address)
+            for address in set(self.peers) - addresses:
+                self.lose(address)
+        # best effort: the announcements are periodic, and the receive thread
+        # must not block on a Publisher blocked on this application
+        for address in addresses:
+            self.send(address, message, False)
+
+    def lose(self, address):
+        if self.peers.pop(address, None) is None:
+            return
+        for endpoint in self.endpoints:
+            endpoint.lose(address)
+        for key in [key for key in self.pending_sets if key[0] == address]:
+            del self.pending_sets[key]
+
+    def handle(self, message):
+        kind = message['t']
+        if kind == 'announce':
+            if time.monotonic() < self.discovery_start:
+                return
+            address = message['from']
+            if address not in self.peers:
+                # announce back before matching, so that the remote
+                # application knows the local endpoints before receiving
+                # any sample
+                self.peers[address] = message['endpoints']
+                self.announce([address])
+            for remote in message['endpoints']:
+                for endpoint in self.endpoints:
+                    endpoint.discover(remote, address)
+        elif kind == 'bye':
+            self.lose(message['from'])
+        elif kind == 'data':
+            readers = [endpoint for endpoint in self.endpoints
+                    if message['w'] in endpoint.remotes]
+            if message['s'] is not None:
+                key = (message['w'].split(':')[0], message['s'])
+                self.pending_sets.setdefault(key, []).extend(
+                        (reader, message) for reader in readers)
+            else:
+                for reader in readers:
+                    reader.receive(message)
+        elif kind == 'end_set':
+            for reader, sample in self.pending_sets.pop(
+                    (message['pid'], message['s']), []):
+                reader.receive(sample)
+        elif kind in ('unregister', 'dispose'):
+            for endpoint in self.endpoints:
+                endpoint.change_state(message)
+
+    def run(self):
+        next_announce = 0
+        while not self._stopped.is_set():
+            try:
+                data = self.socket.recv(65536)
+            except socket.timeout:
+                data = None
+            except OSError:
+                break
+            now = time.monotonic()
+            with self.lock:
+                if data is not None:
+                    self.handle(json.loads(data))
+                if now >= next_announce and now >= self.discovery_start:
+                    self.announce()
+                    next_announce = now + self.announce_period
+                for endpoint in self.endpoints:
+                    if endpoint.qos['deadline']:
+                        endpoint.check_deadline(now)
+
+    def begin_coherent_changes(self):
+        self.coherent_sets += 1
+        self.coherent_set = self.coherent_sets
+
+    def end_coherent_changes(self):
+        message = {'t': 'end_set', 'pid': str(os.getpid()),
+                's': self.coherent_set}
+        self.coherent_set = None
+        addresses = set()
+        for endpoint in self.endpoints:
+            addresses |= endpoint.addresses()
+        for address in addresses:
+            self.flush_samples(address)
+            self.send(address, message)
+
+    def close(self):
+        self._stopped.set()
+        if self.ident is not None:
+            self.join()
+        with self.lock:
+            for address in list(self.peers):
+                self.flush_samples(address)
+                self.send(address, {'t': 'bye', 'from': self.address},
+                        False)
+            self.socket.close()
+            self.send_socket.close()
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+class ShapeApplication:
+    def __init__(self, faults):
+        self.faults = faults
+        self.participant = None
+        self.topic_names = []
+        self.writers = []
+        self.readers = []
+
+    def initialize(self, options):
+        logger.log_message('Running initialize() function', DEBUG)
+        self.participant = Participant(options, self.faults)
+        logger.log_message('Participant created', DEBUG)
+        for i in range(options.num_topics):
+            topic_name = options.topic_name + (str(i) if i > 0 else '')
+            emit(f'Create topic: {topic_name}')
+            self.topic_names.append(topic_name)
+        if options.publish:
+            return self.init_publisher(options)
+        return self.init_subscriber(options)
+
+    def init_publisher(self, options):
+        logger.log_message('Running init_publisher() function', DEBUG)
+        for i, topic_name in enumerate(self.topic_names):
+            emit(f'Create writer for topic: {topic_name} color: '
+                    f'{options.color}')
+            self.writers.append(Writer(self.participant, i, topic_name,
+                    options))
+        self.participant.endpoints = self.writers
+        self.participant.start()
+        return True
+
+    def init_subscriber(self, options):
+        logger.log_message('Running init_subscriber() function', DEBUG)
+        content_filter = None
+        if options.cft_expression is not None or options.color is not None:
+            expression = options.cft_expression
+            if expression is None:
+                expression = f"color = '{options.color}'"
+            try:
+                content_filter = ContentFilter(expression)
+            except ValueError:
+                logger.log_message('failed to create content filtered topic',
+                        ERROR)
+                return False
+            logger.log_message(f'    ContentFilterTopic = "{expression}"',
+                    DEBUG)
+        for i, topic_name in enumerate(self.topic_names):
+            name = topic_name
+            if content_filter is not None:
+                name = f'{topic_name}_filtered'
+            emit(f'Create reader for topic: {name}')
+            self.readers.append(Reader(self.participant, i, topic_name, name,
+                    content_filter, options))
+        self.participant.endpoints = self.readers
+        self.participant.start()
+        return True
+
+    def run(self, options):
+        try:
+            if options.publish:
+                return self.run_publisher(options)
+            return self.run_subscriber(options)
+        finally:
+            self.participant.close()
+
+    def stall(self):
+        """ Stalls the main loop if the fault stall is injected. """
+        seconds = self.faults.stall()
+        if seconds > 0:
+            logger.log_message(f'Stalling {seconds}s', DEBUG)
+            time.sleep(seconds)
+
+    def run_subscriber(self, options):
+        logger.log_message('Running run_subscriber() function', DEBUG)
+        n = 0
+        statistics = None
+        if options.stats_interval_us > 0:
+            statistics = SampleStatistics(options.output_jsonl)
+            for reader in self.readers:
+                reader.statistics = statistics
+        while not all_done.is_set():
+            lines = []
+            if options.coherent_set_enabled:
+                lines.append(f'Reading coherent sets, iteration {n}')
+            if options.ordered_access_enabled:
+                lines.append(f'Reading with ordered access, iteration {n}')
+            with self.participant.lock:
+                for reader in self.readers:
+                    lines.extend(reader.read())
+            emit(lines)
+            self.stall()
+
+            n += 1
+            logger.log_message(f'Subscriber iteration: <{n}>', DEBUG)
+            if options.num_iterations != 0 and options.num_iterations <= n:
+                all_done.set()
+            if (statistics is not None
+                    and statistics.interval_elapsed(options.stats_interval_us)):
+                emit(statistics.lines())
+            all_done.wait(options.read_period_us / 1e6)
+        # the last (partial) interval
+        if statistics is not None:
+            emit(statistics.lines())
+        return True
+
+    def run_publisher(self, options):
+        logger.log_message('Running run_publisher() function', DEBUG)
+        n = 0
+        rng = random.Random(SIM_SEED)
+        da_width, da_height = options.da_width, options.da_height
+        size = options.shapesize
+        x = rng.randrange(da_width)
+        y = rng.randrange(da_height)
+        xvel = (rng.randrange(5) + 1) * (-1 if rng.randrange(2) else 1)
+        yvel = (rng.randrange(5) + 1) * (-1 if rng.randrange(2) else 1)
+        colors = [options.color + (str(j) if j > 0 else '')
+                for j in range(options.num_instances)]
+        coherent = (options.coherent_set_enabled
+                or options.ordered_access_enabled)
+        sample_count = options.coherent_set_sample_count
+
+        while not all_done.is_set():
+            # moveShape()
+            x += xvel
+            y += yvel
+            if x < 0:
+                x = 0
+                xvel = -xvel
+            if x > da_width:
+                x = da_width
+                xvel = -xvel
+            if y < 0:
+                y = 0
+                yvel = -yvel
+            if y > da_height:
+                y = da_height
+                yvel = -yvel
+
+            if options.shapesize == 0:
+                if options.size_modulo > 0:
+                    # Size cannot be 0, so increase it after modulo operation
+                    size = (size % options.size_modulo) + 1
+                else:
+                    size += 1
+
+            lines = []
+            with self.participant.lock:
+                if coherent and sample_count != 0 and n % sample_count == 0:
+                    lines.append('Started Coherent Set')
+                    self.participant.begin_coherent_changes()
+                for writer in self.writers:
+                    for color in colors:
+                        write_ns = time.monotonic_ns()
+                        writer.write(color, x, y, size,
+                                options.additional_payload_size,
+                                self.participant.coherent_set)
+                        if options.print_writer_samples:
+                            lines.append(sample_line(writer.name, {'c': color,
+                                    'x': x, 'y': y, 'z': size,
+                                    'p': options.additional_payload_size},
+                                    options.output_jsonl,
+                                    (write_ns, None)
+                                        if options.print_timestamps else None))
+                if (coherent and sample_count != 0
+                        and n % sample_count == sample_count - 1):
+                    lines.append('Finished Coherent Set')
+                    self.participant.end_coherent_changes()
+            emit(lines)
+            self.stall()
+            # write_burst samples (per instance) every write period, and no
+            # waiting at all with a write period of 0 (maximum rate)
+            if (options.write_period_us > 0
+                    and (n + 1) % options.write_burst == 0):
+                all_done.wait(options.write_period_us / 1e6)
+
+            n += 1
+            logger.log_message(f'Publisher iteration: <{n}>', DEBUG)
+            if options.num_iterations != 0 and options.num_iterations <= n:
+                all_done.set()
+
+        # Unregister or dispose instances of all DataWriters
+        if options.dispose or options.unregister:
+            with self.participant.lock:
+                for writer in self.writers:
+                    for color in colors:
+                        writer.instance_message(
+                                'dispose' if options.dispose else 'unregister',
+                                color)
+        return True
+
+def run_shape_application(options):
+    """ Runs the application once with the options parsed. Returns the exit
+    code. """
+    role_variable = (PUB_FAULTS_VARIABLE if options.publish
+            else SUB_FAULTS_VARIABLE)
+    spec = ','.join(os.environ.get(variable, '')
+            for variable in (FAULTS_VARIABLE, role_variable))
+    try:
+        faults = Faults(spec)
+    except ValueError as error:
+        logger.log_message(f'incorrect value for faults: {error}', ERROR)
+        return ERROR_PARSING_ARGUMENTS
+    logger.log_message(f'    Faults = {spec.strip(",")}', DEBUG)
+    signal.signal(signal.SIGINT, faults.handle_sigint)
+
+    logger.log_message('Initializing ShapeApp...', DEBUG)
+    shape_app = ShapeApplication(faults)
+    if not shape_app.initialize(options):
+        if shape_app.participant is not None:
+            shape_app.participant.close()
+        return ERROR_INITIALIZING
+    logger.log_message('Running ShapeApp...', DEBUG)
+    if not shape_app.run(options):
+        return ERROR_RUNNING
+
+    emit('Done.')
+    return 0
+
+def read_commands(commands):
+    """
+    Puts the lines read from stdin in the queue 'commands', and None at the
+    end of stdin. The command 'stop' stops the run in progress.
+    """
+    for line in sys.stdin:
+        if line.split()[:1] == ['stop']:
+            all_done.set()
+        else:
+            commands.put(line)
+    all_done.set()
+    commands.put(None)
+
+def run_control(program):
+    """ Control mode (--control stdin), see run_control in shape_main.cxx. """
+    global record_seq
+    commands = queue.Queue()
+    threading.Thread(target=read_commands, args=(commands,),
+            daemon=True).start()
+    emit('control: ready')
+    while True:
+        line = commands.get()
+        if line is None:
+            break
+        try:
+            args = shlex.split(line)
+        except ValueError as error:
+            logger.log_message(f'incorrect command: {error}', ERROR)
+            emit(f'control: exit {ERROR_PARSING_ARGUMENTS}')
+            continue
+        if not args:
+            continue
+        if args[0] == 'exit':
+            break
+        if args[0] == 'reset':
+            emit('control: ready')
+        elif args[0] == 'run':
+            # every run starts from the initial state of the application
+            signal.signal(signal.SIGINT, lambda signum, frame: all_done.set())
+            logger.verbosity = ERROR
+            all_done.clear()
+            record_seq = itertools.count(1)
+            exit_code = ERROR_PARSING_ARGUMENTS
+            options = ShapeOptions()
+            if options.parse([program] + args[1:]):
+                if options.control_stdin:
+                    logger.log_message('--control cannot be used in a run '
+                            'command', ERROR)
+                else:
+                    exit_code = run_shape_application(options)
+            emit(f'control: exit {exit_code}')
+        else:
+            emit(f'control: unknown command {args[0]}')
+    return 0
+
+def main():
+    signal.signal(signal.SIGINT, lambda signum, frame: all_done.set())
+
+    options = ShapeOptions()
+    logger.log_message('Parsing command line parameters...', DEBUG)
+    if not options.parse(sys.argv):
+        return ERROR_PARSING_ARGUMENTS
+    if options.control_stdin:
+        return run_control(sys.argv[0])
+    return run_shape_application(options)
+
+if __name__ == '__main__':
+    sys.exit(main())
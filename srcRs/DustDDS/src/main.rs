@@ -29,7 +29,10 @@ use std::{
     fmt::Debug,
     io::Write,
     process::{ExitCode, Termination},
-    sync::mpsc::Receiver,
+    sync::{
+        atomic::{AtomicU64, Ordering},
+        mpsc::Receiver,
+    },
 };
 
 include!(concat!(env!("OUT_DIR"), "/idl/shape.rs"));
@@ -235,6 +238,10 @@ struct Options {
     /// This only applies if shapesize is increased (-z 0)
     #[clap(short = 'Q', long = "size-modulo")]
     size_modulo: Option<i32>,
+
+    /// print the monotonic time (ns) the samples are written or received and the source timestamp of the samples read
+    #[clap(long = "timestamps")]
+    timestamps: bool,
 }
 
 impl Options {
@@ -473,6 +480,40 @@ impl DomainParticipantListener for Listener {
             status.not_alive_count,
         );
     }
+
+    async fn on_data_available(
+        &mut self,
+        _the_reader: dust_dds::dds_async::data_reader::DataReaderAsync<()>,
+    ) {
+        DATA_AVAILABLE_NS.store(monotonic_ns(), Ordering::Relaxed);
+    }
+}
+
+/// Monotonic time of the last on_data_available() notification since the samples were last taken, 0 if
+/// none. The samples taken were received at the latest at that time.
+static DATA_AVAILABLE_NS: AtomicU64 = AtomicU64::new(0);
+
+/// Time the samples just taken were received (printed with --timestamps): the last data available
+/// notification, or `read_ns` (the time they were taken) if there was no notification. Resets the
+/// notification time.
+fn received_ns(read_ns: u64) -> u64 {
+    match DATA_AVAILABLE_NS.swap(0, Ordering::Relaxed) {
+        0 => read_ns,
+        notified_ns => notified_ns,
+    }
+}
+
+/// Monotonic time (ns) printed with --timestamps: the same clock (CLOCK_MONOTONIC) as the other shape_main
+/// applications and the interoperability_report, so the times of different applications compare.
+fn monotonic_ns() -> u64 {
+    let mut now = libc::timespec {
+        tv_sec: 0,
+        tv_nsec: 0,
+    };
+    unsafe {
+        libc::clock_gettime(libc::CLOCK_MONOTONIC, &mut now);
+    }
+    now.tv_sec as u64 * 1_000_000_000 + now.tv_nsec as u64
 }
 
 fn move_shape(
@@ -588,8 +629,9 @@ fn run_publisher(
         }
 
         move_shape(&mut shape, &mut x_vel, &mut y_vel, da_width, da_height);
+        let write_ns = monotonic_ns();
         if options.print_writer_samples {
-            println!(
+            print!(
                 "{:10} {:10} {:03} {:03} [{:}]",
                 options.topic_name.as_str(),
                 shape.color,
@@ -597,6 +639,10 @@ fn run_publisher(
                 shape.y,
                 shape.shapesize
             );
+            if options.timestamps {
+                print!(" ns={}", write_ns);
+            }
+            println!();
         }
         data_writer.write(shape.clone(), None).ok();
         std::thread::sleep(std::time::Duration::from_millis(
@@ -701,10 +747,11 @@ fn run_subscriber(
             };
             match read_result {
                 Ok(samples) => {
+                    let read_ns = received_ns(monotonic_ns());
                     for sample in samples {
                         if sample.sample_info.valid_data {
                             let smaple_data = sample.data.as_ref().expect("data present");
-                            println!(
+                            print!(
                                 "{:10} {:10} {:03} {:03} [{}]",
                                 data_reader.get_topicdescription().get_name(),
                                 smaple_data.color,
@@ -712,6 +759,18 @@ fn run_subscriber(
                                 smaple_data.y,
                                 smaple_data.shapesize
                             );
+                            if options.timestamps {
+                                print!(" ns={}", read_ns);
+                                if let Some(source_timestamp) = &sample.sample_info.source_timestamp
+                                {
+                                    print!(
+                                        " source_ns={}",
+                                        source_timestamp.sec() as i64 * 1_000_000_000
+                                            + source_timestamp.nanosec() as i64
+                                    );
+                                }
+                            }
+                            println!();
                             std::io::stdout().flush().expect("flush stdout succeeds");
                         }
                         previous_handle = Some(sample.sample_info.instance_handle);
@@ -744,6 +803,7 @@ fn initialize(options: &Options) -> Result<DomainParticipant, InitializeError> {
             StatusKind::SubscriptionMatched,
             StatusKind::RequestedDeadlineMissed,
             StatusKind::LivelinessChanged,
+            StatusKind::DataAvailable,
         ],
     )?;
     println!("Create topic: {}", options.topic_name);
@@ -43,6 +43,37 @@ extern "C" fn sigint_handler(_sig: libc::c_int) {
     ALL_DONE.store(true, Ordering::SeqCst);
 }
 
+// ---------------------------------------------------------------------------
+// Monotonic time (ns) printed with --timestamps: the same clock
+// (CLOCK_MONOTONIC) as the other shape_main applications and the
+// interoperability_report, so the times of different applications compare.
+// ---------------------------------------------------------------------------
+fn monotonic_ns() -> u64 {
+    let mut now = libc::timespec {
+        tv_sec: 0,
+        tv_nsec: 0,
+    };
+    unsafe {
+        libc::clock_gettime(libc::CLOCK_MONOTONIC, &mut now);
+    }
+    now.tv_sec as u64 * 1_000_000_000 + now.tv_nsec as u64
+}
+
+// Monotonic time of the last on_data_available() notification since the
+// samples were last taken, 0 if none. The samples taken were received at
+// the latest at that time.
+static DATA_AVAILABLE_NS: AtomicU64 = AtomicU64::new(0);
+
+/// Time the sample just taken was received (printed with --timestamps): the
+/// last data available notification, or `read_ns` (the time it was taken) if
+/// there was no notification. Resets the notification time.
+fn received_ns(read_ns: u64) -> u64 {
+    match DATA_AVAILABLE_NS.swap(0, Ordering::Relaxed) {
+        0 => read_ns,
+        notified_ns => notified_ns,
+    }
+}
+
 // ---------------------------------------------------------------------------
 // MatchNotifier — bridges SEDP discovery to DDS listener callbacks
 //
@@ -940,6 +971,8 @@ struct ShapeOptions {
 
     cft_expression: Option<String>,
     size_modulo: u32,
+
+    print_timestamps: bool,
 }
 
 impl Default for ShapeOptions {
@@ -982,6 +1015,7 @@ impl Default for ShapeOptions {
             datafrag_size: 0,
             cft_expression: None,
             size_modulo: 0,
+            print_timestamps: false,
         }
     }
 }
@@ -1032,6 +1066,7 @@ impl ShapeOptions {
         println!("   --datafrag-size <bytes> : set the data fragment size");
         println!("   --cft <expression> : ContentFilteredTopic filter expression");
         println!("   --size-modulo <int> : modulo operation applied to shapesize");
+        println!("   --timestamps : print the monotonic time (ns) the samples are written or received");
     }
 
     fn parse(args: &[String]) -> Option<Self> {
@@ -1262,6 +1297,7 @@ impl ShapeOptions {
                     }
                     opts.size_modulo = args[i].parse().ok()?;
                 }
+                "--timestamps" => opts.print_timestamps = true,
                 _ => {
                     eprintln!("Error: Unknown option {}", args[i]);
                     return None;
@@ -1424,7 +1460,9 @@ struct ReaderListener {
 
 impl DataReaderListener<ShapeType> for ReaderListener {
     fn on_data_available(&self, _sample: &ShapeType) {
-        // Data is handled in the main polling loop, not here
+        // Data is handled in the main polling loop, only the time it was
+        // received is kept here (--timestamps)
+        DATA_AVAILABLE_NS.store(monotonic_ns(), Ordering::Relaxed);
     }
 
     fn on_subscription_matched(&self, status: SubscriptionMatchedStatus) {
@@ -1621,6 +1659,7 @@ fn run_publisher(
                     shape.color = instance_color;
                 }
 
+                let write_ns = monotonic_ns();
                 writer.write(&shape)?;
 
                 // pexpect matches "[<digits>]" for shapesize
@@ -1633,6 +1672,9 @@ fn run_publisher(
                         let last_idx = options.additional_payload_size as usize - 1;
                         print!(" {{{}}}", shape.additional_payload_size[last_idx]);
                     }
+                    if options.print_timestamps {
+                        print!(" ns={}", write_ns);
+                    }
                     println!();
                 }
             }
@@ -1797,6 +1839,7 @@ fn run_subscriber(
 
                 match result {
                     Ok(Some(sample)) => {
+                        let read_ns = received_ns(monotonic_ns());
                         // pexpect matches "[<digits>]" — shapesize in brackets
                         print!(
                             "{:<10} {:<10} {:03} {:03} [{}]",
@@ -1806,6 +1849,11 @@ fn run_subscriber(
                             let last_idx = sample.additional_payload_size.len() - 1;
                             print!(" {{{}}}", sample.additional_payload_size[last_idx]);
                         }
+                        // take()/read() do not return the SampleInfo, so there
+                        // is no source timestamp
+                        if options.print_timestamps {
+                            print!(" ns={}", read_ns);
+                        }
                         println!();
 
                         // FIX #4: Instance state handling (P1.2 — implemented)
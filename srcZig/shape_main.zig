@@ -75,6 +75,18 @@ fn stdoutPrint(comptime fmt: []const u8, args: anytype) void {
     stdoutWrite(w.buffered());
 }
 
+// End of the sample lines: with --timestamps, " ns=<monotonic time>" (taken
+// before writing the sample or when it is received, see receivedNs()) and,
+// for the samples read, " source_ns=<source timestamp>"; then the new line.
+fn sampleLineEnd(buf: []u8, opts: *const Options, ns: i64, source_ns: ?i64) []const u8 {
+    if (!opts.timestamps) return "\n";
+    var w: std.Io.Writer = .fixed(buf);
+    w.print(" ns={d}", .{ns}) catch {};
+    if (source_ns) |sns| w.print(" source_ns={d}", .{sns}) catch {};
+    w.writeAll("\n") catch {};
+    return w.buffered();
+}
+
 // ── Signal handling ───────────────────────────────────────────────────────────
 
 var g_all_done: std.atomic.Value(bool) = std.atomic.Value(bool).init(false);
@@ -120,6 +132,7 @@ const Options = struct {
     read_only: bool = false, // -R: use read() instead of take() (non-destructive)
     coherent_sample_count: u32 = 0, // --coherent-sample-count (0 = no coherent set gating)
     periodic_announcement_ms: u32 = 0, // --periodic-announcement (0 = use zzdds's own default)
+    timestamps: bool = false, // --timestamps: print the monotonic time of the samples written/read
 };
 
 // ── Policy name mapping ───────────────────────────────────────────────────────
@@ -163,6 +176,22 @@ fn drOnIncompatQos(lc: *ListenerCtx, _: DDS.DataReader, status: DDS.RequestedInc
 fn drOnDeadlineMissed(lc: *ListenerCtx, _: DDS.DataReader, status: DDS.RequestedDeadlineMissedStatus) void {
     stdoutPrint("on_requested_deadline_missed() topic: '{s}'  type: '{s}' : (total = {d}, change = {d})\n", .{ lc.topic_name, lc.type_name, status.total_count, status.total_count_change });
 }
+fn drOnDataAvailable(_: *ListenerCtx, _: DDS.DataReader) void {
+    g_data_available_ns.store(monoNs(), .release);
+}
+
+// Monotonic time of the last on_data_available() notification since the
+// samples were last taken, 0 if none. The samples taken were received at the
+// latest at that time.
+var g_data_available_ns: std.atomic.Value(i64) = std.atomic.Value(i64).init(0);
+
+// Time the sample just taken was received (--timestamps): the last data
+// available notification, or read_ns (the time it was taken) if there was no
+// notification. Resets the notification time.
+fn receivedNs(read_ns: i64) i64 {
+    const notified_ns = g_data_available_ns.swap(0, .acq_rel);
+    return if (notified_ns != 0) notified_ns else read_ns;
+}
 
 // ── DataWriter QoS builder ────────────────────────────────────────────────────
 
@@ -486,9 +515,11 @@ fn runPublisher(
                     for (0..sc) |_| {
                         shape.x = @rem(@as(i32, rand.int(u16)), 320);
                         shape.y = @rem(@as(i32, rand.int(u16)), 240);
+                        const write_ns = monoNs();
                         try typed_writers[ti].write(shape, 0);
                         if (opts.print_writer_samples) {
-                            stdoutPrint("{s:<10} {s:<10} {d:0>3} {d:0>3} [{d}]\n", .{ lctxs[ti].topic_name, inst_color, @as(u32, @intCast(shape.x)), @as(u32, @intCast(shape.y)), shape.shapesize });
+                            var end_buf: [64]u8 = undefined;
+                            stdoutPrint("{s:<10} {s:<10} {d:0>3} {d:0>3} [{d}]{s}", .{ lctxs[ti].topic_name, inst_color, @as(u32, @intCast(shape.x)), @as(u32, @intCast(shape.y)), shape.shapesize, sampleLineEnd(&end_buf, opts, write_ns, null) });
                         }
                         if (opts.shapesize == 0) {
                             shape.shapesize += 1;
@@ -509,9 +540,11 @@ fn runPublisher(
                     const inst_color = try instanceColor(alloc, base_color, inst);
                     defer if (inst > 0) alloc.free(inst_color);
                     shape.color = ShapeColor.fromSlice(inst_color) catch .{};
+                    const write_ns = monoNs();
                     try typed_writers[ti].write(shape, 0);
                     if (opts.print_writer_samples) {
-                        stdoutPrint("{s:<10} {s:<10} {d:0>3} {d:0>3} [{d}]\n", .{ lctxs[ti].topic_name, inst_color, @as(u32, @intCast(shape.x)), @as(u32, @intCast(shape.y)), shape.shapesize });
+                        var end_buf: [64]u8 = undefined;
+                        stdoutPrint("{s:<10} {s:<10} {d:0>3} {d:0>3} [{d}]{s}", .{ lctxs[ti].topic_name, inst_color, @as(u32, @intCast(shape.x)), @as(u32, @intCast(shape.y)), shape.shapesize, sampleLineEnd(&end_buf, opts, write_ns, null) });
                     }
                 }
             }
@@ -616,7 +649,7 @@ fn runSubscriber(
     var dr_handles: [MAX_TOPICS]DDS.DataReader = undefined;
     var typed_readers: [MAX_TOPICS]shape_gen.ShapeTypeDataReader = undefined;
     const listener_mask: DDS.StatusMask =
-        DDS.REQUESTED_INCOMPATIBLE_QOS_STATUS | DDS.REQUESTED_DEADLINE_MISSED_STATUS;
+        DDS.REQUESTED_INCOMPATIBLE_QOS_STATUS | DDS.REQUESTED_DEADLINE_MISSED_STATUS | DDS.DATA_AVAILABLE_STATUS;
 
     for (0..n) |i| {
         const tn = et.nameAt(opts.topic_name, @intCast(i));
@@ -624,6 +657,7 @@ fn runSubscriber(
         const dr_listener = DDS.dataReaderListener(&lctxs[i], .{
             .on_requested_deadline_missed = drOnDeadlineMissed,
             .on_requested_incompatible_qos = drOnIncompatQos,
+            .on_data_available = drOnDataAvailable,
         });
 
         const topic_desc: DDS.TopicDescription = if (i == 0 and cft != null)
@@ -758,6 +792,7 @@ fn runSubscriber(
                 }
                 defer value.deinit(alloc);
                 got_data = true;
+                const read_ns = receivedNs(monoNs());
 
                 if (info.instance_state == DDS.NOT_ALIVE_NO_WRITERS_INSTANCE_STATE or
                     info.instance_state == DDS.NOT_ALIVE_DISPOSED_INSTANCE_STATE)
@@ -794,10 +829,13 @@ fn runSubscriber(
                 else
                     null;
 
+                const source_ns = @as(i64, info.source_timestamp.sec) * std.time.ns_per_s + info.source_timestamp.nanosec;
+                var end_buf: [64]u8 = undefined;
+                const line_end = sampleLineEnd(&end_buf, opts, read_ns, source_ns);
                 if (last_byte) |lb| {
-                    stdoutPrint("{s:<10} {s:<10} {d:0>3} {d:0>3} [{d}] {{{d}}}\n", .{ tn, value.color.slice(), @as(u32, @intCast(value.x)), @as(u32, @intCast(value.y)), value.shapesize, lb });
+                    stdoutPrint("{s:<10} {s:<10} {d:0>3} {d:0>3} [{d}] {{{d}}}{s}", .{ tn, value.color.slice(), @as(u32, @intCast(value.x)), @as(u32, @intCast(value.y)), value.shapesize, lb, line_end });
                 } else {
-                    stdoutPrint("{s:<10} {s:<10} {d:0>3} {d:0>3} [{d}]\n", .{ tn, value.color.slice(), @as(u32, @intCast(value.x)), @as(u32, @intCast(value.y)), value.shapesize });
+                    stdoutPrint("{s:<10} {s:<10} {d:0>3} {d:0>3} [{d}]{s}", .{ tn, value.color.slice(), @as(u32, @intCast(value.x)), @as(u32, @intCast(value.y)), value.shapesize, line_end });
                 }
             }
         }
@@ -939,6 +977,8 @@ fn parseArgs(process_args: std.process.Args) !Options {
         } else if (std.mem.eql(u8, arg, "--periodic-announcement")) {
             const v = it.next() orelse return error.MissingValue;
             opts.periodic_announcement_ms = std.fmt.parseInt(u32, v, 10) catch 0;
+        } else if (std.mem.eql(u8, arg, "--timestamps")) {
+            opts.timestamps = true;
         } else if (std.mem.eql(u8, arg, "--publisher-matches") or
             std.mem.eql(u8, arg, "--subscriber-matches"))
         {
@@ -991,6 +1031,8 @@ fn parseArgs(process_args: std.process.Args) !Options {
                 \\Other:
                 \\  -d <id>             Domain ID (default: 0)
                 \\  -w                  Print each sample on the writer side
+                \\  --timestamps        Print the monotonic time (ns) the samples are written or
+                \\                      received and the source timestamp of the samples read
                 \\  --periodic-announcement <ms>  SPDP participant re-announcement period
                 \\                                (0 = use zzdds's own default)
                 \\  -h, --help          Show this help and exit
@@ -32,7 +32,9 @@ import test_suite_functions as tsf
 #         the samples from the publishers. By default, it just checks that
 #         the data is received. In case that it has a different behavior, that
 #         function must be implemented in the test_suite file and the test case
-#         should reference it in this parameter.
+#         should reference it in this parameter. Checking functions may also
+#         be composed from the rules in rtps_validators.py using a
+#         SampleValidator.
 #       * title: human-readable short description of the test
 #       * description: description of the test behavior and parameters
 #
@@ -0,0 +1,458 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+from rtps_test_utilities import ReturnCode
+import test_suite_functions as tsf
+import test_suite_benchmark_functions as tbf
+
+# rtps_benchmark_suite is a Test Suite (see test_suite.py) whose Test Cases
+# measure how the products scale. Run it with:
+#       interoperability_report.py -s test_suite_benchmark
+# Besides the keys described in test_suite.py, its Test Cases may define:
+#       * startup_delay [OPTIONAL]: time (seconds) the interoperability_report
+#         waits before running each shape_main application, or list with the
+#         time for each element of 'apps'. Default: 1.
+#       * metrics_function [OPTIONAL]: function that computes the metrics of
+#         the Test Case from the output of the shape_main applications (see
+#         test_suite_benchmark_functions.py). The metrics are printed and
+#         saved with the option --benchmark-report.
+#       * stop_after [OPTIONAL]: dictionary index of a Publisher or a
+#         Subscriber in 'apps' -> seconds after which its shape_main
+#         application is stopped while the rest of the applications are still
+#         running. A Publisher is only stopped once it matched the
+#         Subscribers and a Subscriber once its checking function finished.
+#       * resource_period [OPTIONAL]: if set, the resident set size and the
+#         CPU time of every shape_main application are recorded every
+#         resource_period seconds (see rtps_resources.py, only in Linux).
+#       * match_timeout [OPTIONAL]: time (seconds) the Publishers wait until
+#         they match a Subscriber, instead of the timeout of the
+#         interoperability_report (15 seconds). Needed if a Subscriber is run
+#         with a longer startup_delay.
+
+# Number of Subscribers of the fan-out Test Cases
+FAN_OUT_SUBSCRIBERS = [1, 2, 4, 8, 16, 32]
+# Number of Publishers of the ownership handover Test Cases
+OWNERSHIP_WRITERS = [2, 4, 8]
+# Write periods (ms) of the deadline jitter Test Cases. The DEADLINE period
+# is twice the write period.
+DEADLINE_WRITE_PERIODS = [10, 20, 50]
+# Write periods (ms) of the TIME_BASED_FILTER and LIFESPAN timing Test Cases.
+# The rest of the periods are proportional, as in Test_TimeBasedFilter_0
+# (write period 100ms) and Test_Lifespan_0 of test_suite.py.
+TIMING_WRITE_PERIODS = [10, 100]
+# History depths and instances of the late-joiner Test Cases. The Publisher
+# writes every LATE_JOINER_WRITE_PERIOD ms and the Subscriber is run once
+# the history is full. The Subscriber reads every LATE_JOINER_READ_PERIOD ms,
+# before the samples written after it joined replace the history in its
+# KEEP_LAST cache.
+LATE_JOINER_DEPTHS = [10, 100, 1000, 10000]
+LATE_JOINER_INSTANCES = 10
+LATE_JOINER_WRITE_PERIOD = 1
+LATE_JOINER_READ_PERIOD = 1
+# Topics and instances of the coherent sets scaling Test Cases
+COHERENT_SETS_TOPICS = 20
+COHERENT_SETS_INSTANCES = 100
+# Read period / write period ratios of the backpressure Test Cases. The
+# Publisher writes every BACKPRESSURE_WRITE_PERIOD ms.
+BACKPRESSURE_RATIOS = [1, 4, 16, 64]
+BACKPRESSURE_WRITE_PERIOD = 10
+# Selectivities (percentage of the samples that pass the filter) and
+# instances of the ContentFilteredTopic throughput Test Cases. The Publisher
+# writes every instance every CFT_WRITE_PERIOD ms with sizes cycling from 1
+# to 100, so the filter "shapesize <= <selectivity>" selects that percentage.
+CFT_SELECTIVITIES = [100, 50, 10, 1]
+CFT_INSTANCES = 50
+CFT_WRITE_PERIOD = 10
+# Additional payload sizes (bytes) of the throughput Test Cases. The
+# Publisher writes as fast as it can (write period 0) and the Subscriber
+# prints a summary every THROUGHPUT_STATS_INTERVAL ms (--stats-interval)
+# instead of the samples; THROUGHPUT_STATS summaries are read.
+THROUGHPUT_PAYLOAD_SIZES = [100, 1000, 10000, 60000]
+THROUGHPUT_STATS_INTERVAL = 1000
+THROUGHPUT_STATS = 5
+# Burst sizes of the burst throughput Test Cases: the Publisher writes
+# bursts of samples of THROUGHPUT_BURST_PAYLOAD_SIZE bytes back to back every
+# THROUGHPUT_BURST_PERIOD microseconds (options --burst and
+# --write-period-us).
+THROUGHPUT_BURSTS = [10, 100, 1000]
+THROUGHPUT_BURST_PAYLOAD_SIZE = 1000
+THROUGHPUT_BURST_PERIOD = 10000
+# Subscribers run at a time and cycles of the discovery churn Test Cases.
+# Every CHURN_PERIOD seconds a group of Subscribers is run, and each of them
+# is stopped CHURN_ALIVE seconds after it was run.
+CHURN_GROUP_SIZES = [1, 4]
+CHURN_CYCLES = 20
+CHURN_PERIOD = 4
+CHURN_ALIVE = 2
+# Number of shape_main applications (participants) of the participant
+# scaling Test Cases: half of them Publishers and half Subscribers
+PARTICIPANTS = [2, 4, 8, 16, 32, 64]
+
+rtps_benchmark_suite = {}
+
+# FAN-OUT: one RELIABLE Publisher and N Subscribers of the same topic
+for num_subscribers in FAN_OUT_SUBSCRIBERS:
+    rtps_benchmark_suite[f'Test_FanOut_{num_subscribers}'] = {
+        'apps' : ['-P -t Square -r -k 0 -z 0 --write-period 10']
+                + ['-S -t Square -r -k 0'] * num_subscribers,
+        'expected_codes' : [ReturnCode.OK] * (num_subscribers + 1),
+        'check_function' : tsf.test_reliability_no_losses_w_instances,
+        'metrics_function' : tbf.fan_out_metrics,
+        'startup_delay' : 0.1,
+        'title' : f'Fan-out to {num_subscribers} subscribers',
+        'description' : 'Measures how the discovery and the reliable writer scale with the '
+                            'number of subscribers\n\n'
+                        ' * Configures the publisher and subscribers with a RELIABLE reliability\n'
+                        ' * Configures the publisher and subscribers with history KEEP_ALL\n'
+                        ' * Configures the publisher with a writing period of 10ms\n'
+                        f' * Runs {num_subscribers} subscribers of the same topic\n'
+                        ' * The publisher application sends samples with increasing value of the "size" member\n\n'
+                        'The test passes if every subscriber receives '
+                            f'{tsf.MAX_SAMPLES_READ} subsequent samples without losses or duplicates. '
+                            'The metrics are the time since the last subscriber is run until the '
+                            'publisher matches all of them and the samples per second each subscriber '
+                            'receives\n'
+    }
+
+# OWNERSHIP HANDOVER: N Publishers with EXCLUSIVE ownership and different
+# strengths. The strongest one is stopped while the Subscriber is reading.
+for num_writers in OWNERSHIP_WRITERS:
+    rtps_benchmark_suite[f'Test_OwnershipHandover_{num_writers}'] = {
+        'apps' : [f'-P -t Square -s {i + 1} -r -k 0 -c BLUE -z {10 * (i + 2)} '
+                        '--write-period 10' for i in range(num_writers)]
+                + ['-S -t Square -s 1 -r -k 0'],
+        'expected_codes' : [ReturnCode.OK] * (num_writers + 1),
+        'check_function' : tsf.test_ownership_handover,
+        'metrics_function' : tbf.ownership_handover_metrics,
+        'startup_delay' : 0.5,
+        'stop_after' : {num_writers - 1: 4},
+        'title' : f'Ownership handover between {num_writers} publishers',
+        'description' : 'Measures the time the subscriber needs to receive the next strongest '
+                            'publisher once the owner of an instance stops\n\n'
+                        ' * Configures the subscriber with EXCLUSIVE ownership\n'
+                        f' * Runs {num_writers} publishers with EXCLUSIVE ownership and strengths '
+                            f'1 to {num_writers}, each one publishing a different size\n'
+                        ' * Configures the publishers with a writing period of 10ms\n'
+                        ' * The publishers publish the same instance (color BLUE)\n'
+                        ' * The strongest publisher is stopped 4 seconds after it is run, once '
+                            'it matched the subscriber\n\n'
+                        'The test passes if the subscriber only receives the samples of the '
+                            'strongest publisher alive: it may switch to stronger publishers '
+                            'while it discovers them, but once the owner stops it never '
+                            'receives a stronger publisher again. The metric is the time since the '
+                            'owner is stopped until the subscriber receives the samples of the '
+                            'next owner\n'
+    }
+
+# DEADLINE JITTER: one Publisher and one Subscriber with a DEADLINE period
+# twice the write period. The Subscriber reads ten times per write period,
+# so the arrival times are not quantized by the read period
+for write_period in DEADLINE_WRITE_PERIODS:
+    read_period = max(1, write_period // 10)
+    rtps_benchmark_suite[f'Test_DeadlineJitter_{write_period}'] = {
+        'apps' : [f'-P -t Square -w -z 0 --write-period {write_period} -f {2 * write_period}',
+                  f'-S -t Square -f {2 * write_period} --read-period {read_period}'],
+        'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'check_function' : tsf.test_order_w_instances,
+        'metrics_function' : tbf.deadline_metrics,
+        'startup_delay' : 0.1,
+        'title' : f'Inter-arrival jitter with a write period of {write_period}ms',
+        'description' : 'Measures how regularly the samples arrive and how close they come to '
+                            'missing the requested deadline\n\n'
+                        f' * Configures the publisher with a writing period of {write_period}ms\n'
+                        f' * Configures the publisher and subscriber with a DEADLINE of {2 * write_period}ms\n'
+                        f' * Configures the subscriber with a reading period of {read_period}ms\n'
+                        ' * The publisher application sends samples with increasing value of the "size" member\n\n'
+                        f'The test passes if the subscriber receives {tsf.MAX_SAMPLES_READ} samples in order. '
+                            'The metrics are the inter-arrival time of the samples, its jitter (difference '
+                            'with the write period), the number of requested deadline missed notifications '
+                            'and the deadline margin: the deadline minus the maximum inter-arrival time '
+                            'before the first notification\n'
+    }
+
+# TIME_BASED_FILTER and LIFESPAN checked with the time the samples are
+# received
+for write_period in TIMING_WRITE_PERIODS:
+    time_filter = 10 * write_period
+    rtps_benchmark_suite[f'Test_TimeBasedFilterTiming_{write_period}'] = {
+        'apps' : [f'-P -t Square -r -k 0 -z 0 --write-period {write_period}',
+                  f'-S -t Square -r -k 0 --time-filter {time_filter} --read-period {write_period}'],
+        'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'check_function' : tsf.test_time_based_filter_timestamps,
+        'metrics_function' : tbf.time_based_filter_metrics,
+        'title' : f'TIME_BASED_FILTER of {time_filter}ms measured with time stamps',
+        'description' : 'Measures the interval of the TIME_BASED_FILTER QoS\n\n'
+                        ' * Configures the publisher / subscriber with a RELIABLE reliability\n'
+                        ' * Configures the publisher / subscriber with history KEEP_ALL\n'
+                        f' * Configures the publisher with a writing period of {write_period}ms\n'
+                        f' * Configures the subscriber TIME_BASED_FILTER to {time_filter}ms\n'
+                        f' * Configures the subscriber with a reading period of {write_period}ms\n'
+                        ' * The publisher application sends samples with increasing value of the "size" member\n\n'
+                        'The test passes if the time between the writing of consecutive samples the '
+                            'subscriber receives, estimated from the time they are received, is not '
+                            'lower than the filter and, in average, not higher than the filter plus one '
+                            'write period. The subscriber has to read '
+                            f'{tsf.MAX_SAMPLES_READ/10} samples\n'
+    }
+
+    lifespan = int(2.5 * write_period)
+    rtps_benchmark_suite[f'Test_LifespanTiming_{write_period}'] = {
+        'apps' : [f'-P -t Square -r -k 0 -z 0 --write-period {write_period} --lifespan {lifespan}',
+                  f'-S -t Square -r -k 0 --read-period {5 * write_period}'],
+        'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'check_function' : tsf.test_lifespan_timestamps,
+        'metrics_function' : tbf.lifespan_metrics,
+        'title' : f'LIFESPAN of {lifespan}ms measured with time stamps',
+        'description' : 'Measures the age of the samples received with LIFESPAN QoS\n\n'
+                        ' * Configures the publisher / subscriber with a RELIABLE reliability\n'
+                        ' * Configures the publisher / subscriber with history KEEP_ALL\n'
+                        f' * Configures the publisher with a writing period of {write_period}ms\n'
+                        f' * Configures the publisher with a lifespan of {lifespan}ms\n'
+                        f' * Configures the subscriber with a reading period of {5 * write_period}ms\n'
+                        ' * The publisher application sends samples with increasing value of the "size" member\n\n'
+                        'The test passes if every sample the subscriber receives is younger than the '
+                            'lifespan and every sample it does not receive is older than the lifespan '
+                            'when the next one is received, with a tolerance of half the write period. '
+                            'The ages are estimated from the time the samples are received. The '
+                            f'subscriber has to read {tsf.MAX_SAMPLES_READ/10} samples\n'
+    }
+
+# COHERENT SETS: coherent sets of many topics and instances with TOPIC and
+# GROUP presentation
+for access_scope, scope_name in (('t', 'TOPIC'), ('g', 'GROUP')):
+    num_samples = COHERENT_SETS_TOPICS * COHERENT_SETS_INSTANCES * 3
+    rtps_benchmark_suite[f'Test_CoherentSetsScale_{scope_name}'] = {
+        'apps' : [f'-P -t Square -r -k 0 --coherent --access-scope {access_scope} '
+                        f'--num-topics {COHERENT_SETS_TOPICS} --num-instances {COHERENT_SETS_INSTANCES} '
+                        '--coherent-sample-count 3 --write-period 100 -z 0',
+                  f'-S -t Square -r -k 0 --coherent --access-scope {access_scope} '
+                        f'--num-topics {COHERENT_SETS_TOPICS} --take-read --read-period 100'],
+        'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'check_function' : tsf.coherent_sets_w_instances,
+        'title' : f'Coherent sets of {COHERENT_SETS_TOPICS} topics and '
+                        f'{COHERENT_SETS_INSTANCES} instances with {scope_name}_PRESENTATION',
+        'description' : 'Verifies the coherent sets are received complete when they contain many '
+                            'topics and instances\n\n'
+                        ' * Configures the publisher / subscriber with a RELIABLE reliability\n'
+                        ' * Configures the publisher / subscriber with history KEEP_ALL\n'
+                        ' * Configures the publisher / subscriber with coherent access\n'
+                        f' * Configures the publisher / subscriber with access scope {scope_name}_PRESENTATION\n'
+                        f' * Configures the publisher / subscriber to use {COHERENT_SETS_TOPICS} topics\n'
+                        f' * The publisher publishes {COHERENT_SETS_INSTANCES} different instances (using the same data value)\n'
+                        ' * The publisher creates coherent sets of 3 consecutive samples each instance\n'
+                        ' * The publisher application sends samples with increasing value of the "size" member\n'
+                        ' * Configures the publisher with a writing period of 100ms\n'
+                        ' * Configures the subscriber to use take() instead of take_next_instance()\n'
+                        ' * Configures the subscriber with a reading period of 100ms\n\n'
+                        'The test passes if every time the subscriber reads it receives one complete '
+                            f'coherent set of {num_samples} samples. The subscriber has to read '
+                            f'{tsf.MAX_SAMPLES_READ/5} samples of the first instance\n'
+    }
+
+# LATE JOINER: a TRANSIENT_LOCAL Subscriber joins once the Publisher filled
+# its KEEP_LAST history
+for depth in LATE_JOINER_DEPTHS:
+    fill_time = depth * LATE_JOINER_WRITE_PERIOD / 1000
+    # twice the time the Publisher needs to fill the history
+    startup_delay = max(1, 2 * fill_time + 1)
+    rtps_benchmark_suite[f'Test_LateJoiner_{depth}'] = {
+        'apps' : [f'-P -t Square -r -k {depth} -D l -z 0 --num-instances {LATE_JOINER_INSTANCES} '
+                        f'--write-period {LATE_JOINER_WRITE_PERIOD}',
+                  f'-S -t Square -r -k {depth} -D l --read-period {LATE_JOINER_READ_PERIOD}'],
+        'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'check_function' : tsf.late_joiner_history_validator(depth,
+                LATE_JOINER_INSTANCES),
+        'metrics_function' : tbf.late_joiner_metrics,
+        # only the Subscriber waits for the Publisher to fill its history
+        'startup_delay' : [1, startup_delay],
+        # the Publisher waits for the Subscriber during the startup_delay
+        'match_timeout' : startup_delay + 15,
+        'title' : f'Late joiner receiving a history of depth {depth}',
+        'description' : 'Measures how long a late-joining subscriber needs to receive the history '
+                            'of the publisher\n\n'
+                        ' * Configures the publisher / subscriber with a RELIABLE reliability\n'
+                        ' * Configures the publisher / subscriber with TRANSIENT_LOCAL durability\n'
+                        f' * Configures the publisher / subscriber with history KEEP_LAST {depth}\n'
+                        f' * The publisher publishes {LATE_JOINER_INSTANCES} different instances (using the same data value)\n'
+                        f' * Configures the publisher with a writing period of {LATE_JOINER_WRITE_PERIOD}ms\n'
+                        f' * Configures the subscriber with a reading period of {LATE_JOINER_READ_PERIOD}ms\n'
+                        ' * The publisher application sends samples with increasing value of the "size" member\n'
+                        ' * The subscriber is run once the publisher filled its history\n\n'
+                        f'The test passes if the subscriber receives exactly {depth} consecutive samples of '
+                            'every instance, followed by the next sample the publisher writes. '
+                            'The metrics are the time the subscriber needs to receive the history of all the '
+                            'instances (since it is run and since it matches the publisher), whether the '
+                            'history was complete and the samples per second of the history\n'
+    }
+
+# BACKPRESSURE: a RELIABLE KEEP_ALL Subscriber reading slower than the
+# Publisher writes, as in Test_History_0 of test_suite.py
+for ratio in BACKPRESSURE_RATIOS:
+    read_period = ratio * BACKPRESSURE_WRITE_PERIOD
+    rtps_benchmark_suite[f'Test_Backpressure_{ratio}'] = {
+        'apps' : [f'-P -t Square -r -k 0 -w -z 0 --write-period {BACKPRESSURE_WRITE_PERIOD}',
+                  f'-S -t Square -r -k 0 --read-period {read_period}'],
+        'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'check_function' : tsf.test_reliability_no_losses_w_instances,
+        'metrics_function' : tbf.backpressure_metrics,
+        'resource_period' : 0.1,
+        'title' : f'Backpressure of a subscriber reading {ratio} times slower than the publisher writes',
+        'description' : 'Measures how the publisher is throttled and how much memory the applications '
+                            'use when the subscriber reads slower than the publisher writes\n\n'
+                        ' * Configures the publisher / subscriber with a RELIABLE reliability\n'
+                        ' * Configures the publisher / subscriber with history KEEP_ALL\n'
+                        f' * Configures the publisher with a writing period of {BACKPRESSURE_WRITE_PERIOD}ms\n'
+                        f' * Configures the subscriber with a reading period of {read_period}ms\n'
+                        ' * The publisher application sends samples with increasing value of the "size" member\n\n'
+                        f'The test passes if the subscriber receives {tsf.MAX_SAMPLES_READ} samples in order '
+                            'without losses. The metrics are the rate the publisher writes at, the rate the '
+                            'subscriber receives at and the resident set size of both applications over time\n'
+    }
+
+# CONTENT FILTERED TOPIC THROUGHPUT: many instances filtered with different
+# selectivities, as in Test_Cft_1 of test_suite.py
+for selectivity in CFT_SELECTIVITIES:
+    # about the same reading time for all the selectivities
+    max_samples = tsf.MAX_SAMPLES_READ * CFT_INSTANCES * selectivity // 100
+    rtps_benchmark_suite[f'Test_CftThroughput_{selectivity}'] = {
+        'apps' : [f'-P -t Square -r -k 0 -w -z 0 --size-modulo 100 --num-instances {CFT_INSTANCES} '
+                        f'--write-period {CFT_WRITE_PERIOD}',
+                  f'-S -t Square -r -k 0 --cft "shapesize <= {selectivity}"'],
+        'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'check_function' : tsf.cft_size_filter_validator(selectivity, max_samples),
+        'metrics_function' : tbf.cft_metrics,
+        'resource_period' : 0.1,
+        'title' : f'Throughput of a ContentFilteredTopic selecting {selectivity}% of the samples',
+        'description' : 'Measures the samples delivered and the CPU used with a ContentFilteredTopic '
+                            'with a given selectivity\n\n'
+                        ' * Configures the publisher / subscriber with a RELIABLE reliability\n'
+                        ' * Configures the publisher / subscriber with history KEEP_ALL\n'
+                        f' * The publisher publishes {CFT_INSTANCES} different instances (using the same data value)\n'
+                        f' * Configures the publisher with a writing period of {CFT_WRITE_PERIOD}ms\n'
+                        ' * Publisher sends samples with size cycling from 1 to 100 (using --size-modulo 100 and -z 0)\n'
+                        f' * Subscriber uses --cft "shapesize <= {selectivity}"\n\n'
+                        f'The test passes if the subscriber receives {max_samples} samples (of any instance) '
+                            f'with size <= {selectivity}. The metrics are the rate the publisher writes at, the '
+                            'rate the subscriber receives at and the CPU both applications use. The CPU the '
+                            'subscriber uses per sample written shows whether the filter is applied by the '
+                            'publisher (it decreases with the selectivity) or by the subscriber\n'
+    }
+
+# DISCOVERY CHURN: one Publisher while groups of Subscribers are run and
+# stopped
+for group_size in CHURN_GROUP_SIZES:
+    num_subscribers = group_size * CHURN_CYCLES
+    # the first Subscriber of every group is run CHURN_PERIOD seconds after
+    # the first Subscriber of the previous one
+    startup_delay = [1]
+    for cycle in range(CHURN_CYCLES):
+        startup_delay += [CHURN_PERIOD - 0.1 * (group_size - 1)] + [0.1] * (group_size - 1)
+    rtps_benchmark_suite[f'Test_DiscoveryChurn_{group_size}'] = {
+        'apps' : ['-P -t Square -r -k 1 -z 0']
+                + ['-S -t Square -r -k 1'] * num_subscribers,
+        'expected_codes' : [ReturnCode.OK] * (num_subscribers + 1),
+        'metrics_function' : tbf.discovery_churn_metrics,
+        'startup_delay' : startup_delay,
+        'stop_after' : {i: CHURN_ALIVE for i in range(1, num_subscribers + 1)},
+        'resource_period' : 0.5,
+        'title' : f'Discovery churn of {group_size} subscriber(s) joining and leaving '
+                        f'{CHURN_CYCLES} times',
+        'description' : 'Measures how fast a publisher matches and unmatches subscribers that are '
+                            'continuously run and stopped\n\n'
+                        ' * Configures the publisher / subscribers with a RELIABLE reliability\n'
+                        ' * Configures the publisher / subscribers with history KEEP_LAST 1\n'
+                        f' * Every {CHURN_PERIOD} seconds, {group_size} subscriber(s) are run\n'
+                        f' * Every subscriber is stopped {CHURN_ALIVE} seconds after it is run\n'
+                        f' * The publisher keeps running during the {CHURN_CYCLES} cycles\n\n'
+                        'The test passes if every subscriber receives samples. The metrics are, for every '
+                            'cycle, the time until the publisher matches the subscribers, the time until it '
+                            'detects they are gone (on_publication_matched() notifications) and its resident '
+                            'set size\n'
+    }
+
+# THROUGHPUT: one RELIABLE KEEP_ALL Publisher writing as fast as it can and
+# a Subscriber printing summaries instead of the samples
+for payload_size in THROUGHPUT_PAYLOAD_SIZES:
+    rtps_benchmark_suite[f'Test_Throughput_{payload_size}'] = {
+        'apps' : [f'-P -t Square -r -k 0 -z 0 --write-period 0 '
+                        f'--additional-payload-size {payload_size}',
+                  f'-S -t Square -r -k 0 --read-period 10 '
+                        f'--stats-interval {THROUGHPUT_STATS_INTERVAL}'],
+        'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'check_function' : tsf.stats_validator(THROUGHPUT_STATS),
+        'metrics_function' : tbf.throughput_metrics,
+        'resource_period' : 0.1,
+        'title' : f'Throughput with an additional payload of {payload_size} bytes',
+        'description' : 'Measures the samples and bytes per second a subscriber receives, from the '
+                            'summaries it prints instead of the samples\n\n'
+                        ' * Configures the publisher / subscriber with a RELIABLE reliability\n'
+                        ' * Configures the publisher / subscriber with history KEEP_ALL\n'
+                        ' * Configures the publisher with a writing period of 0 (it writes as fast as it can) '
+                            f'and an additional payload of {payload_size} bytes\n'
+                        ' * The publisher application sends samples with increasing value of the "size" member\n'
+                        f' * The subscriber prints a summary every {THROUGHPUT_STATS_INTERVAL}ms '
+                            '(option --stats-interval)\n\n'
+                        f'The test passes if the subscriber receives samples in {THROUGHPUT_STATS} summaries '
+                            'without gaps or duplicates. The metrics are the samples and bytes per second '
+                            'of every instance and the resources of both applications\n'
+    }
+
+# BURST THROUGHPUT: as THROUGHPUT, with the Publisher writing bursts of
+# samples back to back
+for burst in THROUGHPUT_BURSTS:
+    rtps_benchmark_suite[f'Test_ThroughputBurst_{burst}'] = {
+        'apps' : [f'-P -t Square -r -k 0 -z 0 --burst {burst} '
+                        f'--write-period-us {THROUGHPUT_BURST_PERIOD} '
+                        f'--additional-payload-size {THROUGHPUT_BURST_PAYLOAD_SIZE}',
+                  f'-S -t Square -r -k 0 --read-period 10 '
+                        f'--stats-interval {THROUGHPUT_STATS_INTERVAL}'],
+        'expected_codes' : [ReturnCode.OK, ReturnCode.OK],
+        'check_function' : tsf.stats_validator(THROUGHPUT_STATS),
+        'metrics_function' : tbf.throughput_metrics,
+        'resource_period' : 0.1,
+        'title' : f'Throughput of bursts of {burst} samples',
+        'description' : 'Measures the samples and bytes per second a subscriber receives when the '
+                            'publisher writes bursts of samples back to back\n\n'
+                        ' * Configures the publisher / subscriber with a RELIABLE reliability\n'
+                        ' * Configures the publisher / subscriber with history KEEP_ALL\n'
+                        f' * Configures the publisher to write bursts of {burst} samples every '
+                            f'{THROUGHPUT_BURST_PERIOD}us (options --burst and --write-period-us) with an '
+                            f'additional payload of {THROUGHPUT_BURST_PAYLOAD_SIZE} bytes\n'
+                        ' * The publisher application sends samples with increasing value of the "size" member\n'
+                        f' * The subscriber prints a summary every {THROUGHPUT_STATS_INTERVAL}ms '
+                            '(option --stats-interval)\n\n'
+                        f'The test passes if the subscriber receives samples in {THROUGHPUT_STATS} summaries '
+                            'without gaps or duplicates. The metrics are the samples and bytes per second '
+                            'of every instance and the resources of both applications\n'
+    }
+
+# PARTICIPANT SCALING: P applications of the same topic discovering each
+# other
+for participants in PARTICIPANTS:
+    num_publishers = participants // 2
+    num_subscribers = participants - num_publishers
+    rtps_benchmark_suite[f'Test_ParticipantScaling_{participants}'] = {
+        'apps' : ['-P -t Square -r -k 1'] * num_publishers
+                + ['-S -t Square -r -k 1'] * num_subscribers,
+        'expected_codes' : [ReturnCode.OK] * participants,
+        'metrics_function' : tbf.participant_scaling_metrics,
+        'startup_delay' : 0.05,
+        'resource_period' : 0.1,
+        'title' : f'Discovery of {participants} participants',
+        'description' : 'Measures how long the participants of a domain need to discover each '
+                            'other and the CPU they use\n\n'
+                        f' * Runs {num_publishers} publishers (of the publisher product) and '
+                            f'{num_subscribers} subscribers (of the subscriber product) of the same topic\n'
+                        ' * Each application creates its own participant\n'
+                        ' * Configures the publishers / subscribers with a RELIABLE reliability\n'
+                        ' * Configures the publishers / subscribers with history KEEP_LAST 1\n\n'
+                        'The test passes if every subscriber receives samples. The metrics are the time '
+                            'until every publisher matched all the subscribers and every subscriber all the '
+                            'publishers, and the CPU time all the applications used until then\n'
+    }
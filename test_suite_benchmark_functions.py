@@ -0,0 +1,750 @@
+#################################################################
+# Use and redistribution is source and binary forms is permitted
+# subject to the OMG-DDS INTEROPERABILITY TESTING LICENSE found
+# at the following URL:
+#
+# https://github.com/omg-dds/dds-rtps/blob/master/LICENSE.md
+#
+#################################################################
+
+# Metrics functions of the benchmark Test Suite (test_suite_benchmark.py).
+#
+# A metrics function is called once the Test Case finishes with:
+#   * parameters: list of shape_main application parameters.
+#   * recordings: list of EntityRecording (rtps_recording.py) with the output
+#     of every shape_main application and the time each line was read.
+#   * entity_type: list of entity names (Publisher_1, Subscriber_1, etc).
+# It returns a dictionary with the metrics, which must be serializable to
+# JSON. Times are in ms and rates in samples per second.
+
+import re
+from array import array
+
+from rtps_test_utilities import shape_main_options, option_value, \
+    parse_stats
+from rtps_validators import parse_sample, filter_intervals, lifespan_ages
+from rtps_soak import linear_trend
+
+MATCHED_READERS_PATTERN = re.compile(
+    r'on_publication_matched\(\).*matched readers ([0-9]+)')
+MATCHED_WRITERS_PATTERN = re.compile(
+    r'on_subscription_matched\(\).*matched writers ([0-9]+)')
+
+def publisher_indices(parameters):
+    return [i for i, element in enumerate(parameters)
+            if '-P ' in element or element.endswith('-P')]
+
+def subscriber_indices(parameters):
+    return [i for i, element in enumerate(parameters)
+            if '-S ' in element or element.endswith('-S')]
+
+def sample_stamps(recording, until_mark='check_end'):
+    """
+    Returns an array('q') with the time (ns) at which every sample of the
+    recording was read. If the recording has the mark 'until_mark', only
+    the samples read before it are returned.
+    """
+    stamps = array('q')
+    end = recording.marks.get(until_mark)
+    for stamp, line in recording.complete_lines():
+        if end is not None and stamp > end:
+            break
+        if parse_sample(line) is not None:
+            stamps.append(stamp)
+    return stamps
+
+def sample_rate(stamps):
+    """ Samples per second between the first and the last stamp. """
+    if len(stamps) < 2 or stamps[-1] == stamps[0]:
+        return None
+    return (len(stamps) - 1) * 1e9 / (stamps[-1] - stamps[0])
+
+def time_matched(recording, pattern, count):
+    """
+    Returns the time (ns) at which the recording shows a line matching
+    'pattern' whose first group is at least 'count' (for example, the
+    number of matched readers), or None.
+    """
+    for stamp, line in recording.complete_lines():
+        match = pattern.search(line)
+        if match and int(match.group(1)) >= count:
+            return stamp
+    return None
+
+def _ms(time_ns):
+    return None if time_ns is None else time_ns / 1e6
+
+def fan_out_metrics(parameters, recordings, entity_type):
+    """
+    Metrics of a Publisher sending to N Subscribers:
+        subscribers: number of Subscribers.
+        time_to_all_matched_ms: time since the last Subscriber was run until
+            the Publisher matched all of them.
+        delivered_rate: samples per second each Subscriber received.
+        delivered_rate_min, delivered_rate_mean: over all Subscribers.
+    """
+    publishers = publisher_indices(parameters)
+    subscribers = subscriber_indices(parameters)
+
+    last_spawn = max(recordings[i].marks.get('spawn', 0) for i in subscribers)
+    all_matched = time_matched(recordings[publishers[0]],
+            MATCHED_READERS_PATTERN, len(subscribers))
+
+    rates = {}
+    for i in subscribers:
+        rates[entity_type[i]] = sample_rate(sample_stamps(recordings[i]))
+    valid_rates = [rate for rate in rates.values() if rate is not None]
+
+    return {
+        'subscribers': len(subscribers),
+        'time_to_all_matched_ms':
+            None if all_matched is None else _ms(all_matched - last_spawn),
+        'delivered_rate': rates,
+        'delivered_rate_min': min(valid_rates, default=None),
+        'delivered_rate_mean':
+            sum(valid_rates) / len(valid_rates) if valid_rates else None}
+
+def ownership_handover_metrics(parameters, recordings, entity_type):
+    """
+    Metrics of N Publishers with EXCLUSIVE ownership, each one sending a
+    different size, when the owner is stopped (Test Case key 'stop_after'):
+        writers: number of Publishers.
+        stopped: Publisher stopped.
+        handover_ms: for every Subscriber, time since the Publisher was
+            stopped until the Subscriber received the first sample of
+            another Publisher.
+        stale_samples: for every Subscriber, samples of the stopped
+            Publisher received after it was stopped.
+        handover_ms_max: over all Subscribers.
+    """
+    publishers = publisher_indices(parameters)
+    stopped = next((i for i in publishers
+            if 'stop_after' in recordings[i].marks), None)
+    metrics = {'writers': len(publishers)}
+    if stopped is None:
+        return metrics
+    stop_time = recordings[stopped].marks['stop_after']
+    stopped_size = int(option_value(shape_main_options(parameters[stopped]),
+            '-z', 20))
+
+    handover = {}
+    stale_samples = {}
+    for i in subscriber_indices(parameters):
+        handover[entity_type[i]] = None
+        stale_samples[entity_type[i]] = 0
+        end = recordings[i].marks.get('check_end')
+        for stamp, line in recordings[i].complete_lines():
+            if end is not None and stamp > end:
+                break
+            sample = parse_sample(line)
+            if sample is None or stamp < stop_time:
+                continue
+            if sample.size == stopped_size:
+                stale_samples[entity_type[i]] += 1
+            else:
+                handover[entity_type[i]] = _ms(stamp - stop_time)
+                break
+    valid_handover = [value for value in handover.values()
+            if value is not None]
+
+    metrics.update({
+        'stopped': entity_type[stopped],
+        'handover_ms': handover,
+        'stale_samples': stale_samples,
+        'handover_ms_max': max(valid_handover, default=None)})
+    return metrics
+
+DEADLINE_MISSED_PATTERN = re.compile(r'on_requested_deadline_missed\(\)')
+
+# Default write period (ms) of the shape_main applications
+DEFAULT_WRITE_PERIOD_MS = 33
+
+def write_period_ms(options):
+    """
+    Write period (ms) of the shape_main application options (list returned
+    by shape_main_options()): --write-period-us or --write-period.
+    """
+    period_us = option_value(options, '--write-period-us')
+    if period_us is not None:
+        return float(period_us) / 1000
+    return float(option_value(options, '--write-period',
+            DEFAULT_WRITE_PERIOD_MS))
+
+def _distribution(values):
+    """ Minimum, mean, 99th percentile and maximum of a list of values. """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        'min': ordered[0],
+        'mean': sum(ordered) / len(ordered),
+        'p99': ordered[min(len(ordered) - 1, (len(ordered) * 99) // 100)],
+        'max': ordered[-1]}
+
+def deadline_metrics(parameters, recordings, entity_type):
+    """
+    Metrics of the DEADLINE QoS of one Publisher (single instance) and
+    its Subscribers:
+        write_period_ms: write period of the Publisher.
+        For every Subscriber:
+            deadline_ms: DEADLINE period of the Subscriber (option -f).
+            interarrival_ms: min, mean, p99 and max of the time between
+                consecutive samples.
+            jitter_ms: min, mean, p99 and max of the difference between the
+                inter-arrival time and the write period.
+            deadline_misses: on_requested_deadline_missed() notifications.
+            deadline_margin_ms: deadline minus the maximum inter-arrival
+                time before the first notification (how close the samples
+                came to missing the deadline).
+    """
+    publisher = parameters[publisher_indices(parameters)[0]]
+    write_period = write_period_ms(shape_main_options(publisher))
+
+    subscribers = {}
+    for i in subscriber_indices(parameters):
+        deadline = option_value(shape_main_options(parameters[i]), '-f')
+        end = recordings[i].marks.get('check_end')
+        interarrival = []
+        before_miss = []
+        misses = 0
+        previous = None
+        for stamp, line in recordings[i].complete_lines():
+            if end is not None and stamp > end:
+                break
+            if DEADLINE_MISSED_PATTERN.search(line):
+                misses += 1
+                continue
+            if parse_sample(line) is None:
+                continue
+            if previous is not None:
+                interarrival.append(_ms(stamp - previous))
+                if misses == 0:
+                    before_miss.append(interarrival[-1])
+            previous = stamp
+
+        margin = None
+        if deadline is not None and before_miss:
+            margin = float(deadline) - max(before_miss)
+        subscribers[entity_type[i]] = {
+            'deadline_ms': None if deadline is None else float(deadline),
+            'interarrival_ms': _distribution(interarrival),
+            'jitter_ms': _distribution(
+                    [abs(value - write_period) for value in interarrival]),
+            'deadline_misses': misses,
+            'deadline_margin_ms': margin}
+
+    return {'write_period_ms': write_period, 'subscribers': subscribers}
+
+def instance_points(recording, until_mark='check_end'):
+    """
+    Returns a dictionary '<topic> <instance>' -> list of (size, stamp) of
+    the samples of the recording read before the mark 'until_mark'.
+    """
+    points = {}
+    end = recording.marks.get(until_mark)
+    for stamp, line in recording.complete_lines():
+        if end is not None and stamp > end:
+            break
+        sample = parse_sample(line)
+        if sample is not None:
+            points.setdefault(f'{sample.topic} {sample.instance}', []).append(
+                    (sample.size, stamp))
+    return points
+
+def _ms_distribution(values):
+    return _distribution([_ms(value) for value in values])
+
+def time_based_filter_metrics(parameters, recordings, entity_type):
+    """
+    Metrics of the TIME_BASED_FILTER of the Subscribers, for every instance
+    (see rtps_validators.filter_intervals):
+        write_period_ms: write period measured.
+        filter_interval_ms: min, mean, p99 and max of the time between the
+            writing of consecutive samples received.
+    """
+    metrics = {}
+    for i in subscriber_indices(parameters):
+        for name, points in instance_points(recordings[i]).items():
+            measured = filter_intervals(points)
+            if measured is None:
+                continue
+            period, intervals = measured
+            metrics[f'{entity_type[i]} {name}'] = {
+                'write_period_ms': _ms(period),
+                'filter_interval_ms': _ms_distribution(intervals)}
+    return metrics
+
+def lifespan_metrics(parameters, recordings, entity_type):
+    """
+    Metrics of the LIFESPAN of the samples received by the Subscribers, for
+    every instance (see rtps_validators.lifespan_ages):
+        write_period_ms: write period measured.
+        age_received_ms: min, mean, p99 and max of the age of the samples
+            when they were received.
+        age_expired_ms: min, mean, p99 and max of the age of the samples
+            not received when the next one was received.
+    """
+    metrics = {}
+    for i in subscriber_indices(parameters):
+        for name, points in instance_points(recordings[i]).items():
+            measured = lifespan_ages(points)
+            if measured is None:
+                continue
+            period, ages, missing_ages = measured
+            metrics[f'{entity_type[i]} {name}'] = {
+                'write_period_ms': _ms(period),
+                'age_received_ms': _ms_distribution(ages),
+                'age_expired_ms': _ms_distribution(missing_ages)}
+    return metrics
+
+def late_joiner_metrics(parameters, recordings, entity_type):
+    """
+    Metrics of Subscribers that join once the Publisher filled its
+    KEEP_LAST history (depth: subscriber option -k) of several instances
+    (publisher option --num-instances). The first 'depth' samples received
+    of every instance are its history. For every Subscriber:
+        history_samples: samples of the history received.
+        history_complete: every instance received 'depth' consecutive
+            samples.
+        catch_up_ms: time since the Subscriber was run until it received
+            the history of all the instances.
+        catch_up_from_match_ms: the same time since the Subscriber matched
+            the Publisher.
+        replay_rate: samples per second of the history, since the first
+            sample until the history of all the instances was received.
+    """
+    publisher = shape_main_options(parameters[publisher_indices(parameters)[0]])
+    num_instances = int(option_value(publisher, '--num-instances', 1))
+
+    subscribers = {}
+    for i in subscriber_indices(parameters):
+        depth = int(option_value(shape_main_options(parameters[i]), '-k', 1))
+        recording = recordings[i]
+        history_samples = 0
+        complete = True
+        first_stamp = None
+        history_end = None
+        points = instance_points(recording)
+        for samples in points.values():
+            history = samples[:depth]
+            history_samples += len(history)
+            if (len(history) < depth
+                    or history[-1][0] - history[0][0] != depth - 1):
+                complete = False
+            if history:
+                if first_stamp is None or history[0][1] < first_stamp:
+                    first_stamp = history[0][1]
+                if history_end is None or history[-1][1] > history_end:
+                    history_end = history[-1][1]
+        if len(points) < num_instances:
+            complete = False
+
+        matched = time_matched(recording, MATCHED_WRITERS_PATTERN, 1)
+        metrics = {
+            'history_samples': history_samples,
+            'history_complete': complete,
+            'catch_up_ms': None,
+            'catch_up_from_match_ms': None,
+            'replay_rate': None}
+        if complete:
+            metrics['catch_up_ms'] = _ms(
+                    history_end - recording.marks.get('spawn', first_stamp))
+            if matched is not None:
+                metrics['catch_up_from_match_ms'] = _ms(history_end - matched)
+            if history_end > first_stamp:
+                metrics['replay_rate'] = \
+                        history_samples * 1e9 / (history_end - first_stamp)
+        subscribers[entity_type[i]] = metrics
+
+    return {'instances': num_instances, 'subscribers': subscribers}
+
+def resource_usage(recording, since=None):
+    """
+    Summary of the resources a shape_main application used (recording
+    usage, see rtps_resources.py), or None if they were not sampled.
+    The growth and the rates are measured since the first usage sample
+    taken after 'since' (ns), for example when the application started
+    sending or receiving samples, so the start-up is not included:
+        rss_kb: resident set size (KiB) at 'since', the maximum one and the
+            last one.
+        rss_growth_kb_per_s: RSS growth per second since 'since'.
+        rss_kb_over_time: list of [ms since the application was run, RSS].
+        cpu_ms: CPU time (user + system) the application used.
+        cpu_percent: CPU time per wall time since 'since' (100 is one core).
+    """
+    if not recording.usage:
+        return None
+    spawn = recording.marks.get('spawn', recording.usage[0][0])
+    first_stamp, first_rss, first_cpu, _ = next(
+            (usage for usage in recording.usage
+                if since is None or usage[0] >= since),
+            recording.usage[-1])
+    last_stamp, last_rss, last_cpu, _ = recording.usage[-1]
+    elapsed = last_stamp - first_stamp
+    return {
+        'rss_kb': {
+            'start': first_rss,
+            'max': max(usage[1] for usage in recording.usage),
+            'end': last_rss},
+        'rss_growth_kb_per_s':
+            (last_rss - first_rss) * 1e9 / elapsed if elapsed else None,
+        'rss_kb_over_time': [[round(_ms(usage[0] - spawn)), usage[1]]
+                for usage in recording.usage],
+        'cpu_ms': last_cpu,
+        'cpu_percent':
+            (last_cpu - first_cpu) * 1e8 / elapsed if elapsed else None}
+
+def backpressure_metrics(parameters, recordings, entity_type):
+    """
+    Metrics of a RELIABLE KEEP_ALL Publisher writing faster than its
+    Subscribers read (options --write-period and --read-period):
+        write_period_ms, read_period_ms: of the first Publisher and the
+            first Subscriber.
+        read_write_ratio: read period / write period.
+        For every Publisher:
+            write_rate: samples per second the Publisher wrote (printed
+                with option -w) until it was stopped.
+            write_rate_ratio: write_rate / the rate of the write period
+                (less than 1 if the Publisher is throttled).
+            resources: see resource_usage(), since the first sample written.
+        For every Subscriber:
+            delivered_rate: samples per second the Subscriber received.
+            resources: see resource_usage(), since the first sample received.
+    """
+    publishers = publisher_indices(parameters)
+    subscribers = subscriber_indices(parameters)
+    write_period = write_period_ms(shape_main_options(
+            parameters[publishers[0]]))
+    read_period = float(option_value(shape_main_options(
+            parameters[subscribers[0]]), '--read-period', 100))
+
+    publisher_metrics = {}
+    for i in publishers:
+        stamps = sample_stamps(recordings[i], until_mark='stop')
+        rate = sample_rate(stamps)
+        publisher_metrics[entity_type[i]] = {
+            'write_rate': rate,
+            'write_rate_ratio':
+                None if rate is None else rate * write_period / 1000,
+            'resources': resource_usage(recordings[i],
+                    stamps[0] if stamps else None)}
+    subscriber_metrics = {}
+    for i in subscribers:
+        stamps = sample_stamps(recordings[i])
+        subscriber_metrics[entity_type[i]] = {
+            'delivered_rate': sample_rate(stamps),
+            'resources': resource_usage(recordings[i],
+                    stamps[0] if stamps else None)}
+
+    return {
+        'write_period_ms': write_period,
+        'read_period_ms': read_period,
+        'read_write_ratio': read_period / write_period,
+        'publishers': publisher_metrics,
+        'subscribers': subscriber_metrics}
+
+def instance_stats(recording, until_mark='check_end'):
+    """
+    Returns a dictionary (topic, instance) -> list of the summaries printed
+    with --stats-interval (see rtps_test_utilities.parse_stats()). If the
+    recording has the mark 'until_mark', only the summaries read before it
+    are returned.
+    """
+    stats = {}
+    end = recording.marks.get(until_mark)
+    for stamp, line in recording.complete_lines():
+        if end is not None and stamp > end:
+            break
+        summary = parse_stats(line)
+        if summary is not None:
+            stats.setdefault((summary['topic'], summary['instance']),
+                    []).append(summary)
+    return stats
+
+def throughput_metrics(parameters, recordings, entity_type):
+    """
+    Metrics of Subscribers run with --stats-interval, computed from the
+    summaries they print instead of the samples:
+        write_period_ms, write_burst: of the first Publisher (options
+            --write-period or --write-period-us, and --burst). A write
+            period of 0 is the maximum rate.
+        For every Subscriber:
+            instances: for every '<topic> <instance>':
+                intervals: number of summaries.
+                samples, bytes: received in all the intervals.
+                samples_per_s, bytes_per_s: samples and bytes / the time
+                    of all the intervals.
+                max_samples_per_s: of the interval with the highest rate.
+                gaps, duplicates: of the last summary (they are totals).
+                min_seq, max_seq: of all the intervals.
+            resources: see resource_usage(), since the first summary.
+        For every Publisher:
+            resources: see resource_usage().
+    """
+    subscriber_metrics = {}
+    for i in subscriber_indices(parameters):
+        instances = {}
+        for (topic, instance), summaries in \
+                instance_stats(recordings[i]).items():
+            elapsed_ns = sum(summary['interval_ns'] for summary in summaries)
+            samples = sum(summary['samples'] for summary in summaries)
+            size = sum(summary['bytes'] for summary in summaries)
+            received = [summary for summary in summaries
+                    if summary['samples'] > 0]
+            instances[f'{topic} {instance}'] = {
+                'intervals': len(summaries),
+                'samples': samples,
+                'bytes': size,
+                'samples_per_s':
+                    samples * 1e9 / elapsed_ns if elapsed_ns else None,
+                'bytes_per_s': size * 1e9 / elapsed_ns if elapsed_ns else None,
+                'max_samples_per_s':
+                    max(summary['samples_per_s'] for summary in summaries),
+                'gaps': summaries[-1]['gaps'],
+                'duplicates': summaries[-1]['duplicates'],
+                'min_seq': min((summary['min_seq'] for summary in received),
+                    default=None),
+                'max_seq': max((summary['max_seq'] for summary in received),
+                    default=None)}
+        first = next((stamp for stamp, line in recordings[i].complete_lines()
+                if parse_stats(line) is not None), None)
+        subscriber_metrics[entity_type[i]] = {
+            'instances': instances,
+            'resources': resource_usage(recordings[i], first)}
+    publisher_metrics = {}
+    for i in publisher_indices(parameters):
+        publisher_metrics[entity_type[i]] = {
+            'resources': resource_usage(recordings[i])}
+
+    publisher = shape_main_options(parameters[publisher_indices(parameters)[0]])
+    return {
+        'write_period_ms': write_period_ms(publisher),
+        'write_burst': int(option_value(publisher, '--burst', 1)),
+        'publishers': publisher_metrics,
+        'subscribers': subscriber_metrics}
+
+CFT_SIZE_FILTER_PATTERN = re.compile(r'shapesize\s*<=\s*([0-9]+)')
+
+def cft_metrics(parameters, recordings, entity_type):
+    """
+    Metrics of a Publisher sending sizes cycling from 1 to --size-modulo
+    (printed with option -w) to Subscribers with a ContentFilteredTopic
+    "shapesize <= N" (option --cft):
+        write_rate: samples per second the Publisher wrote.
+        publisher_cpu_percent: CPU the Publisher used (100 is one core).
+        For every Subscriber:
+            selectivity: fraction of the samples that pass the filter.
+            delivered_rate: samples per second the Subscriber received.
+            delivered_ratio: delivered_rate / write_rate (it should be the
+                selectivity).
+            cpu_percent: CPU the Subscriber used.
+            cpu_us_per_written_sample: CPU time the Subscriber used per
+                sample the Publisher wrote. If the filter is applied by
+                the Publisher, it decreases with the selectivity. If it is
+                applied by the Subscriber (every sample is sent to it), it
+                hardly changes.
+    The CPU is measured since the first sample written or received (see
+    resource_usage()).
+    """
+    publisher = publisher_indices(parameters)[0]
+    size_modulo = option_value(shape_main_options(parameters[publisher]),
+            '--size-modulo')
+    written = sample_stamps(recordings[publisher], until_mark='stop')
+    write_rate = sample_rate(written)
+    publisher_usage = resource_usage(recordings[publisher],
+            written[0] if written else None)
+
+    subscribers = {}
+    for i in subscriber_indices(parameters):
+        expression = option_value(shape_main_options(parameters[i]), '--cft')
+        match = CFT_SIZE_FILTER_PATTERN.search(expression or '')
+        selectivity = None
+        if match and size_modulo is not None:
+            selectivity = min(1.0, int(match.group(1)) / int(size_modulo))
+        stamps = sample_stamps(recordings[i])
+        delivered_rate = sample_rate(stamps)
+        usage = resource_usage(recordings[i], stamps[0] if stamps else None)
+        cpu_percent = None if usage is None else usage['cpu_percent']
+        subscribers[entity_type[i]] = {
+            'selectivity': selectivity,
+            'delivered_rate': delivered_rate,
+            'delivered_ratio': None if None in (delivered_rate, write_rate)
+                else delivered_rate / write_rate,
+            'cpu_percent': cpu_percent,
+            'cpu_us_per_written_sample':
+                None if None in (cpu_percent, write_rate)
+                else cpu_percent * 1e4 / write_rate}
+
+    return {
+        'write_rate': write_rate,
+        'publisher_cpu_percent':
+            None if publisher_usage is None else publisher_usage['cpu_percent'],
+        'subscribers': subscribers}
+
+def matched_counts(recording, pattern):
+    """
+    Returns the list of (stamp, count) of the lines of the recording that
+    match 'pattern', whose first group is the number of matched entities
+    (for example MATCHED_READERS_PATTERN).
+    """
+    counts = []
+    for stamp, line in recording.complete_lines():
+        match = pattern.search(line)
+        if match:
+            counts.append((stamp, int(match.group(1))))
+    return counts
+
+def churn_cycles(recordings, subscribers):
+    """
+    Splits the Subscribers (indices of 'recordings') in cycles: a
+    Subscriber run after all the Subscribers of the current cycle were
+    stopped starts a new cycle.
+    """
+    cycles = []
+    last_stop = None
+    for i in sorted(subscribers, key=lambda i: recordings[i].marks['spawn']):
+        marks = recordings[i].marks
+        if last_stop is None or marks['spawn'] > last_stop:
+            cycles.append([])
+            last_stop = None
+        cycles[-1].append(i)
+        stop = marks.get('stop', marks.get('eof'))
+        if stop is not None and (last_stop is None or stop > last_stop):
+            last_stop = stop
+    return cycles
+
+def discovery_churn_metrics(parameters, recordings, entity_type):
+    """
+    Metrics of a Publisher while groups of Subscribers are run and stopped
+    (Test Case key 'stop_after') for several cycles. For every cycle:
+        subscribers: Subscribers run in the cycle.
+        match_ms: time since the last Subscriber of the cycle was run until
+            the Publisher matched all of them (on_publication_matched()).
+        reader_match_ms: maximum time since a Subscriber was run until it
+            matched the Publisher (on_subscription_matched()).
+        unmatch_ms: time since the last Subscriber of the cycle was stopped
+            until the Publisher detected it had no matched readers (None if
+            it did not detect it before the next cycle).
+        publisher_rss_kb: resident set size of the Publisher at the end of
+            the cycle (Test Case key 'resource_period').
+    And over all the cycles:
+        match_ms, unmatch_ms: min, mean, p99 and max.
+        unmatch_not_detected: cycles whose unmatch_ms is None.
+        publisher_rss_growth_kb_per_cycle: least-squares slope of
+            publisher_rss_kb over the cycles.
+    """
+    publisher = recordings[publisher_indices(parameters)[0]]
+    publisher_counts = matched_counts(publisher, MATCHED_READERS_PATTERN)
+    cycles = churn_cycles(recordings, subscriber_indices(parameters))
+
+    cycle_metrics = []
+    for number, cycle in enumerate(cycles):
+        spawns = [recordings[i].marks['spawn'] for i in cycle]
+        stops = [recordings[i].marks.get('stop', recordings[i].marks.get('eof'))
+                for i in cycle]
+        end = None
+        if number + 1 < len(cycles):
+            end = min(recordings[i].marks['spawn'] for i in cycles[number + 1])
+
+        matched = next((stamp for stamp, count in publisher_counts
+                if stamp >= min(spawns) and count >= len(cycle)), None)
+        unmatched = None
+        if None not in stops:
+            unmatched = next((stamp for stamp, count in publisher_counts
+                    if stamp >= max(stops) and count == 0
+                        and (end is None or stamp < end)), None)
+        reader_match = []
+        for i in cycle:
+            stamp = time_matched(recordings[i], MATCHED_WRITERS_PATTERN, 1)
+            if stamp is not None:
+                reader_match.append(_ms(stamp - recordings[i].marks['spawn']))
+        rss_kb = None
+        for usage in publisher.usage:
+            if end is not None and usage[0] >= end:
+                break
+            rss_kb = usage[1]
+
+        cycle_metrics.append({
+            'subscribers': [entity_type[i] for i in cycle],
+            'match_ms': None if matched is None
+                    else _ms(max(0, matched - max(spawns))),
+            'reader_match_ms': max(reader_match, default=None),
+            'unmatch_ms':
+                None if unmatched is None else _ms(unmatched - max(stops)),
+            'publisher_rss_kb': rss_kb})
+
+    match = [cycle['match_ms'] for cycle in cycle_metrics
+            if cycle['match_ms'] is not None]
+    unmatch = [cycle['unmatch_ms'] for cycle in cycle_metrics
+            if cycle['unmatch_ms'] is not None]
+    rss_growth = linear_trend([(number, cycle['publisher_rss_kb'])
+            for number, cycle in enumerate(cycle_metrics)
+            if cycle['publisher_rss_kb'] is not None])
+    return {
+        'cycles': cycle_metrics,
+        'match_ms': _distribution(match),
+        'unmatch_ms': _distribution(unmatch),
+        'unmatch_not_detected': len(cycle_metrics) - len(unmatch),
+        'publisher_rss_growth_kb_per_cycle': rss_growth}
+
+def participant_scaling_metrics(parameters, recordings, entity_type):
+    """
+    Metrics of P shape_main applications (participants) of the same topic
+    discovering each other. Every Publisher has to match all the
+    Subscribers and every Subscriber all the Publishers:
+        participants, publishers, subscribers: number of applications.
+        time_to_all_matched_ms: time since the first application was run
+            until every application printed all its matches.
+        time_to_all_matched_from_last_ms: the same time since the last
+            application was run.
+        entity_matched_ms: min, mean, p99 and max of the time since every
+            application was run until it printed all its matches.
+        not_matched: applications that did not print all their matches.
+        discovery_cpu_ms: CPU time of all the applications since they were
+            run until all of them were matched (Test Case key
+            'resource_period', the first resource sample taken afterwards).
+        discovery_cpu_percent: discovery_cpu_ms per wall time (100 is one
+            core).
+    """
+    publishers = publisher_indices(parameters)
+    subscribers = subscriber_indices(parameters)
+    spawns = [recording.marks['spawn'] for recording in recordings]
+
+    matched = {}
+    for i in publishers:
+        matched[i] = time_matched(recordings[i], MATCHED_READERS_PATTERN,
+                len(subscribers))
+    for i in subscribers:
+        matched[i] = time_matched(recordings[i], MATCHED_WRITERS_PATTERN,
+                len(publishers))
+    not_matched = [entity_type[i] for i, stamp in matched.items()
+            if stamp is None]
+
+    metrics = {
+        'participants': len(recordings),
+        'publishers': len(publishers),
+        'subscribers': len(subscribers),
+        'time_to_all_matched_ms': None,
+        'time_to_all_matched_from_last_ms': None,
+        'entity_matched_ms': _distribution([_ms(stamp - spawns[i])
+                for i, stamp in matched.items() if stamp is not None]),
+        'not_matched': not_matched,
+        'discovery_cpu_ms': None,
+        'discovery_cpu_percent': None}
+    if not_matched:
+        return metrics
+
+    all_matched = max(matched.values())
+    metrics['time_to_all_matched_ms'] = _ms(all_matched - min(spawns))
+    metrics['time_to_all_matched_from_last_ms'] = \
+            _ms(max(0, all_matched - max(spawns)))
+    if all(recording.usage for recording in recordings):
+        cpu_ms = 0
+        for recording in recordings:
+            cpu_ms += next((usage[2] for usage in recording.usage
+                    if usage[0] >= all_matched), recording.usage[-1][2])
+        metrics['discovery_cpu_ms'] = cpu_ms
+        if all_matched > min(spawns):
+            metrics['discovery_cpu_percent'] = \
+                    cpu_ms * 1e8 / (all_matched - min(spawns))
+    return metrics
@@ -7,7 +7,12 @@
 #
 #################################################################
 
-from rtps_test_utilities import ReturnCode, basic_check
+from rtps_test_utilities import ReturnCode, basic_check, \
+    shape_main_options, option_value, parse_stats, STATS_PATTERN
+from rtps_validators import SampleValidator, PerInstanceMonotonic, \
+    PerInstanceNoGaps, SourcePartitionedBySize, StrongestWriterOwns, \
+    TimeBasedFilterInterval, LifespanExpiry, CoherentSetDigest, SizeInRange, \
+    PerInstanceHistory
 import re
 import pexpect
 import queue
@@ -18,71 +23,86 @@ import time
 # is received in order, or that OWNERSHIP works properly, etc...
 MAX_SAMPLES_READ = 500
 
-def test_size_receivers(child_sub, samples_sent, last_sample_saved, timeout):
+# The checking functions with the attribute 'record_output' set (the ones
+# using a SampleValidator) also read the output of the applications run
+# with '--output-format jsonl', so the harness uses that format for their
+# Test Cases if it is run with --output-format jsonl (or auto).
+
+class InstanceState:
     """
-    This function is used by test cases that have two publishers and one
-    subscriber. This tests check how many samples are received by the
-    subscriber application with different sizes.
+    Per-instance bookkeeping used by the check functions that track several
+    instances. The check functions keep a dictionary that maps the instance
+    color to its InstanceState, so looking up the state of the instance of a
+    received sample is O(1) regardless of the number of instances.
+
+    seq_num: last sequence number (value of the "size" member) received.
+    first_iteration: True until the second sample of the instance is received.
+    ignore_first_sample: used by the check functions that may ignore the
+            first gap found in the instance.
+    consecutive_samples: number of consecutive samples received.
+    """
+    __slots__ = ('seq_num', 'first_iteration', 'ignore_first_sample',
+            'consecutive_samples')
+
+    def __init__(self, seq_num):
+        self.seq_num = seq_num
+        self.first_iteration = True
+        self.ignore_first_sample = True
+        # take into account the first sample
+        self.consecutive_samples = 1
+
+# This function is used by test cases that have two publishers and one
+# subscriber. This tests check how many samples are received by the
+# subscriber application with different sizes.
+test_size_receivers = SampleValidator(
+    SourcePartitionedBySize(),
+    name='test_size_receivers',
+    max_samples=MAX_SAMPLES_READ,
+    count_first_instance_only=False,
+    require_budget=False)
+
+def exclusive_writer_strengths(apps):
+    """
+    Returns a dictionary size -> ownership strength of the Publishers of
+    'apps' (list of shape_main application parameters) with EXCLUSIVE
+    ownership (option -s). Each Publisher must send a different size (-z,
+    20 by default).
+    """
+    strengths = {}
+    for element in apps:
+        options = shape_main_options(element)
+        if '-P' not in options:
+            continue
+        strength = int(option_value(options, '-s', -1))
+        if strength >= 0:
+            strengths[int(option_value(options, '-z', 20))] = strength
+    return strengths
+
+def test_ownership_handover(child_sub, samples_sent, last_sample_saved,
+        timeout, apps):
+    """
+    This function is used by test cases that have N publishers with
+    EXCLUSIVE ownership, each one with a different strength and size, and
+    one subscriber. Some publishers may be stopped while the subscriber is
+    reading (Test Case key 'stop_after'). It checks that the subscriber only
+    receives the samples of the strongest publisher alive (see
+    rtps_validators.StrongestWriterOwns).
 
     child_sub: child program generated with pexpect
     samples_sent: not used
     last_sample_saved: not used
     timeout: time pexpect waits until it matches a pattern.
+    apps: list of shape_main application parameters of the Test Case.
     """
-    basic_check_retcode = basic_check(child_sub, samples_sent, last_sample_saved, timeout)
-
-    if basic_check_retcode != ReturnCode.OK:
-        return basic_check_retcode
-
-    sub_string = re.search(r'\w\s+\w+\s+[0-9]+ [0-9]+ \[([0-9]+)\]',
-        child_sub.before + child_sub.after)
-    if sub_string is None:
-        return ReturnCode.DATA_NOT_RECEIVED
-
-    first_sample_size = int(sub_string.group(1))
-
-    max_samples_received = MAX_SAMPLES_READ
-    samples_read = 0
-    ignore_first_samples = True
-    retcode = ReturnCode.RECEIVING_FROM_ONE
-
-    while sub_string is not None and samples_read < max_samples_received:
-        current_sample_size = int(sub_string.group(1))
-
-        if current_sample_size != first_sample_size:
-            if ignore_first_samples:
-                # the first time we receive a different size, ignore it
-                # For example, if we receive samples of size 20, then only
-                # samples of size 30, we have to return RECEIVING_FROM_ONE.
-                # If after receiving samples of size 30, we receive samples of
-                # size 20 again, then we return RECEIVING_FROM_BOTH.
-                ignore_first_samples = False
-                first_sample_size = current_sample_size
-            else:
-                retcode = ReturnCode.RECEIVING_FROM_BOTH
-                break
-
-        index = child_sub.expect(
-            [
-                r'\[[0-9]+\]', # index = 0
-                pexpect.TIMEOUT, # index = 1
-                pexpect.EOF # index = 2
-            ],
-            timeout
-        )
-
-        if index == 1:
-            break
-        elif index == 2:
-            return ReturnCode.DATA_NOT_RECEIVED
-
-        samples_read += 1
-
-        sub_string = re.search(r'\w\s+\w+\s+[0-9]+ [0-9]+ \[([0-9]+)\]',
-            child_sub.before + child_sub.after)
+    validator = SampleValidator(
+        StrongestWriterOwns(exclusive_writer_strengths(apps)),
+        name='test_ownership_handover',
+        max_samples=MAX_SAMPLES_READ,
+        count_first_instance_only=False,
+        require_budget=False)
+    return validator(child_sub, samples_sent, last_sample_saved, timeout)
 
-    print(f'Samples read: {samples_read}')
-    return retcode
+test_ownership_handover.record_output = True
 
 def test_color_receivers(child_sub, samples_sent, last_sample_saved, timeout):
 
@@ -182,152 +202,91 @@ def test_size_less_than_20(child_sub, samples_sent, last_sample_saved, timeout):
     print(f'Samples read: {samples_read}')
     return return_code
 
-def test_order_w_instances(child_sub, samples_sent, last_sample_saved, timeout):
+def cft_size_filter_validator(max_size, max_samples):
     """
-    This function tests that the subscriber receives the samples in order
-    (for several instances)
-    child_sub: child program generated with pexpect
-    samples_sent: not used
-    last_sample_saved: not used
-    timeout: time pexpect waits until it matches a pattern.
+    Returns a checking function for a subscriber with the
+    ContentFilteredTopic "shapesize <= max_size": it checks all the samples
+    received (of any instance) pass the filter and reads 'max_samples'
+    samples.
     """
-
-    basic_check_retcode = basic_check(child_sub, samples_sent, last_sample_saved, timeout)
-
-    if basic_check_retcode != ReturnCode.OK:
-        return basic_check_retcode
-
-    produced_code = ReturnCode.DATA_NOT_RECEIVED
-
-    instance_color = []
-    instance_seq_num = []
-    first_iteration = []
-    samples_read_per_instance = 0
-    max_samples_received = MAX_SAMPLES_READ
-
-    while samples_read_per_instance < max_samples_received:
-        sub_string = re.search(r'\w+\s+(\w+)\s+[0-9]+\s+[0-9]+\s+\[([0-9]+)\]',
-            child_sub.before + child_sub.after)
-
-        if sub_string is not None:
-            # add a new instance to instance_color
-            if sub_string.group(1) not in instance_color:
-                instance_color.append(sub_string.group(1))
-                instance_seq_num.append(int(sub_string.group(2)))
-                first_iteration.append(True)
-
-            if sub_string.group(1) in instance_color:
-                index = instance_color.index(sub_string.group(1))
-                if first_iteration[index]:
-                    first_iteration[index] = False
-                else:
-                    # check that the next sequence number is the next value
-                    current_size = int(sub_string.group(2))
-                    if (current_size > instance_seq_num[index]):
-                        instance_seq_num[index] = current_size
-                    else:
-                        produced_code = ReturnCode.DATA_NOT_CORRECT
-                        break
-            else:
-                produced_code = ReturnCode.DATA_NOT_CORRECT
-                break
-
-        # Get the next sample the subscriber is receiving
-        index = child_sub.expect(
-            [
-                r'\[[0-9]+\]', # index = 0
-                r'Reading with ordered access.*?\n', # index = 1
-                pexpect.TIMEOUT, # index = 2
-                pexpect.EOF # index = 3
-            ],
-            timeout
-        )
-        if index == 0:
-            if sub_string is not None and sub_string.group(1) == instance_color[0]:
-                samples_read_per_instance += 1
-        elif index == 2:
-            # no more data to process
-            break
-        elif index == 3:
-            return ReturnCode.DATA_NOT_RECEIVED
-
-    if max_samples_received == samples_read_per_instance:
-        produced_code = ReturnCode.OK
-
-    print(f'Samples read per instance: {samples_read_per_instance}, instances: {instance_color}')
-    return produced_code
-
-def test_reliability_no_losses_w_instances(child_sub, samples_sent, last_sample_saved, timeout):
+    return SampleValidator(
+        SizeInRange(1, max_size),
+        name='test_cft_size_filter',
+        max_samples=max_samples,
+        count_first_instance_only=False)
+
+# This function tests that the subscriber receives the samples in order
+# (for several instances)
+test_order_w_instances = SampleValidator(
+    PerInstanceMonotonic(),
+    name='test_order_w_instances',
+    max_samples=MAX_SAMPLES_READ,
+    markers=['Reading with ordered access'])
+
+def late_joiner_history_validator(depth, num_instances):
     """
-    This function tests RELIABLE reliability, it checks whether the subscriber
-    receives the samples in order and with no losses (for several instances)
-    child_sub: child program generated with pexpect
-    samples_sent: not used
-    last_sample_saved: not used
-    timeout: time pexpect waits until it matches a pattern.
+    Returns a checking function for a subscriber that joins late and
+    receives the history (KEEP_LAST 'depth') of the 'num_instances'
+    instances of the publisher: every instance must receive exactly 'depth'
+    consecutive samples followed by the next sample written (see
+    PerInstanceHistory). The samples of all instances count for the budget,
+    which allows twice the samples needed.
     """
-
-    basic_check_retcode = basic_check(child_sub, samples_sent, last_sample_saved, timeout)
-
-    if basic_check_retcode != ReturnCode.OK:
-        return basic_check_retcode
-
-    produced_code = ReturnCode.DATA_NOT_RECEIVED
-
-    instance_color = []
-    instance_seq_num = []
-    first_iteration = []
-    samples_read_per_instance = 0
-    max_samples_received = MAX_SAMPLES_READ
-
-    while samples_read_per_instance < max_samples_received:
-        sub_string = re.search(r'\w+\s+(\w+)\s+[0-9]+\s+[0-9]+\s+\[([0-9]+)\]',
-            child_sub.before + child_sub.after)
-
-        if sub_string is not None:
-            # add a new instance to instance_color
-            if sub_string.group(1) not in instance_color:
-                instance_color.append(sub_string.group(1))
-                instance_seq_num.append(int(sub_string.group(2)))
-                first_iteration.append(True)
-
-            if sub_string.group(1) in instance_color:
-                index = instance_color.index(sub_string.group(1))
-                if first_iteration[index]:
-                    first_iteration[index] = False
-                else:
-                    # check that the next sequence number is the next value
-                    instance_seq_num[index] += 1
-                    if instance_seq_num[index] != int(sub_string.group(2)):
-                        produced_code = ReturnCode.DATA_NOT_CORRECT
-                        break
-            else:
+    return SampleValidator(
+        PerInstanceHistory(depth, num_instances),
+        name='test_late_joiner_history',
+        max_samples=2 * (depth + 1) * num_instances,
+        count_first_instance_only=False,
+        require_budget=False)
+
+def stats_validator(max_stats):
+    """
+    Returns a checking function for a subscriber run with --stats-interval:
+    it reads 'max_stats' summaries instead of the samples and checks that
+    samples were received and that no instance has gaps or duplicates
+    (DATA_NOT_CORRECT otherwise). If the subscriber prints samples instead
+    of summaries, it does not support --stats-interval.
+    """
+    def check(child_sub, samples_sent, last_sample_saved, timeout):
+        stats = parse_stats(child_sub.after)
+        if stats is None:
+            return ReturnCode.SUB_UNSUPPORTED_FEATURE
+        samples_received = 0
+        produced_code = ReturnCode.OK
+        for i in range(max_stats):
+            if i > 0:
+                index = child_sub.expect(
+                    [
+                        STATS_PATTERN, # index = 0
+                        pexpect.TIMEOUT, # index = 1
+                        pexpect.EOF # index = 2
+                    ],
+                    timeout
+                )
+                if index != 0:
+                    produced_code = ReturnCode.DATA_NOT_RECEIVED
+                    break
+                stats = parse_stats(child_sub.after)
+            samples_received += stats['samples']
+            if stats['gaps'] > 0 or stats['duplicates'] > 0:
                 produced_code = ReturnCode.DATA_NOT_CORRECT
                 break
+        if produced_code == ReturnCode.OK and samples_received == 0:
+            produced_code = ReturnCode.DATA_NOT_RECEIVED
 
-        # Get the next sample the subscriber is receiving
-        index = child_sub.expect(
-            [
-                r'\[[0-9]+\]', # index = 0
-                pexpect.TIMEOUT, # index = 1
-                pexpect.EOF # index = 2
-            ],
-            timeout
-        )
-        if index == 0:
-            if sub_string is not None and sub_string.group(1) == instance_color[0]:
-                samples_read_per_instance += 1
-        elif index == 1:
-            # no more data to process
-            break
-        elif index == 2:
-            return ReturnCode.DATA_NOT_RECEIVED
+        print(f'Summaries read: {i + 1}, samples received: {samples_received}')
+        return produced_code
 
-    if max_samples_received == samples_read_per_instance:
-        produced_code = ReturnCode.OK
+    check.__name__ = 'test_stats'
+    check.record_output = True
+    return check
 
-    print(f'Samples read per instance: {samples_read_per_instance}, instances: {instance_color}')
-    return produced_code
+# This function tests RELIABLE reliability, it checks whether the subscriber
+# receives the samples in order and with no losses (for several instances)
+test_reliability_no_losses_w_instances = SampleValidator(
+    PerInstanceNoGaps(),
+    name='test_reliability_no_losses_w_instances',
+    max_samples=MAX_SAMPLES_READ)
 
 
 def test_durability_volatile(child_sub, samples_sent, last_sample_saved, timeout):
@@ -465,10 +424,9 @@ def test_reading_1_sample_every_10_samples_w_instances(child_sub, samples_sent,
 
     produced_code = ReturnCode.DATA_NOT_RECEIVED
 
-    instance_color = []
-    instance_seq_num = []
-    first_iteration = []
-    ignore_first_sample = []
+    # instance color -> InstanceState
+    instances = {}
+    first_instance_color = None
     max_samples_received = MAX_SAMPLES_READ / 10 # 50
     samples_read_per_instance = 0
 
@@ -478,37 +436,34 @@ def test_reading_1_sample_every_10_samples_w_instances(child_sub, samples_sent,
             child_sub.before + child_sub.after)
 
         if sub_string is not None:
-            # add a new instance to instance_color
-            if sub_string.group(1) not in instance_color:
-                instance_color.append(sub_string.group(1))
-                instance_seq_num.append(int(sub_string.group(2)))
-                first_iteration.append(True)
-                ignore_first_sample.append(True)
-
-            if sub_string.group(1) in instance_color:
-                index = instance_color.index(sub_string.group(1))
-                if first_iteration[index]:
-                    first_iteration[index] = False
-                else:
-                    current_seq_num = int(sub_string.group(2))
-                    if ignore_first_sample[index]:
-                        ignore_first_sample[index] = False
-                    else:
-                        # check that the received sample reads only one sample in
-                        # in the period of 10 samples. For example, if the previous
-                        # sample received has size 5, the next one should be
-                        # between [15-24], both included.
-                        # As the write period does not take into account the
-                        # execution overhead, the next valid sample may be
-                        # between [14-24] if the filtering happens in the reader
-                        # side.
-                        if current_seq_num < (instance_seq_num[index] + 9) or current_seq_num > instance_seq_num[index] + 19:
-                            produced_code = ReturnCode.DATA_NOT_CORRECT
-                            break
-                    instance_seq_num[index] = current_seq_num
+            color = sub_string.group(1)
+            instance = instances.get(color)
+            if instance is None:
+                # add a new instance
+                instance = InstanceState(int(sub_string.group(2)))
+                instances[color] = instance
+                if first_instance_color is None:
+                    first_instance_color = color
+
+            if instance.first_iteration:
+                instance.first_iteration = False
             else:
-                produced_code = ReturnCode.DATA_NOT_CORRECT
-                break
+                current_seq_num = int(sub_string.group(2))
+                if instance.ignore_first_sample:
+                    instance.ignore_first_sample = False
+                else:
+                    # check that the received sample reads only one sample in
+                    # in the period of 10 samples. For example, if the previous
+                    # sample received has size 5, the next one should be
+                    # between [15-24], both included.
+                    # As the write period does not take into account the
+                    # execution overhead, the next valid sample may be
+                    # between [14-24] if the filtering happens in the reader
+                    # side.
+                    if current_seq_num < (instance.seq_num + 9) or current_seq_num > instance.seq_num + 19:
+                        produced_code = ReturnCode.DATA_NOT_CORRECT
+                        break
+                instance.seq_num = current_seq_num
 
         # Get the next sample the subscriber is receiving
         index = child_sub.expect(
@@ -520,7 +475,7 @@ def test_reading_1_sample_every_10_samples_w_instances(child_sub, samples_sent,
             timeout
         )
         if index == 0:
-            if sub_string is not None and sub_string.group(1) == instance_color[0]:
+            if sub_string is not None and sub_string.group(1) == first_instance_color:
                 # increase samples_read_per_instance only for the first instance
                 samples_read_per_instance += 1
         elif index == 1:
@@ -532,9 +487,70 @@ def test_reading_1_sample_every_10_samples_w_instances(child_sub, samples_sent,
     if max_samples_received == samples_read_per_instance:
         produced_code = ReturnCode.OK
 
-    print(f'Samples read per instance: {samples_read_per_instance}, instances: {instance_color}')
+    print(f'Samples read per instance: {samples_read_per_instance}, instances: {list(instances)}')
     return produced_code
 
+def _first_option_value(apps, entity, name):
+    """
+    Returns the value of the option 'name' of the first application of
+    'apps' that is a Publisher (entity '-P') or a Subscriber ('-S') and
+    sets it, or None.
+    """
+    for element in apps:
+        options = shape_main_options(element)
+        if entity in options and name in options:
+            return option_value(options, name)
+    return None
+
+def test_time_based_filter_timestamps(child_sub, samples_sent,
+        last_sample_saved, timeout, apps):
+    """
+    Timestamp-based version of
+    test_reading_1_sample_every_10_samples_w_instances: checks the
+    TIME_BASED_FILTER of the subscriber (option --time-filter) measuring the
+    time between the samples received (see
+    rtps_validators.TimeBasedFilterInterval), so it does not depend on the
+    write period configured.
+
+    child_sub: child program generated with pexpect
+    samples_sent: not used
+    last_sample_saved: not used
+    timeout: time pexpect waits until it matches a pattern
+    apps: list of shape_main application parameters of the Test Case.
+    """
+    validator = SampleValidator(
+        TimeBasedFilterInterval(
+            float(_first_option_value(apps, '-S', '--time-filter'))),
+        name='test_time_based_filter_timestamps',
+        max_samples=MAX_SAMPLES_READ / 10)
+    return validator(child_sub, samples_sent, last_sample_saved, timeout)
+
+test_time_based_filter_timestamps.record_output = True
+
+def test_lifespan_timestamps(child_sub, samples_sent, last_sample_saved,
+        timeout, apps):
+    """
+    Timestamp-based version of
+    test_lifespan_2_3_consecutive_samples_w_instances: checks the LIFESPAN
+    of the publisher (option --lifespan) measuring the age of the samples
+    received and of the samples that expired (see
+    rtps_validators.LifespanExpiry), so it does not depend on the number of
+    samples that fit in a read period.
+
+    child_sub: child program generated with pexpect
+    samples_sent: not used
+    last_sample_saved: not used
+    timeout: time pexpect waits until it matches a pattern
+    apps: list of shape_main application parameters of the Test Case.
+    """
+    validator = SampleValidator(
+        LifespanExpiry(float(_first_option_value(apps, '-P', '--lifespan'))),
+        name='test_lifespan_timestamps',
+        max_samples=MAX_SAMPLES_READ / 10)
+    return validator(child_sub, samples_sent, last_sample_saved, timeout)
+
+test_lifespan_timestamps.record_output = True
+
 def test_unregistering_w_instances(child_sub, samples_sent, last_sample_saved, timeout):
     """
     This function tests whether instances are correctly unregistered
@@ -745,12 +761,10 @@ def test_lifespan_2_3_consecutive_samples_w_instances(child_sub, samples_sent, l
     # as the test is reading in a slower rate, reduce the number of samples read
     max_samples_lifespan = MAX_SAMPLES_READ / 10 # 50
 
-    instance_color = []
-    previous_seq_num = []
-    first_iteration = []
+    # instance color -> InstanceState
+    instances = {}
+    first_instance_color = None
     samples_read_per_instance = 0
-    consecutive_samples = []
-    ignore_first_sample = []
     lifespan_expiration_observed = False
 
     while samples_read_per_instance < max_samples_lifespan:
@@ -758,53 +772,48 @@ def test_lifespan_2_3_consecutive_samples_w_instances(child_sub, samples_sent, l
             child_sub.before + child_sub.after)
 
         if sub_string is not None:
-            # add a new instance to instance_color
-            if sub_string.group(1) not in instance_color:
-                instance_color.append(sub_string.group(1))
-                previous_seq_num.append(int(sub_string.group(2)))
-                first_iteration.append(True)
-                consecutive_samples.append(1) # take into account the first sample
-                ignore_first_sample.append(True)
-
-            # if the instance exists
-            if sub_string.group(1) in instance_color:
-                index = instance_color.index(sub_string.group(1))
-                # we should receive only 2 or 3 consecutive samples with the
-                # parameters defined by the test
-                if first_iteration[index]:
-                    # do nothing for the first sample received
-                    first_iteration[index] = False
+            color = sub_string.group(1)
+            current_seq_num = int(sub_string.group(2))
+            instance = instances.get(color)
+            if instance is None:
+                # add a new instance
+                instance = InstanceState(current_seq_num)
+                instances[color] = instance
+                if first_instance_color is None:
+                    first_instance_color = color
+
+            # we should receive only 2 or 3 consecutive samples with the
+            # parameters defined by the test
+            if instance.first_iteration:
+                # do nothing for the first sample received
+                instance.first_iteration = False
+            else:
+                # if the sequence number is consecutive, increase the counter
+                if instance.seq_num + 1 == current_seq_num:
+                    instance.consecutive_samples += 1
+                    # if found consecutive samples, do not ignore the first sample
+                    instance.ignore_first_sample = False
                 else:
-                    # if the sequence number is consecutive, increase the counter
-                    if previous_seq_num[index] + 1 == int(sub_string.group(2)):
-                        consecutive_samples[index] += 1
-                        # if found consecutive samples, do not ignore the first sample
-                        ignore_first_sample[index] = False
+                    # if the sequence number is not consecutive, check that we
+                    # receive only 3 or 2 samples
+                    if instance.consecutive_samples == 3 or instance.consecutive_samples == 2:
+                        # reset value to 1, as this test consider that the first
+                        # sample is consecutive with itself
+                        instance.consecutive_samples = 1
+                        produced_code = ReturnCode.OK
+                        lifespan_expiration_observed = True
                     else:
-                        # if the sequence number is not consecutive, check that we
-                        # receive only 3 or 2 samples
-                        if consecutive_samples[index] == 3 or consecutive_samples[index] == 2:
-                            # reset value to 1, as this test consider that the first
-                            # sample is consecutive with itself
-                            consecutive_samples[index] = 1
-                            produced_code = ReturnCode.OK
-                            lifespan_expiration_observed = True
+                        if instance.ignore_first_sample:
+                            # there may be a case in which we receive a sample
+                            # and the next one is not consecutive, if that is the
+                            # case, ignore it
+                            instance.ignore_first_sample = False
                         else:
-                            if ignore_first_sample[index]:
-                                # there may be a case in which we receive a sample
-                                # and the next one is not consecutive, if that is the
-                                # case, ignore it
-                                ignore_first_sample[index] = False
-                            else:
-                                # if the amount of samples received is different than 3 or 2
-                                # this is an error
-                                produced_code = ReturnCode.DATA_NOT_CORRECT
-                                break
-                    previous_seq_num[index] = int(sub_string.group(2))
-
-            else:
-                produced_code = ReturnCode.DATA_NOT_CORRECT
-                break
+                            # if the amount of samples received is different than 3 or 2
+                            # this is an error
+                            produced_code = ReturnCode.DATA_NOT_CORRECT
+                            break
+                instance.seq_num = current_seq_num
 
         # Get the next sample the subscriber is receiving
         index = child_sub.expect(
@@ -816,7 +825,7 @@ def test_lifespan_2_3_consecutive_samples_w_instances(child_sub, samples_sent, l
             timeout
         )
         if index == 0:
-            if sub_string is not None and sub_string.group(1) == instance_color[0]:
+            if sub_string is not None and sub_string.group(1) == first_instance_color:
                 # increase samples_read_per_instance only for the first instance
                 samples_read_per_instance += 1
         elif index == 1:
@@ -834,7 +843,7 @@ def test_lifespan_2_3_consecutive_samples_w_instances(child_sub, samples_sent, l
             # pass even though enough samples were read
             produced_code = ReturnCode.DATA_NOT_CORRECT
 
-    print(f'Samples read per instance: {samples_read_per_instance}, instances: {instance_color}')
+    print(f'Samples read per instance: {samples_read_per_instance}, instances: {list(instances)}')
     return produced_code
 
 def ordered_access_w_instances(child_sub, samples_sent, last_sample_saved, timeout):
@@ -964,153 +973,59 @@ def ordered_access_w_instances(child_sub, samples_sent, last_sample_saved, timeo
     print(f'Samples read per instance: {samples_read_per_instance}, instances: {instance_color}')
     return produced_code
 
-def coherent_sets_w_instances(child_sub, samples_sent, last_sample_saved, timeout):
+def coherent_set_layout(apps):
+    """
+    Returns the names of the topics and instances and the samples per
+    instance of the coherent sets the first Publisher of 'apps' writes
+    (options -t, --num-topics, -c, --num-instances and
+    --coherent-sample-count). The shape_main application appends the index
+    to the names of the topics and instances after the first one. Returns
+    None if 'apps' has no Publisher.
     """
-    This function tests that coherent sets works correctly. This counts the
-    consecutive samples received from the same instance. The value should be 3
-    as this is the coherent set count that the test is setting.
-    Note: when using GROUP_PRESENTATION, the first iteration may print more
-    samples (more coherent sets), the test checks that the samples received per
-    instance is a multiple of 3, so the coherent sets are received complete.
+    for element in apps:
+        options = shape_main_options(element)
+        if '-P' not in options:
+            continue
+        topic = option_value(options, '-t')
+        color = option_value(options, '-c', 'BLUE')
+        num_topics = int(option_value(options, '--num-topics', 1))
+        num_instances = int(option_value(options, '--num-instances', 1))
+        topics = [topic] + [f'{topic}{i}' for i in range(1, num_topics)]
+        instances = [color] + [f'{color}{i}' for i in range(1, num_instances)]
+        return topics, instances, int(option_value(options,
+                '--coherent-sample-count', 0))
+    return None
+
+def coherent_sets_w_instances(child_sub, samples_sent, last_sample_saved,
+        timeout, apps):
+    """
+    This function tests that coherent sets works correctly. Every time the
+    subscriber reads coherent sets it checks that the samples received form
+    one complete coherent set: the samples per instance
+    (--coherent-sample-count) of every instance (--num-instances) of every
+    topic (--num-topics) the publisher writes. For example, 3 samples, 4
+    instances and 3 topics make coherent sets of 36 samples.
+    Note: when using GROUP_PRESENTATION, the first iterations may print more
+    samples (more coherent sets), so the first two reads are not checked.
+    See rtps_validators.CoherentSetDigest.
     child_sub: child program generated with pexpect
     samples_sent: not used
     last_sample_saved: not used
     timeout: time pexpect waits until it matches a pattern
+    apps: list of shape_main application parameters of the Test Case.
     """
-
-    basic_check_retcode = basic_check(child_sub, samples_sent, last_sample_saved, timeout)
-
-    if basic_check_retcode != ReturnCode.OK:
-        return basic_check_retcode
-
-    produced_code = ReturnCode.DATA_NOT_RECEIVED
-
-    topics = {}
-    samples_read_per_instance = 0
-    previous_sample_color = None
-    new_coherent_set_read = False
-    first_time_reading = True
-    ignore_firsts_coherent_set = 2
-    coherent_sets_count = 0
-    coherent_set_sample_count = 0
-    coherent_sets_max_count = MAX_SAMPLES_READ / 5 # 100
-
-    while samples_read_per_instance < coherent_sets_max_count:
-        sub_string = re.search(r'(\w+)\s+(\w+)\s+[0-9]+\s+[0-9]+\s+\[[0-9]+\]',
-            child_sub.before + child_sub.after)
-        topic_name = None
-        instance_color = None
-
-        # if a sample is read
-        if sub_string is not None:
-            # DataReader has received a new coherent set
-            new_coherent_set_read = True
-            # add new instances to the corresponding topic
-            topic_name = sub_string.group(1)
-            instance_color = sub_string.group(2)
-
-            if topic_name not in topics:
-                topics[topic_name] = {}
-            if instance_color not in topics[topic_name]:
-                topics[topic_name][instance_color] = None
-            # if the instance is already added
-            if instance_color in topics[topic_name]:
-                # the instance exists
-                current_color = instance_color
-                # check the previous color and increase consecutive samples
-                if previous_sample_color is not None:
-                    if current_color == previous_sample_color:
-                        if topics[topic_name][instance_color] is None:
-                            topics[topic_name][instance_color] = 1
-                        topics[topic_name][instance_color] += 1
-                previous_sample_color = current_color
-        # different message than a sample
-        else:
-            sub_string = re.search(r'Reading coherent sets',
-                child_sub.before + child_sub.after)
-            # if 'Reading coherent sets' message, it means that the DataReader
-            # is trying to read a new coherent set, it might not read any sample
-            if sub_string is not None:
-                # if DataReader has received samples
-                if ignore_firsts_coherent_set != 0 and new_coherent_set_read:
-                    ignore_firsts_coherent_set -= 1
-                    coherent_set_sample_count = 0
-                    for topic in topics:
-                        for color in topics[topic]:
-                            topics[topic][color] = None
-                elif new_coherent_set_read:
-                    # the test is only ok if it has received coherent sets
-                    produced_code = ReturnCode.OK
-                    # each set has 4 instances, 3 samples per instance, 3 topics
-                    # therefore, each set contains 4*3*3 = 36 samples, if the count
-                    # is different than 36, it means that there is an error
-                    if coherent_set_sample_count != 36:
-                        print(f'Coherent set sample count is {coherent_set_sample_count} instead of 36')
-                        produced_code = ReturnCode.DATA_NOT_CORRECT
-                        break
-                    else:
-                        coherent_set_sample_count = 0
-                    for topic in topics:
-                        for color in topics[topic]:
-                            if first_time_reading:
-                                # with group presentation we may get several coherent
-                                # sets at the beginning, just checking that the samples
-                                # received are multiple of 3 (coherent set count)
-                                if topics[topic][color] is not None and topics[topic][color] % 3 != 0:
-                                    print(f'Coherent set count for topic {topic} and instance {color} is {topics[topic][color]} instead of 3')
-                                    produced_code = ReturnCode.DATA_NOT_CORRECT
-                                    break
-                            else:
-                                # there should be 3 consecutive samples per instance,
-                                # as the test specifies this with the argument
-                                # --coherent-sample-count 3
-                                if topics[topic][color] is not None and topics[topic][color] != 3:
-                                    print(f'Coherent set count for topic {topic} and instance {color} is {topics[topic][color]} instead of 3')
-                                    produced_code = ReturnCode.DATA_NOT_CORRECT
-                                    break
-                            topics[topic][color] = None
-                    if produced_code == ReturnCode.DATA_NOT_CORRECT:
-                        break
-                    first_time_reading = False
-                new_coherent_set_read = False
-
-        # Get the next sample the subscriber is receiving or the next
-        # 'Reading with ordered access message'
-        index = child_sub.expect(
-            [
-                r'\[[0-9]+\]', # index = 0
-                r'Reading coherent sets.*?\n', # index = 1
-                pexpect.TIMEOUT, # index = 2
-                pexpect.EOF # index = 3
-            ],
-            timeout
-        )
-        if index == 0:
-            # increase samples_read_per_instance only for the first topic and instance
-            if (topic_name is not None and instance_color is not None
-                    and topic_name == list(topics.keys())[0]
-                    and instance_color == list(topics[topic_name].keys())[0]):
-                samples_read_per_instance += 1
-            coherent_set_sample_count += 1
-        elif index == 1:
-            coherent_sets_count += 1
-        elif index == 2:
-            # no more data to process
-            break
-        elif index == 3:
-            produced_code = ReturnCode.DATA_NOT_RECEIVED
-            break
-
-        # Exit condition in case there are no samples being printed
-        if coherent_sets_count > MAX_SAMPLES_READ:
-            # If we have not read enough samples, we consider it a failure
-            if samples_read_per_instance < MAX_SAMPLES_READ:
-                produced_code = ReturnCode.DATA_NOT_RECEIVED
-            break
-
-    print(f'Samples read per instance: {samples_read_per_instance}')
-    print("Instances:")
-    for topic in topics:
-        print(f"Topic {topic}: {', '.join(topics[topic].keys())}")
-
-    return produced_code
+    layout = coherent_set_layout(apps)
+    if layout is None or layout[2] <= 0:
+        print('coherent_sets_w_instances requires a Publisher that writes '
+                'coherent sets (--coherent-sample-count)')
+        return ReturnCode.DATA_NOT_CORRECT
+    topics, instances, samples_per_instance = layout
+    validator = SampleValidator(
+        CoherentSetDigest(topics, instances, samples_per_instance),
+        name='coherent_sets_w_instances',
+        max_samples=MAX_SAMPLES_READ / 5,
+        max_markers=MAX_SAMPLES_READ,
+        require_budget=False)
+    return validator(child_sub, samples_sent, last_sample_saved, timeout)
+
+coherent_sets_w_instances.record_output = True